@@ -0,0 +1,23 @@
+"""Index proposals by project for ranked proposal listing
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_proposals_project_id'), 'proposals', ['project_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_proposals_project_id'), table_name='proposals')
@@ -0,0 +1,45 @@
+"""Webhook inbox table
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('webhook_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('provider', sa.String(length=50), nullable=False),
+        sa.Column('invoice_id', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('invoice_id', 'status', name='uq_webhook_events_invoice_id_status')
+    )
+    op.create_index(op.f('ix_webhook_events_id'), 'webhook_events', ['id'], unique=False)
+    op.create_index(
+        'ix_webhook_events_unprocessed',
+        'webhook_events',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('processed_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_events_unprocessed', table_name='webhook_events')
+    op.drop_index(op.f('ix_webhook_events_id'), table_name='webhook_events')
+    op.drop_table('webhook_events')
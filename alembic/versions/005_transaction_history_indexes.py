@@ -0,0 +1,25 @@
+"""Per-side transaction history indexes
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_transactions_payer_id_created_at_id', 'transactions', ['payer_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_transactions_payee_id_created_at_id', 'transactions', ['payee_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_payee_id_created_at_id', table_name='transactions')
+    op.drop_index('ix_transactions_payer_id_created_at_id', table_name='transactions')
@@ -0,0 +1,71 @@
+"""Ledger balances table, backfilled from transactions
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('ledger_balances',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('available', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('pending', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('escrowed', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('opening_available', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    
+    # Withdrawals were checked against users.total_earned, and not all of it
+    # is in release transactions, so available starts from total_earned
+    # minus withdrawals (the old rule). The part releases don't explain is
+    # kept as opening_available so reconciliation (app.services.ledger.
+    # expected_balances) arrives at the same figure.
+    op.execute("""
+        INSERT INTO ledger_balances (user_id, available, pending, escrowed, opening_available, updated_at)
+        SELECT u.id,
+               COALESCE(u.total_earned, 0) - COALESCE(payee.withdrawing, 0) - COALESCE(payee.withdrawn, 0),
+               COALESCE(payee.withdrawing, 0),
+               COALESCE(payer.funded, 0) - COALESCE(payer.drawn, 0),
+               COALESCE(u.total_earned, 0) - COALESCE(payee.released, 0),
+               now()
+        FROM users u
+        LEFT JOIN (
+            SELECT payee_id,
+                   SUM(CASE WHEN transaction_type IN ('escrow_release', 'milestone_release') AND status = 'completed'
+                            THEN COALESCE(net_amount, amount) ELSE 0 END) AS released,
+                   SUM(CASE WHEN transaction_type = 'withdrawal' AND status IN ('pending', 'processing')
+                            THEN amount + COALESCE(commission_amount, 0) ELSE 0 END) AS withdrawing,
+                   SUM(CASE WHEN transaction_type = 'withdrawal' AND status = 'completed'
+                            THEN amount + COALESCE(commission_amount, 0) ELSE 0 END) AS withdrawn
+            FROM transactions
+            WHERE payee_id IS NOT NULL
+            GROUP BY payee_id
+        ) payee ON payee.payee_id = u.id
+        LEFT JOIN (
+            SELECT payer_id,
+                   SUM(CASE WHEN transaction_type IN ('escrow_fund', 'milestone_fund') AND status = 'completed'
+                            THEN amount ELSE 0 END) AS funded,
+                   SUM(CASE WHEN transaction_type IN ('escrow_release', 'milestone_release', 'escrow_refund') AND status = 'completed'
+                            THEN amount ELSE 0 END) AS drawn
+            FROM transactions
+            WHERE payer_id IS NOT NULL
+            GROUP BY payer_id
+        ) payer ON payer.payer_id = u.id
+        WHERE payee.payee_id IS NOT NULL OR payer.payer_id IS NOT NULL OR COALESCE(u.total_earned, 0) != 0
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('ledger_balances')
@@ -0,0 +1,29 @@
+"""Partial index for stale pending invoice scans
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_transactions_pending_invoices',
+        'transactions',
+        ['created_at', 'id'],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending' AND monobank_invoice_id IS NOT NULL")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_pending_invoices', table_name='transactions')
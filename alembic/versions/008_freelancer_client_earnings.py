@@ -0,0 +1,51 @@
+"""Per-pair earnings table for tiered commission, backfilled from users.earnings_with_client
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('freelancer_client_earnings',
+        sa.Column('freelancer_id', sa.Integer(), nullable=False),
+        sa.Column('client_id', sa.Integer(), nullable=False),
+        sa.Column('total_earned', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['client_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['freelancer_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('freelancer_id', 'client_id')
+    )
+    op.create_index('ix_freelancer_client_earnings_client_id', 'freelancer_client_earnings', ['client_id'], unique=False)
+    
+    # Backfill from the JSON column ({client_id: total_earned}); skip keys
+    # that are not numeric ids or point to deleted users
+    op.execute("""
+        INSERT INTO freelancer_client_earnings (freelancer_id, client_id, total_earned, created_at, updated_at)
+        SELECT u.id, e.key::int, SUM(e.value::float), now(), now()
+        FROM users u
+        CROSS JOIN LATERAL json_each_text(
+            CASE WHEN json_typeof(u.earnings_with_client::json) = 'object'
+                 THEN u.earnings_with_client::json ELSE '{}'::json END
+        ) AS e
+        JOIN users c ON c.id::text = e.key
+        WHERE u.earnings_with_client IS NOT NULL
+          AND e.key ~ '^[0-9]+$'
+          AND e.value ~ '^-?[0-9]+(\\.[0-9]+)?$'
+        GROUP BY u.id, e.key::int
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_freelancer_client_earnings_client_id', table_name='freelancer_client_earnings')
+    op.drop_table('freelancer_client_earnings')
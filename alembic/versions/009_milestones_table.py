@@ -0,0 +1,98 @@
+"""Move project milestones from projects.milestones JSON into an indexed table
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('milestones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('due_date', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.Enum('pending', 'funded', 'released', 'cancelled', name='milestonestatus'), nullable=False, server_default='pending'),
+        sa.Column('funding_transaction_id', sa.Integer(), nullable=True),
+        sa.Column('release_transaction_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('funded_at', sa.DateTime(), nullable=True),
+        sa.Column('released_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['funding_transaction_id'], ['transactions.id'], ),
+        sa.ForeignKeyConstraint(['release_transaction_id'], ['transactions.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_milestones_id'), 'milestones', ['id'], unique=False)
+    op.create_index('ix_milestones_project_id_status', 'milestones', ['project_id', 'status'], unique=False)
+    
+    # Backfill from the JSON array, keeping array order; entries without a
+    # usable title or amount are skipped
+    op.execute("""
+        INSERT INTO milestones (project_id, position, title, description, amount, due_date, status,
+                                created_at, updated_at, funded_at, released_at)
+        SELECT p.id,
+               m.ordinality - 1,
+               left(m.value->>'title', 200),
+               coalesce(m.value->>'description', ''),
+               (m.value->>'amount')::float,
+               (m.value->>'due_date')::timestamp,
+               CASE WHEN m.value->>'status' IN ('pending', 'funded', 'released', 'cancelled')
+                    THEN (m.value->>'status')::milestonestatus ELSE 'pending' END,
+               p.created_at,
+               now(),
+               (m.value->>'funded_at')::timestamp,
+               (m.value->>'released_at')::timestamp
+        FROM projects p
+        CROSS JOIN LATERAL json_array_elements(
+            CASE WHEN json_typeof(p.milestones::json) = 'array'
+                 THEN p.milestones::json ELSE '[]'::json END
+        ) WITH ORDINALITY AS m(value, ordinality)
+        WHERE p.milestones IS NOT NULL
+          AND json_typeof(m.value) = 'object'
+          AND m.value->>'title' IS NOT NULL
+          AND m.value->>'amount' ~ '^[0-9]+(\\.[0-9]+)?$'
+    """)
+    
+    op.drop_column('projects', 'milestones')
+
+
+def downgrade() -> None:
+    op.add_column('projects', sa.Column('milestones', sa.JSON(), nullable=True))
+    op.execute("""
+        UPDATE projects p
+        SET milestones = agg.milestones
+        FROM (
+            SELECT project_id,
+                   json_agg(json_build_object(
+                       'id', id,
+                       'title', title,
+                       'description', description,
+                       'amount', amount,
+                       'due_date', due_date,
+                       'status', status::text,
+                       'funded_at', funded_at,
+                       'released_at', released_at
+                   ) ORDER BY position) AS milestones
+            FROM milestones
+            GROUP BY project_id
+        ) agg
+        WHERE agg.project_id = p.id
+    """)
+    op.drop_index('ix_milestones_project_id_status', table_name='milestones')
+    op.drop_index(op.f('ix_milestones_id'), table_name='milestones')
+    op.drop_table('milestones')
+    sa.Enum(name='milestonestatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,50 @@
+"""Daily transaction rollups for analytics, with transactions.updated_at as watermark
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE transactions SET updated_at = coalesce(completed_at, created_at, now())")
+    op.create_index('ix_transactions_updated_at', 'transactions', ['updated_at'], unique=False)
+    op.create_index('ix_transactions_created_at', 'transactions', ['created_at'], unique=False)
+    
+    op.create_table('daily_transaction_rollups',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('transaction_type', postgresql.ENUM(name='transactiontype', create_type=False), nullable=False),
+        sa.Column('status', postgresql.ENUM(name='transactionstatus', create_type=False), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('amount', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('commission_amount', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('net_amount', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('day', 'transaction_type', 'status')
+    )
+    
+    op.create_table('rollup_watermarks',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('watermark', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rollup_watermarks')
+    op.drop_table('daily_transaction_rollups')
+    op.drop_index('ix_transactions_created_at', table_name='transactions')
+    op.drop_index('ix_transactions_updated_at', table_name='transactions')
+    op.drop_column('transactions', 'updated_at')
@@ -0,0 +1,23 @@
+"""Index for paging conversation history in messages
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_messages_sender_id_receiver_id_id', 'messages', ['sender_id', 'receiver_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_sender_id_receiver_id_id', table_name='messages')
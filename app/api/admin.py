@@ -0,0 +1,107 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from typing import List, Optional, Tuple
+from datetime import date, timedelta
+from app.database import get_db
+from app.models.analytics import DailyTransactionRollup
+from app.models.transaction import TransactionType, TransactionStatus
+from app.schemas.analytics import DailyRollup, RevenueSummary, TypeTotals
+from app.core.dependencies import get_admin_principal, Principal
+from app.services.analytics import GMV_TYPES, PURCHASE_TYPES
+
+router = APIRouter()
+
+MAX_RANGE_DAYS = 366
+
+
+def _resolve_range(date_from: Optional[date], date_to: Optional[date]) -> Tuple[date, date]:
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    if (date_to - date_from).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_RANGE_DAYS} days")
+    return date_from, date_to
+
+
+@router.get("/analytics/daily", response_model=List[DailyRollup])
+async def get_daily_rollups(
+    date_from: Optional[date] = Query(None, description="Defaults to 30 days before date_to"),
+    date_to: Optional[date] = Query(None, description="Defaults to today"),
+    transaction_type: Optional[TransactionType] = None,
+    status: Optional[TransactionStatus] = None,
+    current_user: Principal = Depends(get_admin_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Daily counts and sums by transaction type and status (from rollups)"""
+    
+    date_from, date_to = _resolve_range(date_from, date_to)
+    
+    query = select(DailyTransactionRollup).where(
+        DailyTransactionRollup.day >= date_from,
+        DailyTransactionRollup.day <= date_to
+    )
+    if transaction_type:
+        query = query.where(DailyTransactionRollup.transaction_type == transaction_type)
+    if status:
+        query = query.where(DailyTransactionRollup.status == status)
+    
+    result = await db.execute(
+        query.order_by(
+            DailyTransactionRollup.day,
+            DailyTransactionRollup.transaction_type,
+            DailyTransactionRollup.status
+        )
+    )
+    return result.scalars().all()
+
+
+@router.get("/analytics/summary", response_model=RevenueSummary)
+async def get_revenue_summary(
+    date_from: Optional[date] = Query(None, description="Defaults to 30 days before date_to"),
+    date_to: Optional[date] = Query(None, description="Defaults to today"),
+    current_user: Principal = Depends(get_admin_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """GMV and platform revenue for a date range (from rollups)"""
+    
+    date_from, date_to = _resolve_range(date_from, date_to)
+    
+    result = await db.execute(
+        select(
+            DailyTransactionRollup.transaction_type,
+            func.sum(DailyTransactionRollup.count).label("count"),
+            func.sum(DailyTransactionRollup.amount).label("amount"),
+            func.sum(DailyTransactionRollup.commission_amount).label("commission_amount")
+        )
+        .where(
+            DailyTransactionRollup.day >= date_from,
+            DailyTransactionRollup.day <= date_to,
+            DailyTransactionRollup.status == TransactionStatus.COMPLETED
+        )
+        .group_by(DailyTransactionRollup.transaction_type)
+        .order_by(DailyTransactionRollup.transaction_type)
+    )
+    by_type = [
+        TypeTotals(
+            transaction_type=row.transaction_type,
+            count=row.count or 0,
+            amount=round(row.amount or 0, 2),
+            commission_amount=round(row.commission_amount or 0, 2)
+        )
+        for row in result.all()
+    ]
+    
+    gmv = sum(totals.amount for totals in by_type if totals.transaction_type in GMV_TYPES)
+    commission = sum(totals.commission_amount for totals in by_type)
+    purchases = sum(totals.amount for totals in by_type if totals.transaction_type in PURCHASE_TYPES)
+    
+    return RevenueSummary(
+        date_from=date_from,
+        date_to=date_to,
+        gmv=round(gmv, 2),
+        revenue=round(commission + purchases, 2),
+        commission=round(commission, 2),
+        by_type=by_type
+    )
@@ -1,16 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
+from redis.exceptions import RedisError
+from typing import Optional
+import logging
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_
-from app.database import get_db
+from app.database import get_db, release_connection
 from app.models.user import User
 from app.schemas.user import UserCreate, LoginRequest, TokenResponse, User as UserSchema
-from app.core.security import verify_password, get_password_hash, create_access_token, create_refresh_token
-from app.core.dependencies import get_current_user
+from app.core.security import verify_password_async, get_password_hash_async, create_access_token, principal_claims
+from app.core.dependencies import get_current_user, security
+from app.core.principal_cache import get_user
+from app.core.token_revocation import is_revoked, revoke_token
+from app.core.rate_limit import RateLimiter
+from app.services import presence, refresh_tokens
+from app.config import settings
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.post("/register", response_model=TokenResponse)
+@router.post(
+    "/register",
+    response_model=TokenResponse,
+    dependencies=[Depends(RateLimiter("auth.register", settings.RATE_LIMIT_REGISTER))]
+)
 async def register(
     user_data: UserCreate,
     db: AsyncSession = Depends(get_db)
@@ -29,11 +44,15 @@ async def register(
             detail="User with this email or username already exists"
         )
     
+    # Hash on the worker pool without holding a pooled connection
+    await release_connection(db)
+    hashed_password = await get_password_hash_async(user_data.password)
+    
     # Create new user
     db_user = User(
         email=user_data.email,
         username=user_data.username,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=hashed_password,
         first_name=user_data.first_name,
         last_name=user_data.last_name,
         phone=user_data.phone,
@@ -45,8 +64,12 @@ async def register(
     await db.refresh(db_user)
     
     # Create tokens
-    access_token = create_access_token(data={"sub": str(db_user.id)})
-    refresh_token = create_refresh_token(data={"sub": str(db_user.id)})
+    access_token = create_access_token(data=principal_claims(db_user))
+    refresh_token = await refresh_tokens.start_family(db, db_user.id)
+    await db.commit()
+    
+    await presence.touch(db_user.id, force=True)
+    await presence.apply_presence([db_user])
     
     return {
         "access_token": access_token,
@@ -56,7 +79,11 @@ async def register(
     }
 
 
-@router.post("/login", response_model=TokenResponse)
+@router.post(
+    "/login",
+    response_model=TokenResponse,
+    dependencies=[Depends(RateLimiter("auth.login", settings.RATE_LIMIT_LOGIN))]
+)
 async def login(
     login_data: LoginRequest,
     db: AsyncSession = Depends(get_db)
@@ -67,7 +94,9 @@ async def login(
     result = await db.execute(select(User).where(User.email == login_data.email))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    # Verify on the worker pool without holding a pooled connection
+    await release_connection(db)
+    if not user or not await verify_password_async(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -80,13 +109,13 @@ async def login(
             detail="Inactive user"
         )
     
-    # Update last seen
-    user.is_online = True
+    # Create tokens
+    access_token = create_access_token(data=principal_claims(user))
+    refresh_token = await refresh_tokens.start_family(db, user.id)
     await db.commit()
     
-    # Create tokens
-    access_token = create_access_token(data={"sub": str(user.id)})
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
+    await presence.touch(user.id, force=True)
+    await presence.apply_presence([user])
     
     return {
         "access_token": access_token,
@@ -101,7 +130,7 @@ async def refresh_token(
     refresh_token: str,
     db: AsyncSession = Depends(get_db)
 ):
-    """Refresh access token"""
+    """Refresh access token, rotating the refresh token"""
     
     from app.core.security import decode_token
     
@@ -119,8 +148,13 @@ async def refresh_token(
             detail="Invalid refresh token"
         )
     
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
+    if await is_revoked(payload.get("jti")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+    
+    user = await get_user(db, int(user_id))
     
     if user is None or not user.is_active:
         raise HTTPException(
@@ -128,9 +162,15 @@ async def refresh_token(
             detail="User not found or inactive"
         )
     
-    # Create new tokens
-    access_token = create_access_token(data={"sub": str(user.id)})
-    new_refresh_token = create_refresh_token(data={"sub": str(user.id)})
+    # Create new tokens; an old token of the family revokes it
+    new_refresh_token = await refresh_tokens.rotate(db, payload)
+    if new_refresh_token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+    access_token = create_access_token(data=principal_claims(user))
+    await presence.apply_presence([user])
     
     return {
         "access_token": access_token,
@@ -142,13 +182,35 @@ async def refresh_token(
 
 @router.post("/logout")
 async def logout(
+    refresh_token: Optional[str] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Logout user"""
+    """Logout user, revoking the access token and the given refresh token with its family"""
+    
+    from app.core.security import decode_token
+    
+    tokens = [decode_token(credentials.credentials)]
+    if refresh_token:
+        tokens.append(decode_token(refresh_token))
+    
+    try:
+        for payload in tokens:
+            # Only the caller's own tokens
+            if payload and payload.get("jti") and payload.get("sub") == str(current_user.id):
+                await revoke_token(payload["jti"], payload.get("exp"))
+                if payload.get("type") == "refresh" and payload.get("fid"):
+                    await refresh_tokens.revoke_family(db, payload["fid"])
+    except RedisError as e:
+        logger.error(f"Failed to revoke tokens of user {current_user.id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Logout is temporarily unavailable, please retry"
+        )
     
-    current_user.is_online = False
     await db.commit()
+    await presence.mark_offline(current_user.id)
     
     return {"message": "Successfully logged out"}
 
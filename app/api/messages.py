@@ -0,0 +1,139 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, or_
+from sqlalchemy.exc import IntegrityError
+from pydantic import ValidationError
+from typing import Optional
+import asyncio
+import json
+import time
+from app.database import get_db, AsyncSessionLocal
+from app.models.message import Message
+from app.schemas.message import MessageCreate, MessagePage
+from app.core.dependencies import authenticate_token, get_current_principal, Principal
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.security import decode_token
+from app.services.messaging import (
+    Connection,
+    manager,
+    publish,
+    store_message,
+    serialize_message,
+    MESSAGING_FRAMES,
+    MESSAGING_DISCONNECTS,
+    CLOSE_POLICY_VIOLATION,
+    CLOSE_TRY_AGAIN_LATER
+)
+
+router = APIRouter()
+
+
+def _error(detail: str, client_id: Optional[str] = None) -> str:
+    return json.dumps({"type": "error", "detail": detail, "client_id": client_id})
+
+
+@router.websocket("/ws")
+async def messaging_socket(
+    websocket: WebSocket,
+    token: str = Query(..., description="Access token (browsers can't set headers on WebSockets)")
+):
+    """
+    Messaging gateway
+    
+    Client frames are MessageCreate JSON. Server frames:
+    {"type": "message", "message": {...}} for messages sent or received,
+    {"type": "ack", "client_id", "message_id"} after a send is stored and
+    {"type": "error", "detail", "client_id"}. The socket is closed with 1008
+    when the access token expires or is revoked (checked every heartbeat
+    interval) and 1013 when the client can't keep up.
+    """
+    
+    # Authenticate without holding a pooled connection for the socket's lifetime
+    try:
+        async with AsyncSessionLocal() as db:
+            principal = await authenticate_token(token, db)
+    except HTTPException:
+        await websocket.close(code=CLOSE_POLICY_VIOLATION)
+        return
+    payload = decode_token(token)
+    expires_at = payload["exp"]
+    
+    await websocket.accept()
+    connection = Connection(websocket, principal.id, jti=payload.get("jti"), token_version=payload.get("tv"))
+    refused = manager.register(connection)
+    if refused:
+        MESSAGING_DISCONNECTS.inc(reason=refused)
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+        return
+    
+    try:
+        while not connection.closing:
+            try:
+                raw = await asyncio.wait_for(websocket.receive_text(), timeout=expires_at - time.time())
+            except asyncio.TimeoutError:
+                connection.close(CLOSE_POLICY_VIOLATION, "token_expired")
+                break
+            MESSAGING_FRAMES.inc(direction="in")
+    
+            try:
+                data = MessageCreate.model_validate_json(raw)
+            except ValidationError:
+                connection.send(_error("Invalid message"))
+                continue
+    
+            if data.receiver_id == principal.id:
+                connection.send(_error("Cannot message yourself", data.client_id))
+                continue
+    
+            if not connection.allow_send():
+                connection.send(_error("Too many messages, slow down", data.client_id))
+                continue
+    
+            try:
+                message = await store_message(principal.id, data)
+            except IntegrityError:
+                connection.send(_error("Unknown receiver or project", data.client_id))
+                continue
+    
+            # Receiver and the sender's other devices, on any worker
+            await publish(
+                [data.receiver_id, principal.id],
+                json.dumps({"type": "message", "message": message})
+            )
+            connection.send(json.dumps({"type": "ack", "client_id": data.client_id, "message_id": message["id"]}))
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # Closed by the client, or by us while reading
+    finally:
+        await manager.unregister(connection)
+
+
+@router.get("/with/{user_id}", response_model=MessagePage)
+async def get_conversation(
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Messages exchanged with a user, newest first (for catching up after reconnects)"""
+
+    position = decode_cursor(cursor, 1)
+    
+    query = select(Message).where(
+        or_(
+            and_(Message.sender_id == current_user.id, Message.receiver_id == user_id),
+            and_(Message.sender_id == user_id, Message.receiver_id == current_user.id)
+        )
+    )
+    if position:
+        query = query.where(Message.id < int(position[0]))
+    
+    result = await db.execute(query.order_by(Message.id.desc()).limit(limit + 1))
+    rows = result.scalars().all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].id])
+    
+    return {"items": [serialize_message(message) for message in rows], "next_cursor": next_cursor}
@@ -1,22 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Header, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
-from typing import List, Optional
-from datetime import datetime, timedelta
-from app.database import get_db
+from sqlalchemy import select, and_, func, union, tuple_
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta, date
+from app.database import get_db, release_connection, AsyncSessionLocal
 from app.models.transaction import Transaction, TransactionType, TransactionStatus
 from app.models.project import Project, ProjectStatus
-from app.models.user import User, SubscriptionType
+from app.models.milestone import ProjectMilestone, MilestoneStatus
+from app.models.user import User
 from app.schemas.transaction import (
     EscrowFund,
     MilestoneFund,
+    MilestoneBatchFund,
+    MilestoneBatchRelease,
+    MilestoneRelease,
     WithdrawalRequest,
     Transaction as TransactionSchema,
-    TransactionList,
-    PaymentInvoice
+    TransactionPage,
+    PaymentInvoice,
+    Balance
 )
-from app.core.dependencies import get_current_user, get_current_client
+from app.core.dependencies import get_current_user, get_current_client, get_current_principal, Principal
+from app.core.pagination import encode_cursor, decode_cursor
 from app.services.monobank import monobank_service
+from app.services.invoice_idempotency import create_invoice_once, record_transaction
+from app.services import ledger, statements
+from app.services import milestones as milestone_service
+from app.services.webhook_inbox import notify_new_event
+from app.models.webhook_event import WebhookEvent
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 import json
 
 router = APIRouter()
@@ -25,6 +38,7 @@ router = APIRouter()
 @router.post("/escrow/fund", response_model=PaymentInvoice)
 async def fund_escrow(
     escrow_data: EscrowFund,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     current_user: User = Depends(get_current_client),
     db: AsyncSession = Depends(get_db)
 ):
@@ -48,31 +62,119 @@ async def fund_escrow(
     if project.escrow_funded:
         raise HTTPException(status_code=400, detail="Escrow already funded")
     
-    # Create invoice
-    invoice = await monobank_service.create_invoice(
+    description = escrow_data.description or f"Escrow for project: {project.title}"
+    
+    # Don't hold a pooled connection while waiting on Monobank
+    await release_connection(db)
+    
+    # Create invoice (repeats return the live invoice for this order)
+    invoice = await create_invoice_once(
         amount=int(escrow_data.amount * 100),  # Convert to kopiykas
         order_id=f"escrow_{project.id}_{current_user.id}",
-        destination=f"Фінансування проекту: {project.title}"
+        destination=f"Фінансування проекту: {project.title}",
+        record=record_transaction(
+            payer_id=current_user.id,
+            project_id=project.id,
+            transaction_type=TransactionType.ESCROW_FUND,
+            amount=escrow_data.amount,
+            description=description
+        ),
+        idempotency_key=idempotency_key
     )
     
-    # Create transaction
-    transaction = Transaction(
-        payer_id=current_user.id,
-        project_id=project.id,
-        transaction_type=TransactionType.ESCROW_FUND,
+    return PaymentInvoice(
+        invoice_id=invoice["invoice_id"],
+        payment_url=invoice["payment_url"],
         amount=escrow_data.amount,
-        monobank_invoice_id=invoice["invoice_id"],
-        description=escrow_data.description or f"Escrow for project: {project.title}"
+        description=description,
+        expires_at=invoice["expires_at"]
     )
+
+
+async def _fund_milestones(
+    project_id: int,
+    milestone_ids: List[int],
+    order_id: str,
+    description: Optional[str],
+    idempotency_key: Optional[str],
+    current_user: User,
+    db: AsyncSession,
+    expected_amount: Optional[float] = None
+) -> PaymentInvoice:
+    """One invoice for one or more pending milestones of a client's project"""
+    
+    # Get project (columns only; milestone state lives in its own table)
+    result = await db.execute(
+        select(Project.id, Project.title).where(
+            Project.id == project_id,
+            Project.client_id == current_user.id
+        )
+    )
+    project = result.one_or_none()
     
-    db.add(transaction)
-    await db.commit()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    pending = await milestone_service.get_pending(db, project.id, milestone_ids)
+    if len(pending) != len(milestone_ids):
+        # Distinguish unknown milestones from already funded ones
+        found = await db.execute(
+            select(func.count(ProjectMilestone.id)).where(
+                ProjectMilestone.project_id == project.id,
+                ProjectMilestone.id.in_(milestone_ids)
+            )
+        )
+        if found.scalar() != len(milestone_ids):
+            raise HTTPException(status_code=404, detail="Milestone not found")
+        raise HTTPException(status_code=400, detail="Milestone already funded")
+    
+    amount = round(sum(milestone.amount for milestone in pending), 2)
+    if expected_amount is not None and abs(expected_amount - amount) >= 0.01:
+        raise HTTPException(status_code=400, detail="Amount does not match milestone")
+    
+    titles = ", ".join(milestone.title for milestone in pending)
+    description = description or f"Milestones: {titles}"
+    
+    # Don't hold a pooled connection while waiting on Monobank
+    await release_connection(db)
+    
+    async def record(invoice: Dict):
+        # Create transaction and claim the milestones for it
+        async with AsyncSessionLocal() as session:
+            transaction = Transaction(
+                payer_id=current_user.id,
+                project_id=project.id,
+                transaction_type=TransactionType.MILESTONE_FUND,
+                amount=amount,
+                monobank_invoice_id=invoice["invoice_id"],
+                description=description,
+                extra_data=json.dumps({"milestone_ids": milestone_ids})
+            )
+            
+            session.add(transaction)
+            await session.flush()
+            
+            if not await milestone_service.claim_for_funding(session, transaction, milestone_ids):
+                raise HTTPException(
+                    status_code=409,
+                    detail="Payment for one of these milestones is already in progress"
+                )
+            await session.commit()
+    
+    # Create invoice (repeats return the live invoice for this order)
+    invoice = await create_invoice_once(
+        amount=int(amount * 100),
+        order_id=order_id,
+        destination=f"Оплата етапів: {titles}"[:250],
+        record=record,
+        idempotency_key=idempotency_key
+    )
     
     return PaymentInvoice(
         invoice_id=invoice["invoice_id"],
         payment_url=invoice["payment_url"],
-        amount=escrow_data.amount,
-        description=transaction.description,
+        amount=amount,
+        description=description,
         expires_at=invoice["expires_at"]
     )
 
@@ -80,64 +182,96 @@ async def fund_escrow(
 @router.post("/milestone/fund", response_model=PaymentInvoice)
 async def fund_milestone(
     milestone_data: MilestoneFund,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     current_user: User = Depends(get_current_client),
     db: AsyncSession = Depends(get_db)
 ):
     """Fund specific milestone"""
     
-    # Get project
+    return await _fund_milestones(
+        project_id=milestone_data.project_id,
+        milestone_ids=[milestone_data.milestone_id],
+        order_id=f"milestone_{milestone_data.project_id}_{milestone_data.milestone_id}",
+        description=milestone_data.description,
+        idempotency_key=idempotency_key,
+        current_user=current_user,
+        db=db,
+        expected_amount=milestone_data.amount
+    )
+
+
+@router.post("/milestones/fund", response_model=PaymentInvoice)
+async def fund_milestones(
+    batch: MilestoneBatchFund,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    current_user: User = Depends(get_current_client),
+    db: AsyncSession = Depends(get_db)
+):
+    """Fund several milestones of a project with one invoice"""
+    
+    milestone_ids = sorted(set(batch.milestone_ids))
+    return await _fund_milestones(
+        project_id=batch.project_id,
+        milestone_ids=milestone_ids,
+        order_id=f"milestones_{batch.project_id}_{'-'.join(map(str, milestone_ids))}",
+        description=batch.description,
+        idempotency_key=idempotency_key,
+        current_user=current_user,
+        db=db
+    )
+
+
+@router.post("/milestones/release", response_model=List[MilestoneRelease])
+async def release_milestones(
+    batch: MilestoneBatchRelease,
+    current_user: User = Depends(get_current_client),
+    db: AsyncSession = Depends(get_db)
+):
+    """Release several funded milestones to the project's freelancer"""
+    
     result = await db.execute(
-        select(Project).where(
-            Project.id == milestone_data.project_id,
+        select(Project.id, Project.selected_freelancer_id).where(
+            Project.id == batch.project_id,
             Project.client_id == current_user.id
         )
     )
-    project = result.scalar_one_or_none()
+    project = result.one_or_none()
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Check milestone exists
-    milestone = None
-    for m in project.milestones:
-        if m.get("id") == milestone_data.milestone_id:
-            milestone = m
-            break
+    if not project.selected_freelancer_id:
+        raise HTTPException(status_code=400, detail="Project has no selected freelancer")
     
-    if not milestone:
-        raise HTTPException(status_code=404, detail="Milestone not found")
+    # Lock the milestones so concurrent releases can't pay twice
+    milestone_ids = sorted(set(batch.milestone_ids))
+    result = await db.execute(
+        select(ProjectMilestone)
+        .where(
+            ProjectMilestone.project_id == project.id,
+            ProjectMilestone.id.in_(milestone_ids)
+        )
+        .order_by(ProjectMilestone.position)
+        .with_for_update()
+    )
+    milestones = result.scalars().all()
     
-    if milestone.get("status") != "pending":
-        raise HTTPException(status_code=400, detail="Milestone already funded")
+    if len(milestones) != len(milestone_ids):
+        raise HTTPException(status_code=404, detail="Milestone not found")
     
-    # Create invoice
-    invoice = await monobank_service.create_invoice(
-        amount=int(milestone_data.amount * 100),
-        order_id=f"milestone_{project.id}_{milestone_data.milestone_id}",
-        destination=f"Оплата етапу: {milestone.get('title')}"
-    )
+    if any(milestone.status != MilestoneStatus.FUNDED for milestone in milestones):
+        raise HTTPException(status_code=400, detail="Only funded milestones can be released")
     
-    # Create transaction
-    transaction = Transaction(
-        payer_id=current_user.id,
+    releases = await milestone_service.release(
+        db,
         project_id=project.id,
-        transaction_type=TransactionType.MILESTONE_FUND,
-        amount=milestone_data.amount,
-        monobank_invoice_id=invoice["invoice_id"],
-        description=milestone_data.description or f"Milestone: {milestone.get('title')}",
-        extra_data=json.dumps({"milestone_id": milestone_data.milestone_id})
+        client_id=current_user.id,
+        freelancer_id=project.selected_freelancer_id,
+        milestones=list(milestones)
     )
-    
-    db.add(transaction)
     await db.commit()
     
-    return PaymentInvoice(
-        invoice_id=invoice["invoice_id"],
-        payment_url=invoice["payment_url"],
-        amount=milestone_data.amount,
-        description=transaction.description,
-        expires_at=invoice["expires_at"]
-    )
+    return releases
 
 
 @router.post("/withdraw", response_model=dict)
@@ -148,48 +282,46 @@ async def request_withdrawal(
 ):
     """Request withdrawal to card"""
     
-    # Check balance
-    # Calculate available balance (total earned - pending withdrawals - fees)
-    pending_withdrawals = await db.execute(
-        select(func.sum(Transaction.amount)).where(
-            Transaction.payee_id == current_user.id,
-            Transaction.transaction_type == TransactionType.WITHDRAWAL,
-            Transaction.status.in_([TransactionStatus.PENDING, TransactionStatus.PROCESSING])
-        )
-    )
-    pending_amount = pending_withdrawals.scalar() or 0
-    
-    available_balance = current_user.total_earned - pending_amount
+    # Reserve funds (amount + fee) with one conditional update
     total_amount = withdrawal.amount + withdrawal.fee
-    
-    if available_balance < total_amount:
+    if not await ledger.reserve_funds(db, current_user.id, total_amount):
         raise HTTPException(status_code=400, detail="Insufficient balance")
     
-    # Create withdrawal
-    result = await monobank_service.create_withdrawal(
-        card_number=withdrawal.card_number,
-        amount=int(withdrawal.amount * 100),
-        order_id=f"withdrawal_{current_user.id}_{datetime.utcnow().timestamp()}"
-    )
-    
-    # Create transaction
+    # Record the reservation as a pending withdrawal in the same transaction,
+    # then hand the connection back before calling Monobank
+    card = f"****{withdrawal.card_number[-4:]}"
     transaction = Transaction(
         payee_id=current_user.id,
         transaction_type=TransactionType.WITHDRAWAL,
         amount=withdrawal.amount,
         commission_amount=withdrawal.fee,
         net_amount=withdrawal.amount - withdrawal.fee,
-        status=TransactionStatus.PROCESSING,
-        description=f"Withdrawal to card {result['card']}",
+        status=TransactionStatus.PENDING,
+        description=f"Withdrawal to card {card}",
         extra_data=json.dumps({
-            "card": result["card"],
+            "card": card,
             "is_express": withdrawal.is_express
         })
     )
-    
     db.add(transaction)
     await db.commit()
     
+    # Create withdrawal
+    try:
+        result = await monobank_service.create_withdrawal(
+            card_number=withdrawal.card_number,
+            amount=int(withdrawal.amount * 100),
+            order_id=f"withdrawal_{transaction.id}"
+        )
+    except Exception:
+        transaction.status = TransactionStatus.FAILED
+        await ledger.settle_withdrawal(db, transaction, succeeded=False)
+        await db.commit()
+        raise
+    
+    transaction.status = TransactionStatus.PROCESSING
+    await db.commit()
+    
     return {
         "transaction_id": transaction.id,
         "amount": withdrawal.amount,
@@ -200,74 +332,142 @@ async def request_withdrawal(
     }
 
 
-@router.get("/transactions", response_model=List[TransactionList])
+@router.get("/balance", response_model=Balance)
+async def get_balance(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get user's available, pending and escrowed balances"""
+    
+    return await ledger.get_balance(db, current_user.id)
+
+
+@router.get("/transactions", response_model=TransactionPage)
 async def get_transactions(
     transaction_type: Optional[TransactionType] = None,
     status: Optional[TransactionStatus] = None,
-    skip: int = 0,
-    limit: int = 20,
-    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get user's transactions"""
     
-    query = select(Transaction).where(
-        or_(
-            Transaction.payer_id == current_user.id,
-            Transaction.payee_id == current_user.id
-        )
-    )
-    
-    if transaction_type:
-        query = query.where(Transaction.transaction_type == transaction_type)
+    position = decode_cursor(cursor, 2)
+    if position:
+        position = (datetime.fromisoformat(position[0]), position[1])
+    
+    def side(user_column, other_party_column):
+        # Each side is a bounded scan of its (user, created_at, id) index
+        query = select(
+            Transaction.id,
+            Transaction.created_at,
+            other_party_column.label("other_party_id")
+        ).where(user_column == current_user.id)
+        
+        if transaction_type:
+            query = query.where(Transaction.transaction_type == transaction_type)
+        
+        if status:
+            query = query.where(Transaction.status == status)
+        
+        if position:
+            query = query.where(tuple_(Transaction.created_at, Transaction.id) < tuple_(*position))
+        
+        query = query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(limit + 1)
+        return select(query.subquery())
     
-    if status:
-        query = query.where(Transaction.status == status)
+    page = union(
+        side(Transaction.payer_id, Transaction.payee_id),
+        side(Transaction.payee_id, Transaction.payer_id)
+    ).subquery()
     
-    query = query.order_by(Transaction.created_at.desc())
-    query = query.offset(skip).limit(limit)
+    result = await db.execute(
+        select(
+            Transaction.id,
+            Transaction.transaction_type,
+            Transaction.amount,
+            Transaction.status,
+            Transaction.description,
+            Transaction.created_at,
+            User.username,
+            User.first_name,
+            User.last_name,
+            Project.title.label("project_title")
+        )
+        .select_from(page)
+        .join(Transaction, Transaction.id == page.c.id)
+        .outerjoin(User, User.id == page.c.other_party_id)
+        .outerjoin(Project, Project.id == Transaction.project_id)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+        .limit(limit + 1)
+    )
+    rows = result.all()
     
-    result = await db.execute(query)
-    transactions = result.scalars().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].created_at.isoformat(), rows[-1].id])
     
     # Format response
     transaction_list = []
-    for transaction in transactions:
-        # Determine other party and project
+    for row in rows:
         other_party_name = None
-        project_title = None
-        
-        if transaction.payer_id == current_user.id and transaction.payee_id:
-            # User is payer
-            payee_result = await db.execute(select(User).where(User.id == transaction.payee_id))
-            payee = payee_result.scalar_one_or_none()
-            if payee:
-                other_party_name = f"{payee.first_name} {payee.last_name}".strip() or payee.username
-        elif transaction.payee_id == current_user.id and transaction.payer_id:
-            # User is payee
-            payer_result = await db.execute(select(User).where(User.id == transaction.payer_id))
-            payer = payer_result.scalar_one_or_none()
-            if payer:
-                other_party_name = f"{payer.first_name} {payer.last_name}".strip() or payer.username
-        
-        if transaction.project_id:
-            project_result = await db.execute(select(Project).where(Project.id == transaction.project_id))
-            project = project_result.scalar_one_or_none()
-            if project:
-                project_title = project.title
+        if row.username:
+            other_party_name = " ".join(filter(None, [row.first_name, row.last_name])) or row.username
         
         transaction_list.append({
-            "id": transaction.id,
-            "transaction_type": transaction.transaction_type,
-            "amount": transaction.amount,
-            "status": transaction.status,
-            "description": transaction.description,
-            "created_at": transaction.created_at,
+            "id": row.id,
+            "transaction_type": row.transaction_type,
+            "amount": row.amount,
+            "status": row.status,
+            "description": row.description,
+            "created_at": row.created_at,
             "other_party_name": other_party_name,
-            "project_title": project_title
+            "project_title": row.project_title
         })
     
-    return transaction_list
+    return {"items": transaction_list, "next_cursor": next_cursor}
+
+
+@router.get("/statement")
+async def export_statement(
+    date_from: date,
+    date_to: date,
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Export account statement for a date range (inclusive) as CSV or XLSX"""
+    
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    
+    start = datetime.combine(date_from, datetime.min.time())
+    end = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+    filename = f"workhub_statement_{date_from.isoformat()}_{date_to.isoformat()}"
+    
+    if format == "xlsx":
+        try:
+            output = await statements.build_xlsx(current_user.id, start, end)
+        except ImportError:
+            raise HTTPException(status_code=400, detail="XLSX export is not available")
+        
+        def iter_file():
+            with output:
+                while chunk := output.read(64 * 1024):
+                    yield chunk
+        
+        return StreamingResponse(
+            iter_file(),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.xlsx"'}
+        )
+    
+    return StreamingResponse(
+        statements.stream_csv(current_user.id, start, end),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'}
+    )
 
 
 @router.post("/webhook/monobank")
@@ -275,83 +475,42 @@ async def monobank_webhook(
     request: Request,
     db: AsyncSession = Depends(get_db)
 ):
-    """Handle Monobank payment webhooks"""
+    """
+    Handle Monobank payment webhooks
     
-    # Get webhook data
+    Fast path: the raw event is stored in the webhook inbox and acknowledged
+    immediately; inbox workers apply it to transactions asynchronously.
+    """
+    
+    # Read and parse body once
     body = await request.body()
-    data = await request.json()
     
-    # Verify signature (implement in production)
+    # Verify signature over the raw bytes against the cached public key
     x_sign = request.headers.get("X-Sign")
-    if not monobank_service.verify_webhook_signature(body, x_sign):
+    if not await monobank_service.verify_webhook_signature(body, x_sign):
         raise HTTPException(status_code=400, detail="Invalid signature")
     
-    # Process webhook
-    webhook_data = await monobank_service.process_webhook(data)
-    
-    # Find transaction
-    result = await db.execute(
-        select(Transaction).where(Transaction.monobank_invoice_id == webhook_data["invoice_id"])
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+    
+    if not data.get("invoiceId") or not data.get("status"):
+        raise HTTPException(status_code=400, detail="Invalid payload")
+    
+    # Persist to inbox; provider retries of the same status are deduplicated
+    await db.execute(
+        pg_insert(WebhookEvent)
+        .values(
+            provider="monobank",
+            invoice_id=data["invoiceId"],
+            status=data["status"],
+            payload=body.decode()
+        )
+        .on_conflict_do_nothing(index_elements=["invoice_id", "status"])
     )
-    transaction = result.scalar_one_or_none()
-    
-    if not transaction:
-        return {"status": "ignored"}
-    
-    # Update transaction status
-    if webhook_data["status"] == "success":
-        transaction.status = TransactionStatus.COMPLETED
-        transaction.completed_at = datetime.utcnow()
-        
-        # Handle different transaction types
-        if transaction.transaction_type == TransactionType.ESCROW_FUND:
-            # Mark project escrow as funded
-            project_result = await db.execute(select(Project).where(Project.id == transaction.project_id))
-            project = project_result.scalar_one()
-            project.escrow_funded = True
-            project.escrow_amount = transaction.amount
-            
-        elif transaction.transaction_type == TransactionType.CONNECTS_PURCHASE:
-            # Add connects to user
-            metadata = json.loads(transaction.extra_data or "{}")
-            connects_amount = metadata.get("connects_amount", 0)
-            
-            user_result = await db.execute(select(User).where(User.id == transaction.payer_id))
-            user = user_result.scalar_one()
-            user.connects_balance += connects_amount
-            
-        elif transaction.transaction_type == TransactionType.SUBSCRIPTION_PAYMENT:
-            # Activate subscription
-            metadata = json.loads(transaction.extra_data or "{}")
-            subscription_type = metadata.get("subscription_type")
-            months = metadata.get("months", 1)
-            
-            user_result = await db.execute(select(User).where(User.id == transaction.payer_id))
-            user = user_result.scalar_one()
-            user.subscription_type = SubscriptionType(subscription_type)
-            
-            # Set expiration date
-            if user.subscription_expires_at and user.subscription_expires_at > datetime.utcnow():
-                user.subscription_expires_at += timedelta(days=30 * months)
-            else:
-                user.subscription_expires_at = datetime.utcnow() + timedelta(days=30 * months)
-            
-        elif transaction.transaction_type == TransactionType.PROFILE_PROMOTION:
-            # Activate profile promotion
-            metadata = json.loads(transaction.extra_data or "{}")
-            weeks = metadata.get("weeks", 1)
-            
-            user_result = await db.execute(select(User).where(User.id == transaction.payer_id))
-            user = user_result.scalar_one()
-            
-            if user.profile_promoted_until and user.profile_promoted_until > datetime.utcnow():
-                user.profile_promoted_until += timedelta(weeks=weeks)
-            else:
-                user.profile_promoted_until = datetime.utcnow() + timedelta(weeks=weeks)
-    
-    elif webhook_data["status"] in ["failure", "expired"]:
-        transaction.status = TransactionStatus.FAILED
-    
     await db.commit()
     
+    notify_new_event()
+    
     return {"status": "ok"}
\ No newline at end of file
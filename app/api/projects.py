@@ -6,6 +6,7 @@ from typing import List, Optional, Union
 from datetime import datetime
 from app.database import get_db
 from app.models.project import Project, ProjectStatus, ProjectType
+from app.models.milestone import ProjectMilestone
 from app.models.user import User
 from app.schemas.project import (
     ProjectCreateFixed,
@@ -15,7 +16,7 @@ from app.schemas.project import (
     ProjectList,
     ProjectFilters
 )
-from app.core.dependencies import get_current_user, get_current_client
+from app.core.dependencies import get_current_client, get_client_principal, Principal
 import json
 
 router = APIRouter()
@@ -32,11 +33,8 @@ async def create_project(
     # Create project
     project_dict = project_data.dict()
     
-    # Handle milestones for fixed price projects
-    milestones = None
-    if isinstance(project_data, ProjectCreateFixed) and project_data.milestones:
-        milestones = [m.dict() for m in project_data.milestones]
-        project_dict.pop('milestones', None)
+    # Handle milestones for fixed price projects (a relationship, not a column)
+    milestones = project_dict.pop('milestones', None)
     
     project = Project(
         **project_dict,
@@ -45,14 +43,17 @@ async def create_project(
     )
     
     if milestones:
-        project.milestones = milestones
+        project.milestones = [
+            ProjectMilestone(position=position, **milestone)
+            for position, milestone in enumerate(milestones)
+        ]
     
     db.add(project)
     await db.commit()
     await db.refresh(project)
     
     # Load relationships
-    await db.refresh(project, ['client'])
+    await db.refresh(project, ['client', 'milestones'])
     
     return project
 
@@ -170,12 +171,16 @@ async def get_projects(
 @router.get("/my-projects", response_model=List[ProjectSchema])
 async def get_my_projects(
     status: Optional[ProjectStatus] = None,
-    current_user: User = Depends(get_current_client),
+    current_user: Principal = Depends(get_client_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get current user's projects"""
     
-    query = select(Project).where(Project.client_id == current_user.id)
+    query = (
+        select(Project)
+        .where(Project.client_id == current_user.id)
+        .options(selectinload(Project.milestones))
+    )
     
     if status:
         query = query.where(Project.status == status)
@@ -198,7 +203,7 @@ async def get_project(
     result = await db.execute(
         select(Project)
         .where(Project.id == project_id)
-        .options(selectinload(Project.client))
+        .options(selectinload(Project.client), selectinload(Project.milestones))
     )
     project = result.scalar_one_or_none()
     
@@ -239,6 +244,7 @@ async def update_project(
     
     await db.commit()
     await db.refresh(project)
+    await db.refresh(project, ['milestones'])
     
     return project
 
@@ -267,6 +273,7 @@ async def publish_project(
     
     await db.commit()
     await db.refresh(project)
+    await db.refresh(project, ['milestones'])
     
     return project
 
@@ -294,5 +301,6 @@ async def close_project(
     
     await db.commit()
     await db.refresh(project)
+    await db.refresh(project, ['milestones'])
     
     return project
\ No newline at end of file
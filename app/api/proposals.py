@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, and_, func, case, literal, tuple_, Float
 from sqlalchemy.orm import selectinload
 from typing import List, Optional, Union
+from datetime import datetime
+import math
 from app.database import get_db
+from app.core.principal_cache import mark_user_changed
 from app.models.proposal import Proposal, ProposalStatus
 from app.models.project import Project, ProjectStatus, ProjectType
 from app.models.user import User
@@ -12,14 +15,49 @@ from app.schemas.proposal import (
     ProposalCreateHourly,
     ProposalUpdate,
     Proposal as ProposalSchema,
-    ProposalListItem
+    ProposalListItem,
+    ProposalPage,
+    ProposalStats
 )
-from app.core.dependencies import get_current_user, get_current_freelancer, get_current_client
+from app.core.dependencies import get_current_freelancer, get_current_client, get_client_principal, get_current_principal, get_freelancer_principal, Principal
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.rate_limit import RateLimiter
+from app.config import settings
 
 router = APIRouter()
 
 
-@router.post("/", response_model=ProposalSchema)
+def _best_match_score(price, reference_price: Optional[float]):
+    """
+    Composite ranking score computed in SQL, in range 0..1
+    
+    50% freelancer rating, 30% experience (log-scaled jobs completed,
+    saturating at 100 jobs) and 20% price fit against the client's budget.
+    """
+    
+    rating_score = func.coalesce(User.rating, 0) / 5.0
+    experience_score = func.least(
+        func.ln(func.coalesce(User.jobs_completed, 0) + 1, type_=Float) / math.log(101),
+        1.0
+    )
+    
+    if reference_price:
+        # Full score within budget, linearly decreasing to 0 at twice the budget
+        price_fit = case(
+            (price <= reference_price, 1.0),
+            else_=func.greatest(0.0, 1.0 - (price - reference_price) / reference_price)
+        )
+    else:
+        price_fit = literal(1.0, Float)
+    
+    return 0.5 * rating_score + 0.3 * experience_score + 0.2 * price_fit
+
+
+@router.post(
+    "/",
+    response_model=ProposalSchema,
+    dependencies=[Depends(RateLimiter("proposals.create", settings.RATE_LIMIT_PROPOSAL_CREATE, per="user"))]
+)
 async def create_proposal(
     proposal_data: Union[ProposalCreateFixed, ProposalCreateHourly],
     project_id: int,
@@ -67,8 +105,20 @@ async def create_proposal(
         connects_spent=project.connects_to_apply
     )
     
-    # Deduct connects
-    current_user.connects_balance -= project.connects_to_apply
+    # Deduct connects atomically; the caller's balance may come from the
+    # principal cache and must not be written back
+    result = await db.execute(
+        update(User)
+        .where(
+            User.id == current_user.id,
+            User.connects_balance >= project.connects_to_apply
+        )
+        .values(connects_balance=User.connects_balance - project.connects_to_apply)
+        .returning(User.id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=400, detail="Insufficient connects balance")
+    mark_user_changed(db, current_user.id)
     
     # Update project proposals count
     project.proposals_count += 1
@@ -88,7 +138,7 @@ async def get_my_proposals(
     status: Optional[ProposalStatus] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_freelancer),
+    current_user: Principal = Depends(get_freelancer_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get freelancer's proposals"""
@@ -121,57 +171,158 @@ async def get_my_proposals(
     return proposal_list
 
 
-@router.get("/project/{project_id}", response_model=List[ProposalListItem])
+@router.get("/my-stats", response_model=ProposalStats)
+async def get_my_proposal_stats(
+    current_user: Principal = Depends(get_freelancer_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get freelancer's proposal counts per status and connects spent"""
+    
+    # Rows without a status are pending (the column default is ORM-side only)
+    status = func.coalesce(Proposal.status, ProposalStatus.PENDING)
+    
+    # Single pass over ix_proposals_freelancer_id_status
+    result = await db.execute(
+        select(
+            status.label("status"),
+            func.count(Proposal.id).label("proposals"),
+            func.coalesce(func.sum(Proposal.connects_spent), 0).label("connects_spent")
+        )
+        .where(Proposal.freelancer_id == current_user.id)
+        .group_by(status)
+    )
+    
+    stats = {"total": 0, "connects_spent": 0}
+    for row in result.all():
+        stats[row.status.value] = row.proposals
+        stats["total"] += row.proposals
+        stats["connects_spent"] += row.connects_spent
+    
+    decided = stats.get("accepted", 0) + stats.get("rejected", 0)
+    stats["acceptance_rate"] = round(stats.get("accepted", 0) / decided, 4) if decided else 0
+    
+    return stats
+
+
+@router.get("/project/{project_id}", response_model=ProposalPage)
 async def get_project_proposals(
     project_id: int,
-    current_user: User = Depends(get_current_client),
+    sort_by: str = Query("best_match", pattern="^(best_match|price|rating|jobs_completed|created_at)$"),
+    sort_order: Optional[str] = Query(None, pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_client_principal),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get proposals for a project (client only)"""
+    """Get ranked proposals for a project (client only)"""
     
     # Check project ownership
     result = await db.execute(
-        select(Project).where(Project.id == project_id, Project.client_id == current_user.id)
+        select(
+            Project.title,
+            Project.project_type,
+            Project.budget_max,
+            Project.hourly_rate_max
+        ).where(Project.id == project_id, Project.client_id == current_user.id)
     )
-    project = result.scalar_one_or_none()
+    project = result.one_or_none()
     
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Get proposals
-    query = select(Proposal).where(Proposal.project_id == project_id)
-    query = query.order_by(Proposal.created_at.desc())
+    # Price the client compares against depends on project type
+    if project.project_type == ProjectType.HOURLY:
+        price = func.coalesce(Proposal.proposed_hourly_rate, 0)
+        reference_price = project.hourly_rate_max
+    else:
+        price = func.coalesce(Proposal.proposed_amount, 0)
+        reference_price = project.budget_max
+    
+    sort_keys = {
+        "best_match": (_best_match_score(price, reference_price), "desc"),
+        "price": (price, "asc"),
+        "rating": (func.coalesce(User.rating, 0), "desc"),
+        "jobs_completed": (func.coalesce(User.jobs_completed, 0), "desc"),
+        # Default is ORM-side only; NULLs would break the keyset comparison
+        "created_at": (func.coalesce(Proposal.created_at, datetime(1970, 1, 1)), "desc"),
+    }
+    sort_key, default_order = sort_keys[sort_by]
+    descending = (sort_order or default_order) == "desc"
+    
+    # Project only the columns ProposalListItem needs
+    query = (
+        select(
+            Proposal.id,
+            Proposal.proposed_amount,
+            Proposal.proposed_hourly_rate,
+            Proposal.estimated_duration,
+            Proposal.status,
+            Proposal.connects_spent,
+            Proposal.created_at,
+            User.id.label("freelancer_id"),
+            User.username,
+            User.first_name,
+            User.last_name,
+            User.title.label("freelancer_title"),
+            User.rating,
+            User.jobs_completed,
+            sort_key.label("sort_key")
+        )
+        .join(User, Proposal.freelancer_id == User.id)
+        .where(Proposal.project_id == project_id)
+    )
     
-    result = await db.execute(query.options(selectinload(Proposal.freelancer)))
-    proposals = result.scalars().all()
+    # Keyset pagination on (sort key, id)
+    position = decode_cursor(cursor, 2)
+    if position:
+        last_value, last_id = position
+        if sort_by == "created_at":
+            last_value = datetime.fromisoformat(last_value)
+        if descending:
+            query = query.where(tuple_(sort_key, Proposal.id) < tuple_(last_value, last_id))
+        else:
+            query = query.where(tuple_(sort_key, Proposal.id) > tuple_(last_value, last_id))
+    
+    if descending:
+        query = query.order_by(sort_key.desc(), Proposal.id.desc())
+    else:
+        query = query.order_by(sort_key.asc(), Proposal.id.asc())
+    
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last.sort_key, last.id])
     
     # Format response
     proposal_list = []
-    for proposal in proposals:
-        freelancer = proposal.freelancer
+    for row in rows:
         proposal_list.append({
-            "id": proposal.id,
+            "id": row.id,
             "project_title": project.title,
-            "proposed_amount": proposal.proposed_amount,
-            "proposed_hourly_rate": proposal.proposed_hourly_rate,
-            "estimated_duration": proposal.estimated_duration,
-            "status": proposal.status,
-            "connects_spent": proposal.connects_spent,
-            "created_at": proposal.created_at,
-            "freelancer_id": freelancer.id,
-            "freelancer_name": f"{freelancer.first_name} {freelancer.last_name}".strip() or freelancer.username,
-            "freelancer_title": freelancer.title,
-            "freelancer_rating": freelancer.rating,
-            "freelancer_jobs_completed": freelancer.jobs_completed
+            "proposed_amount": row.proposed_amount,
+            "proposed_hourly_rate": row.proposed_hourly_rate,
+            "estimated_duration": row.estimated_duration,
+            "status": row.status,
+            "connects_spent": row.connects_spent,
+            "created_at": row.created_at,
+            "freelancer_id": row.freelancer_id,
+            "freelancer_name": " ".join(filter(None, [row.first_name, row.last_name])) or row.username,
+            "freelancer_title": row.freelancer_title,
+            "freelancer_rating": row.rating,
+            "freelancer_jobs_completed": row.jobs_completed
         })
     
-    return proposal_list
+    return {"items": proposal_list, "next_cursor": next_cursor}
 
 
 @router.get("/{proposal_id}", response_model=ProposalSchema)
 async def get_proposal(
     proposal_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get proposal details"""
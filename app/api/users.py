@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_db, release_connection
 from app.models.user import User, UserRole, SubscriptionType
 from app.schemas.user import (
     User as UserSchema,
@@ -12,7 +12,9 @@ from app.schemas.user import (
     ConnectsPurchase,
     SubscriptionPurchase
 )
-from app.core.dependencies import get_current_user, get_current_active_user
+from app.core.dependencies import get_current_user, get_current_active_user, get_current_principal, Principal
+from app.services import presence
+from app.config import settings
 import json
 
 router = APIRouter()
@@ -23,9 +25,18 @@ async def get_current_user_profile(
     current_user: User = Depends(get_current_user)
 ):
     """Get current user profile"""
+    await presence.apply_presence([current_user])
     return current_user
 
 
+@router.post("/me/heartbeat")
+async def heartbeat(
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Keep the current user online while the client is idle (authentication records the heartbeat)"""
+    return {"online_window": settings.PRESENCE_ONLINE_WINDOW}
+
+
 @router.patch("/me", response_model=UserSchema)
 async def update_current_user(
     user_update: UserUpdate,
@@ -40,6 +51,7 @@ async def update_current_user(
     
     await db.commit()
     await db.refresh(current_user)
+    await presence.apply_presence([current_user])
     
     return current_user
 
@@ -67,6 +79,7 @@ async def update_freelancer_profile(
     
     await db.commit()
     await db.refresh(current_user)
+    await presence.apply_presence([current_user])
     
     return current_user
 
@@ -132,6 +145,7 @@ async def get_freelancers(
     
     result = await db.execute(query)
     freelancers = result.scalars().all()
+    await presence.apply_presence(freelancers)
     
     return freelancers
 
@@ -149,43 +163,43 @@ async def get_user_profile(
     if not user or not user.is_active:
         raise HTTPException(status_code=404, detail="User not found")
     
+    await presence.apply_presence([user])
     return user
 
 
 @router.post("/connects/purchase")
 async def purchase_connects(
     purchase: ConnectsPurchase,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Purchase connects"""
     
-    from app.services.monobank import monobank_service
-    from app.models.transaction import Transaction, TransactionType
+    from app.services.invoice_idempotency import create_invoice_once, record_transaction
+    from app.models.transaction import TransactionType
     
     # Calculate price
     price = (purchase.amount // 20) * 100  # 100 UAH per 20 connects
     
-    # Create invoice
-    invoice = await monobank_service.create_invoice(
+    # Don't hold a pooled connection while waiting on Monobank
+    await release_connection(db)
+    
+    # Create invoice (repeats return the live invoice for this order)
+    invoice = await create_invoice_once(
         amount=price * 100,  # Convert to kopiykas
         order_id=f"connects_{current_user.id}_{purchase.amount}",
-        destination=f"Купівля {purchase.amount} connects на WorkHub.ua"
+        destination=f"Купівля {purchase.amount} connects на WorkHub.ua",
+        record=record_transaction(
+            payer_id=current_user.id,
+            transaction_type=TransactionType.CONNECTS_PURCHASE,
+            amount=price,
+            description=f"Purchase of {purchase.amount} connects",
+            extra_data=json.dumps({"connects_amount": purchase.amount})
+        ),
+        idempotency_key=idempotency_key
     )
     
-    # Create pending transaction
-    transaction = Transaction(
-        payer_id=current_user.id,
-        transaction_type=TransactionType.CONNECTS_PURCHASE,
-        amount=price,
-        monobank_invoice_id=invoice["invoice_id"],
-        description=f"Purchase of {purchase.amount} connects",
-        metadata=json.dumps({"connects_amount": purchase.amount})
-    )
-    
-    db.add(transaction)
-    await db.commit()
-    
     return {
         "invoice_id": invoice["invoice_id"],
         "payment_url": invoice["payment_url"],
@@ -197,13 +211,14 @@ async def purchase_connects(
 @router.post("/subscription/purchase")
 async def purchase_subscription(
     purchase: SubscriptionPurchase,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Purchase or upgrade subscription"""
     
-    from app.services.monobank import monobank_service
-    from app.models.transaction import Transaction, TransactionType
+    from app.services.invoice_idempotency import create_invoice_once, record_transaction
+    from app.models.transaction import TransactionType
     from datetime import datetime, timedelta
     
     if purchase.subscription_type == SubscriptionType.FREE:
@@ -212,29 +227,27 @@ async def purchase_subscription(
     # Calculate price
     price = 199 * purchase.months  # 199 UAH per month
     
-    # Create invoice
-    invoice = await monobank_service.create_invoice(
+    # Don't hold a pooled connection while waiting on Monobank
+    await release_connection(db)
+    
+    # Create invoice (repeats return the live invoice for this order)
+    invoice = await create_invoice_once(
         amount=price * 100,  # Convert to kopiykas
         order_id=f"subscription_{current_user.id}_{purchase.subscription_type}_{purchase.months}",
-        destination=f"Підписка Freelancer Plus на {purchase.months} міс. - WorkHub.ua"
+        destination=f"Підписка Freelancer Plus на {purchase.months} міс. - WorkHub.ua",
+        record=record_transaction(
+            payer_id=current_user.id,
+            transaction_type=TransactionType.SUBSCRIPTION_PAYMENT,
+            amount=price,
+            description=f"{purchase.subscription_type} subscription for {purchase.months} months",
+            extra_data=json.dumps({
+                "subscription_type": purchase.subscription_type,
+                "months": purchase.months
+            })
+        ),
+        idempotency_key=idempotency_key
     )
     
-    # Create pending transaction
-    transaction = Transaction(
-        payer_id=current_user.id,
-        transaction_type=TransactionType.SUBSCRIPTION_PAYMENT,
-        amount=price,
-        monobank_invoice_id=invoice["invoice_id"],
-        description=f"{purchase.subscription_type} subscription for {purchase.months} months",
-        metadata=json.dumps({
-            "subscription_type": purchase.subscription_type,
-            "months": purchase.months
-        })
-    )
-    
-    db.add(transaction)
-    await db.commit()
-    
     return {
         "invoice_id": invoice["invoice_id"],
         "payment_url": invoice["payment_url"],
@@ -247,13 +260,14 @@ async def purchase_subscription(
 @router.post("/profile/promote")
 async def promote_profile(
     weeks: int = Query(1, ge=1, le=4),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Promote freelancer profile"""
     
-    from app.services.monobank import monobank_service
-    from app.models.transaction import Transaction, TransactionType
+    from app.services.invoice_idempotency import create_invoice_once, record_transaction
+    from app.models.transaction import TransactionType
     
     if current_user.role not in [UserRole.FREELANCER, UserRole.BOTH]:
         raise HTTPException(status_code=403, detail="Only freelancers can promote profiles")
@@ -261,26 +275,24 @@ async def promote_profile(
     # Calculate price
     price = 299 * weeks  # 299 UAH per week
     
-    # Create invoice
-    invoice = await monobank_service.create_invoice(
+    # Don't hold a pooled connection while waiting on Monobank
+    await release_connection(db)
+    
+    # Create invoice (repeats return the live invoice for this order)
+    invoice = await create_invoice_once(
         amount=price * 100,  # Convert to kopiykas
         order_id=f"promotion_{current_user.id}_{weeks}w",
-        destination=f"Просування профілю на {weeks} тижн. - WorkHub.ua"
+        destination=f"Просування профілю на {weeks} тижн. - WorkHub.ua",
+        record=record_transaction(
+            payer_id=current_user.id,
+            transaction_type=TransactionType.PROFILE_PROMOTION,
+            amount=price,
+            description=f"Profile promotion for {weeks} weeks",
+            extra_data=json.dumps({"weeks": weeks})
+        ),
+        idempotency_key=idempotency_key
     )
     
-    # Create pending transaction
-    transaction = Transaction(
-        payer_id=current_user.id,
-        transaction_type=TransactionType.PROFILE_PROMOTION,
-        amount=price,
-        monobank_invoice_id=invoice["invoice_id"],
-        description=f"Profile promotion for {weeks} weeks",
-        metadata=json.dumps({"weeks": weeks})
-    )
-    
-    db.add(transaction)
-    await db.commit()
-    
     return {
         "invoice_id": invoice["invoice_id"],
         "payment_url": invoice["payment_url"],
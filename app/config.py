@@ -25,17 +25,104 @@ class Settings(BaseSettings):
     
     # Redis
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 0.5  # seconds
     
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "development-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REFRESH_TOKEN_REUSE_GRACE: int = 30  # seconds the previous refresh token still works after rotation
+    TOKEN_CACHE_ENABLED: bool = os.getenv("TOKEN_CACHE_ENABLED", "true").lower() == "true"
+    TOKEN_CACHE_SIZE: int = 10000  # verified tokens kept per process
+    
+    # Password hashing
+    PASSWORD_HASH_WORKERS: int = 4  # bcrypt threads per app process
+    PASSWORD_HASH_MAX_QUEUE: int = 100  # queued operations before shedding with 503
+    
+    # Authenticated user cache
+    PRINCIPAL_CACHE_ENABLED: bool = os.getenv("PRINCIPAL_CACHE_ENABLED", "true").lower() == "true"
+    PRINCIPAL_CACHE_TTL: int = 60  # seconds in Redis
+    PRINCIPAL_CACHE_LOCAL_TTL: float = 2.0  # seconds in the per-process LRU
+    PRINCIPAL_CACHE_LOCAL_SIZE: int = 10000
+    
+    # Token revocation
+    TOKEN_REVOCATION_SYNC_INTERVAL: float = 2.0  # seconds between incremental filter syncs
+    TOKEN_REVOCATION_REBUILD_INTERVAL: int = 3600  # seconds between full filter rebuilds
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 1000000
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    
+    # Presence
+    PRESENCE_ONLINE_WINDOW: int = 120  # seconds after the last heartbeat a user counts as online
+    PRESENCE_HEARTBEAT_INTERVAL: int = 30  # seconds between heartbeats per user and process
+    PRESENCE_FLUSH_ENABLED: bool = os.getenv("PRESENCE_FLUSH_ENABLED", "true").lower() == "true"
+    PRESENCE_FLUSH_INTERVAL: int = 60  # seconds between last_seen_at flushes
+    PRESENCE_FLUSH_BATCH: int = 1000
+    
+    # Messaging gateway (WebSocket)
+    MESSAGING_MAX_CONNECTIONS: int = 20000  # per worker process
+    MESSAGING_MAX_CONNECTIONS_PER_USER: int = 10
+    MESSAGING_SEND_QUEUE_SIZE: int = 100  # frames queued per connection before it is dropped as too slow
+    MESSAGING_SEND_TIMEOUT: float = 10.0  # seconds a single frame write may take
+    MESSAGING_MAX_SENDS_PER_SECOND: int = 10  # per connection
+    
+    # Rate limiting ("<count>/<second|minute|hour|day>")
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_LOGIN: str = "10/minute"  # per IP
+    RATE_LIMIT_REGISTER: str = "5/hour"  # per IP
+    RATE_LIMIT_PROPOSAL_CREATE: str = "30/hour"  # per user
+    TRUST_PROXY_HEADERS: bool = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"
+    TRUSTED_PROXY_HOPS: int = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))  # proxies appending to X-Forwarded-For
     
     # Monobank API
     MONOBANK_TOKEN: str = os.getenv("MONOBANK_TOKEN", "")
     MONOBANK_WEBHOOK_URL: Optional[str] = os.getenv("MONOBANK_WEBHOOK_URL", None)
     MONOBANK_MERCHANT_ID: Optional[str] = os.getenv("MONOBANK_MERCHANT_ID", None)
+    MONOBANK_API_URL: Optional[str] = os.getenv("MONOBANK_API_URL", None)  # Override for local fakes
+    MONOBANK_CONNECT_TIMEOUT: float = 3.0  # seconds
+    MONOBANK_READ_TIMEOUT: float = 10.0  # seconds
+    MONOBANK_MAX_CONNECTIONS: int = 50
+    MONOBANK_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    MONOBANK_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    MONOBANK_CONNECT_RETRIES: int = 2
+    MONOBANK_IDEMPOTENT_RETRIES: int = 2
+    MONOBANK_RETRY_BACKOFF: float = 0.2  # seconds, doubled per attempt
+    MONOBANK_CREATE_INVOICE_TIMEOUT: float = 8.0  # seconds, total budget including retries
+    MONOBANK_STATUS_TIMEOUT: float = 5.0
+    MONOBANK_CANCEL_TIMEOUT: float = 5.0
+    MONOBANK_BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive failures before opening
+    MONOBANK_BREAKER_RESET_TIMEOUT: float = 30.0  # seconds open before probing
+    MONOBANK_BREAKER_HALF_OPEN_MAX_CALLS: int = 1
+    MONOBANK_PUBKEY_TIMEOUT: float = 5.0
+    MONOBANK_PUBKEY_REFRESH_INTERVAL: int = 3600  # seconds between background key refreshes
+    MONOBANK_PUBKEY_MIN_REFRESH_INTERVAL: int = 60  # seconds between refreshes on failed checks
+    
+    # Invoice idempotency
+    INVOICE_REUSE_MIN_VALIDITY: int = 300  # seconds an invoice must still be valid to be reused
+    INVOICE_CREATE_LOCK_TTL: float = 15.0  # seconds
+    
+    # Statements
+    STATEMENT_CHUNK_SIZE: int = 1000  # rows fetched per server-side cursor round trip
+    
+    # Webhook inbox
+    WEBHOOK_INBOX_WORKERS: int = 2  # per app process
+    WEBHOOK_INBOX_BATCH_SIZE: int = 50
+    WEBHOOK_INBOX_POLL_INTERVAL: float = 1.0  # seconds
+    WEBHOOK_INBOX_MAX_ATTEMPTS: int = 5
+    
+    # Invoice reconciliation (lost webhooks)
+    INVOICE_RECONCILE_ENABLED: bool = os.getenv("INVOICE_RECONCILE_ENABLED", "true").lower() == "true"
+    INVOICE_RECONCILE_INTERVAL: int = 300  # seconds
+    INVOICE_RECONCILE_STALE_AFTER: int = 900  # seconds since transaction creation
+    INVOICE_RECONCILE_BATCH_SIZE: int = 100
+    INVOICE_RECONCILE_CONCURRENCY: int = 5
+    INVOICE_RECONCILE_RATE: float = 10.0  # Monobank status requests per second
+    
+    # Analytics rollups
+    ANALYTICS_ROLLUP_ENABLED: bool = os.getenv("ANALYTICS_ROLLUP_ENABLED", "true").lower() == "true"
+    ANALYTICS_ROLLUP_INTERVAL: int = 300  # seconds
+    ANALYTICS_ROLLUP_LAG: int = 300  # seconds; rows changed more recently wait for the next run
     
     # Diia API
     DIIA_CLIENT_ID: Optional[str] = os.getenv("DIIA_CLIENT_ID", None)
@@ -79,6 +166,10 @@ class Settings(BaseSettings):
     # Sentry
     SENTRY_DSN: Optional[str] = os.getenv("SENTRY_DSN", None)
     
+    # Metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")  # bearer token scrapers must send; required
+    
     # Frontend URL
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
     
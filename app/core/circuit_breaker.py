@@ -0,0 +1,109 @@
+import time
+import logging
+from app.core.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ["breaker"]
+)
+BREAKER_REJECTED = Counter(
+    "circuit_breaker_rejected_total",
+    "Calls rejected without reaching the dependency",
+    ["breaker"]
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency that is failing"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker
+
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. Then up to `half_open_max_calls` probes are
+    let through: a successful probe closes the circuit, a failed one opens
+    it again.
+
+    Usage:
+        breaker.before_call()  # raises CircuitOpenError
+        try:
+            ...
+        except ...:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        BREAKER_STATE.set(_STATE_VALUES[CLOSED], breaker=name)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"Circuit '{self.name}' {self.state} -> {state}")
+        self.state = state
+        BREAKER_STATE.set(_STATE_VALUES[state], breaker=self.name)
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError"""
+
+        if self.state == OPEN:
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.reset_timeout:
+                BREAKER_REJECTED.inc(breaker=self.name)
+                raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+            self._transition(HALF_OPEN)
+            self._probes = 0
+
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                BREAKER_REJECTED.inc(breaker=self.name)
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._probes += 1
+
+    def record_success(self):
+        self._failures = 0
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    def release(self):
+        """Give back a half-open probe slot for a call that never completed"""
+
+        if self.state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
\ No newline at end of file
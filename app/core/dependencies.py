@@ -1,15 +1,27 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from app.database import get_db
 from app.core.security import decode_token
-from app.models.user import User
+from app.core.principal_cache import get_user, get_token_version
+from app.core.token_revocation import is_revoked
+from app.services import presence
+from app.models.user import User, UserRole, VerificationStatus
 from typing import Optional
+from dataclasses import dataclass
 
 security = HTTPBearer()
 
 
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated caller as described by access token claims"""
+    id: int
+    role: UserRole
+    verification_status: VerificationStatus
+    token_version: int
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
@@ -34,8 +46,14 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
+    if await is_revoked(payload.get("jti")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user = await get_user(db, int(user_id))
     
     if user is None:
         raise HTTPException(
@@ -49,6 +67,8 @@ async def get_current_user(
             detail="Inactive user"
         )
     
+    await presence.touch(user.id)
+    
     return user
 
 
@@ -114,4 +134,110 @@ async def get_current_admin(
             status_code=403,
             detail="Admin access required"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """
+    Get current authenticated caller from token claims, without loading the user
+    
+    Only the token version is checked against the database (through a cache),
+    so role, verification or activation changes revoke issued tokens.
+    """
+    return await authenticate_token(credentials.credentials, db)
+
+
+async def authenticate_token(token: str, db: AsyncSession) -> Principal:
+    """Claims-only authentication of an access token, for callers outside of HTTP dependencies"""
+    
+    payload = decode_token(token)
+    
+    if payload is None or payload.get("type") != "access" or payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if await is_revoked(payload.get("jti")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user_id = int(payload["sub"])
+    
+    # Tokens issued before claims were embedded
+    if "tv" not in payload:
+        user = await get_user(db, user_id)
+        if user is None or not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        await presence.touch(user.id)
+        return Principal(
+            id=user.id,
+            role=user.role,
+            verification_status=user.verification_status or VerificationStatus.UNVERIFIED,
+            token_version=user.token_version
+        )
+    
+    if await get_token_version(db, user_id) != payload["tv"]:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token is no longer valid",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    await presence.touch(user_id)
+    return Principal(
+        id=user_id,
+        role=UserRole(payload["role"]),
+        verification_status=VerificationStatus(payload["vs"]),
+        token_version=payload["tv"]
+    )
+
+
+async def get_freelancer_principal(
+    principal: Principal = Depends(get_current_principal)
+) -> Principal:
+    """Claims-only get_current_freelancer"""
+    
+    if principal.role not in [UserRole.FREELANCER, UserRole.BOTH]:
+        raise HTTPException(
+            status_code=403,
+            detail="This feature is only available for freelancers"
+        )
+    return principal
+
+
+async def get_client_principal(
+    principal: Principal = Depends(get_current_principal)
+) -> Principal:
+    """Claims-only get_current_client"""
+    
+    if principal.role not in [UserRole.CLIENT, UserRole.BOTH]:
+        raise HTTPException(
+            status_code=403,
+            detail="This feature is only available for clients"
+        )
+    return principal
+
+
+async def get_admin_principal(
+    principal: Principal = Depends(get_current_principal)
+) -> Principal:
+    """Claims-only get_current_admin"""
+    
+    if principal.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin access required"
+        )
+    return principal
@@ -0,0 +1,27 @@
+import base64
+import json
+from typing import Any, List, Optional
+from fastapi import HTTPException
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode keyset position (sort values + id) into an opaque cursor"""
+    raw = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """Decode cursor produced by encode_cursor, validating its shape"""
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return values
\ No newline at end of file
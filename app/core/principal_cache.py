@@ -0,0 +1,361 @@
+"""
+Cache of authenticated users for get_current_user
+
+Users are cached as column snapshots in two layers:
+
+- a per-process LRU with a very short TTL, checked first
+- Redis, with a longer TTL, shared by all workers
+
+Every Redis entry is stamped with the user's version counter at the time
+the row was read. Readers fetch the entry and the current version in one
+round trip and ignore entries with a stale stamp, so a slow reader can't
+re-cache data that was invalidated while it was reading.
+
+Invalidation bumps the version. It happens automatically after commit for
+users changed through the ORM in any session, and for bulk UPDATEs that
+call `mark_user_changed`. Other processes' LRUs are bounded by the local
+TTL.
+
+A cached user is merged into the request session without a query and
+behaves like a loaded row, except `hashed_password`, which is never cached.
+
+Claims-only authentication needs just the user's token version, which is
+cached separately under the same version stamps. Changes to role,
+verification status or `is_active` bump `users.token_version` on flush,
+which invalidates access tokens issued with the old claims.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from redis.exceptions import RedisError
+from sqlalchemy import any_, bindparam, event, inspect, select, DateTime, Enum, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.config import settings
+from app.core.metrics import Counter
+from app.core.redis_client import redis_client
+from app.database import AsyncSessionLocal
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+ENTRY_PREFIX = "user:principal:"
+VERSION_PREFIX = "user:principal:ver:"
+TOKEN_VERSION_PREFIX = "user:tokver:"
+VERSION_TTL = 86400  # Must outlive cache entries
+
+# Never leaves the database
+EXCLUDED_COLUMNS = {"hashed_password"}
+
+# Columns whose change invalidates issued access tokens
+CLAIM_COLUMNS = ("role", "verification_status", "is_active")
+
+PRINCIPAL_LOOKUPS = Counter(
+    "principal_cache_lookups_total",
+    "Authenticated user lookups per cache layer that answered",
+    ["layer"]
+)
+TOKEN_VERSION_LOOKUPS = Counter(
+    "token_version_cache_lookups_total",
+    "Token version lookups per cache layer that answered",
+    ["layer"]
+)
+
+
+class _LocalCache:
+    """Per-process LRU with a fixed TTL"""
+
+    def __init__(self):
+        self._entries: "OrderedDict[int, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: int) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: int, value: Any):
+        self._entries[key] = (time.monotonic() + settings.PRINCIPAL_CACHE_LOCAL_TTL, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > settings.PRINCIPAL_CACHE_LOCAL_SIZE:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: int):
+        self._entries.pop(key, None)
+
+
+_local = _LocalCache()
+_local_token_versions = _LocalCache()
+_pending_tasks: Set[asyncio.Task] = set()
+
+_columns = [column for column in User.__table__.columns if column.key not in EXCLUDED_COLUMNS]
+
+
+def _dump(user: User) -> Dict:
+    data = {}
+    for column in _columns:
+        value = getattr(user, column.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif hasattr(value, "value") and isinstance(column.type, Enum):
+            value = value.value
+        data[column.key] = value
+    return data
+
+
+def _load(data: Dict) -> Dict:
+    values = {}
+    for column in _columns:
+        value = data.get(column.key)
+        if value is not None:
+            if isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column.type, Enum) and column.type.enum_class:
+                value = column.type.enum_class(value)
+        values[column.key] = value
+    return values
+
+
+async def _attach(db: AsyncSession, data: Dict) -> User:
+    """Put a cached snapshot into the session as a clean persistent User"""
+
+    user = User(**_load(data))
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    """Resolve user by id, from cache when possible"""
+
+    if not settings.PRINCIPAL_CACHE_ENABLED:
+        result = await db.execute(select(User).where(User.id == user_id))
+        return result.scalar_one_or_none()
+
+    data = _local.get(user_id)
+    if data is not None:
+        PRINCIPAL_LOOKUPS.inc(layer="local")
+        return await _attach(db, data)
+
+    version = None
+    try:
+        raw, version = await redis_client.mget(ENTRY_PREFIX + str(user_id), VERSION_PREFIX + str(user_id))
+        version = version or "0"
+        if raw:
+            entry = json.loads(raw)
+            if entry["v"] == version:
+                PRINCIPAL_LOOKUPS.inc(layer="redis")
+                _local.set(user_id, entry["data"])
+                return await _attach(db, entry["data"])
+    except RedisError as e:
+        logger.warning(f"Principal cache unavailable: {str(e)}")
+
+    PRINCIPAL_LOOKUPS.inc(layer="database")
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if user is None:
+        return None
+
+    data = _dump(user)
+    _local.set(user_id, data)
+    if version is not None:
+        try:
+            await redis_client.set(
+                ENTRY_PREFIX + str(user_id),
+                json.dumps({"v": version, "data": data}),
+                ex=settings.PRINCIPAL_CACHE_TTL
+            )
+        except RedisError as e:
+            logger.warning(f"Failed to cache user {user_id}: {str(e)}")
+    return user
+
+
+async def get_token_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """Current token version of a user, or None if the user doesn't exist"""
+
+    token_version = _local_token_versions.get(user_id)
+    if token_version is not None:
+        TOKEN_VERSION_LOOKUPS.inc(layer="local")
+        return token_version
+
+    version = None
+    try:
+        raw, version = await redis_client.mget(
+            TOKEN_VERSION_PREFIX + str(user_id), VERSION_PREFIX + str(user_id)
+        )
+        version = version or "0"
+        if raw:
+            stamp, token_version = raw.rsplit(":", 1)
+            if stamp == version:
+                TOKEN_VERSION_LOOKUPS.inc(layer="redis")
+                _local_token_versions.set(user_id, int(token_version))
+                return int(token_version)
+    except RedisError as e:
+        logger.warning(f"Token version cache unavailable: {str(e)}")
+
+    TOKEN_VERSION_LOOKUPS.inc(layer="database")
+    result = await db.execute(select(User.token_version).where(User.id == user_id))
+    token_version = result.scalar_one_or_none()
+    if token_version is None:
+        return None
+
+    _local_token_versions.set(user_id, token_version)
+    if version is not None:
+        try:
+            await redis_client.set(
+                TOKEN_VERSION_PREFIX + str(user_id),
+                f"{version}:{token_version}",
+                ex=settings.PRINCIPAL_CACHE_TTL
+            )
+        except RedisError as e:
+            logger.warning(f"Failed to cache token version of user {user_id}: {str(e)}")
+    return token_version
+
+
+async def get_token_versions(user_ids: Iterable[int]) -> Dict[int, Optional[int]]:
+    """
+    Token versions of many users: one MGET for those not cached locally and
+    one query, in its own session, for those Redis doesn't have
+    """
+
+    versions: Dict[int, Optional[int]] = {}
+    remaining: List[int] = []
+    for user_id in set(user_ids):
+        token_version = _local_token_versions.get(user_id)
+        if token_version is not None:
+            versions[user_id] = token_version
+        else:
+            remaining.append(user_id)
+    TOKEN_VERSION_LOOKUPS.inc(len(versions), layer="local")
+    if not remaining:
+        return versions
+
+    stamps: Dict[int, str] = {}
+    missing = remaining
+    try:
+        keys = []
+        for user_id in remaining:
+            keys += [TOKEN_VERSION_PREFIX + str(user_id), VERSION_PREFIX + str(user_id)]
+        values = await redis_client.mget(keys)
+        missing = []
+        for i, user_id in enumerate(remaining):
+            raw, version = values[2 * i], values[2 * i + 1] or "0"
+            stamps[user_id] = version
+            if raw:
+                stamp, token_version = raw.rsplit(":", 1)
+                if stamp == version:
+                    versions[user_id] = int(token_version)
+                    _local_token_versions.set(user_id, int(token_version))
+                    continue
+            missing.append(user_id)
+        TOKEN_VERSION_LOOKUPS.inc(len(remaining) - len(missing), layer="redis")
+    except RedisError as e:
+        logger.warning(f"Token version cache unavailable: {str(e)}")
+    if not missing:
+        return versions
+
+    TOKEN_VERSION_LOOKUPS.inc(len(missing), layer="database")
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(User.id, User.token_version)
+            .where(User.id == any_(bindparam("ids", missing, type_=ARRAY(Integer))))
+        )
+        found = {row.id: row.token_version for row in result.all()}
+
+    for user_id in missing:
+        versions[user_id] = found.get(user_id)
+        if user_id in found:
+            _local_token_versions.set(user_id, found[user_id])
+
+    cacheable = [user_id for user_id in found if user_id in stamps]
+    if cacheable:
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for user_id in cacheable:
+                    pipe.set(
+                        TOKEN_VERSION_PREFIX + str(user_id),
+                        f"{stamps[user_id]}:{found[user_id]}",
+                        ex=settings.PRINCIPAL_CACHE_TTL
+                    )
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to cache token versions of {len(cacheable)} users: {str(e)}")
+    return versions
+
+
+async def invalidate_users(user_ids: Iterable[int]):
+    """Drop cached users everywhere by bumping their versions"""
+
+    user_ids = list(user_ids)
+    for user_id in user_ids:
+        _local.pop(user_id)
+        _local_token_versions.pop(user_id)
+    if not user_ids:
+        return
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.incr(VERSION_PREFIX + str(user_id))
+                pipe.expire(VERSION_PREFIX + str(user_id), VERSION_TTL)
+                pipe.delete(ENTRY_PREFIX + str(user_id), TOKEN_VERSION_PREFIX + str(user_id))
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Failed to invalidate cached users {user_ids}: {str(e)}")
+
+
+def mark_user_changed(db: AsyncSession, *user_ids: int):
+    """Invalidate users after commit, for changes made with bulk UPDATEs"""
+    db.sync_session.info.setdefault("changed_user_ids", set()).update(user_ids)
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_token_versions(session: Session, flush_context, instances):
+    for obj in session.dirty:
+        if isinstance(obj, User) and any(
+            inspect(obj).attrs[column].history.has_changes() for column in CLAIM_COLUMNS
+        ):
+            obj.token_version = User.token_version + 1
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context):
+    changed = {
+        obj.id for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User) and obj.id is not None and session.is_modified(obj)
+    }
+    if changed:
+        session.info.setdefault("changed_user_ids", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session):
+    user_ids = session.info.pop("changed_user_ids", None)
+    if not user_ids:
+        return
+
+    for user_id in user_ids:
+        _local.pop(user_id)
+        _local_token_versions.pop(user_id)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Sync use outside the app (scripts); Redis entries expire on their own
+    task = loop.create_task(invalidate_users(user_ids))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session: Session):
+    session.info.pop("changed_user_ids", None)
\ No newline at end of file
@@ -0,0 +1,131 @@
+from fastapi import HTTPException, Request, Response, status
+from typing import Tuple
+import math
+import logging
+from app.config import settings
+from app.core.redis_client import redis_client
+from app.core.security import decode_token
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+# Token bucket kept in a Redis hash. Uses Redis server time so all workers
+# share one clock, and runs as a single EVALSHA round trip.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_per_ms = tonumber(ARGV[2])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill_per_ms)
+
+local allowed = 0
+local retry_after_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after_ms = math.ceil((1 - tokens) / refill_per_ms)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / refill_per_ms))
+return {allowed, math.floor(tokens), retry_after_ms}
+"""
+
+_token_bucket = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """Parse rate like '10/minute' into (capacity, period seconds)"""
+    try:
+        count, period = rate.split("/", 1)
+        return int(count), PERIODS[period.strip()]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit '{rate}', expected '<count>/<second|minute|hour|day>'")
+
+
+def get_client_ip(request: Request) -> str:
+    """
+    Get client IP, honouring X-Forwarded-For when running behind a proxy
+
+    Entries left of those added by our TRUSTED_PROXY_HOPS proxies come from
+    the client and can be anything, so the address is taken counting from
+    the right.
+    """
+    if settings.TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("X-Forwarded-For")
+        if forwarded:
+            hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+            if hops:
+                return hops[-min(max(settings.TRUSTED_PROXY_HOPS, 1), len(hops))]
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    """
+    Distributed token-bucket rate limit dependency
+
+    Attach via the route decorator (`dependencies=[Depends(...)]`) so it is
+    resolved before `get_db` and over-limit requests never open a DB session.
+
+    Args:
+        scope: Bucket namespace, usually the route name
+        rate: Bucket size and refill period, e.g. "10/minute"
+        per: "ip" or "user"; "user" keys on the JWT subject without a DB
+            lookup and falls back to IP for anonymous requests
+    """
+
+    def __init__(self, scope: str, rate: str, per: str = "ip"):
+        if per not in ("ip", "user"):
+            raise ValueError("per must be 'ip' or 'user'")
+
+        self.scope = scope
+        self.per = per
+        self.capacity, period = parse_rate(rate)
+        self.refill_per_ms = self.capacity / (period * 1000)
+
+    def _identity(self, request: Request) -> str:
+        if self.per == "user":
+            authorization = request.headers.get("Authorization", "")
+            scheme, _, token = authorization.partition(" ")
+            if scheme.lower() == "bearer" and token:
+                payload = decode_token(token)
+                if payload and payload.get("sub"):
+                    return f"user:{payload['sub']}"
+        return f"ip:{get_client_ip(request)}"
+
+    async def __call__(self, request: Request, response: Response):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        key = f"ratelimit:{self.scope}:{self._identity(request)}"
+
+        try:
+            allowed, remaining, retry_after_ms = await _token_bucket(
+                keys=[key],
+                args=[self.capacity, self.refill_per_ms]
+            )
+        except Exception as e:
+            # Fail open: an unavailable Redis must not take auth down with it
+            logger.warning(f"Rate limiter unavailable for {self.scope}: {str(e)}")
+            return
+
+        response.headers["X-RateLimit-Limit"] = str(self.capacity)
+        response.headers["X-RateLimit-Remaining"] = str(remaining)
+
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after_ms / 1000)))}
+            )
\ No newline at end of file
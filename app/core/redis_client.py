@@ -0,0 +1,24 @@
+import redis.asyncio as redis
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Shared connection pool; connections are opened lazily on first command
+redis_client = redis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    health_check_interval=30,
+)
+
+
+async def test_redis_connection() -> bool:
+    """Test if Redis connection works"""
+    try:
+        return await redis_client.ping()
+    except Exception as e:
+        logger.error(f"Redis connection failed: {str(e)}")
+        return False
\ No newline at end of file
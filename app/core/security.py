@@ -1,14 +1,59 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt releases the GIL, so threads hash in parallel without blocking the loop
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_password_slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+_password_waiting = 0
+
+PASSWORD_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Password operations waiting for a hashing worker"
+)
+PASSWORD_WAIT_SECONDS = Histogram(
+    "password_hash_wait_seconds",
+    "Time password operations spent queued",
+    ["operation"]
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent hashing or verifying on a worker",
+    ["operation"]
+)
+PASSWORD_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Password operations shed because the queue was full",
+    ["operation"]
+)
+
+TOKEN_CACHE_LOOKUPS = Counter(
+    "token_cache_lookups_total",
+    "Verified-token cache lookups in decode_token",
+    ["result"]
+)
+
 ALGORITHM = settings.ALGORITHM
 SECRET_KEY = settings.SECRET_KEY
 
+# Payloads of tokens that passed verification, by SHA-256 of the whole token
+# (signature included, so a tampered token never matches), until they expire
+_verified_tokens: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
@@ -18,16 +63,28 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "type": "access", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def principal_claims(user) -> Dict[str, Any]:
+    """Access token claims that let claims-only endpoints skip loading the user"""
+    verification_status = user.verification_status or "unverified"
+    return {
+        "sub": str(user.id),
+        "role": getattr(user.role, "value", user.role),
+        "vs": getattr(verification_status, "value", verification_status),
+        "tv": user.token_version or 0
+    }
+
+
 def create_refresh_token(data: Dict[str, Any]) -> str:
     """Create JWT refresh token"""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -42,10 +99,81 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasherBusy(Exception):
+    """Too many password operations are already queued"""
+
+
+async def _run_password_op(operation: str, func: Callable, *args):
+    """Run bcrypt on the worker pool, shedding load when the queue is full"""
+    global _password_waiting
+    
+    if _password_waiting >= settings.PASSWORD_HASH_MAX_QUEUE:
+        PASSWORD_REJECTED.inc(operation=operation)
+        raise PasswordHasherBusy()
+    
+    _password_waiting += 1
+    PASSWORD_QUEUE_DEPTH.set(_password_waiting)
+    queued = time.perf_counter()
+    try:
+        await _password_slots.acquire()
+    finally:
+        _password_waiting -= 1
+        PASSWORD_QUEUE_DEPTH.set(_password_waiting)
+    
+    try:
+        started = time.perf_counter()
+        PASSWORD_WAIT_SECONDS.observe(started - queued, operation=operation)
+        result = await asyncio.get_running_loop().run_in_executor(_password_executor, func, *args)
+        PASSWORD_HASH_SECONDS.observe(time.perf_counter() - started, operation=operation)
+        return result
+    finally:
+        _password_slots.release()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify password against hash without blocking the event loop"""
+    return await _run_password_op("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash password without blocking the event loop"""
+    return await _run_password_op("hash", get_password_hash, password)
+
+
+def shutdown_password_pool():
+    """Stop hashing workers (called from app lifespan)"""
+    _password_executor.shutdown(wait=False, cancel_futures=True)
+
+
 def decode_token(token: str) -> Dict[str, Any]:
-    """Decode and verify JWT token"""
+    """Decode and verify JWT token, reusing earlier verifications of the same token"""
+    if not settings.TOKEN_CACHE_ENABLED:
+        return _decode_token(token)
+    
+    key = hashlib.sha256(token.encode()).digest()
+    cached = _verified_tokens.get(key)
+    if cached is not None:
+        expires_at, payload = cached
+        if expires_at > time.time():
+            _verified_tokens.move_to_end(key)
+            TOKEN_CACHE_LOOKUPS.inc(result="hit")
+            return dict(payload)
+        del _verified_tokens[key]
+        TOKEN_CACHE_LOOKUPS.inc(result="expired")
+    else:
+        TOKEN_CACHE_LOOKUPS.inc(result="miss")
+    
+    payload = _decode_token(token)
+    if payload is not None and isinstance(payload.get("exp"), (int, float)):
+        _verified_tokens[key] = (payload["exp"], dict(payload))
+        while len(_verified_tokens) > settings.TOKEN_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+    return payload
+
+
+def _decode_token(token: str) -> Dict[str, Any]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
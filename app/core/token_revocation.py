@@ -0,0 +1,184 @@
+"""
+Revocation of access and refresh tokens by jti
+
+Redis is the source of truth:
+
+- `token:revoked:<jti>` exists until the token would have expired anyway
+- `token:revoked` is a sorted set of jtis scored by revocation time (ms),
+  which processes read to sync their local filters
+
+Every process keeps a Bloom filter of revoked jtis in front of Redis, so
+checking a token that was never revoked (nearly all of them) stays in
+memory. Only filter hits are confirmed against Redis. The filter takes
+new revocations incrementally every TOKEN_REVOCATION_SYNC_INTERVAL and is
+rebuilt every TOKEN_REVOCATION_REBUILD_INTERVAL to drop expired entries,
+so a revocation made by another process is seen after at most one sync
+interval. Until the first sync every check goes to Redis.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Iterable, Optional
+from redis.exceptions import RedisError
+from app.config import settings
+from app.core.metrics import Counter, Gauge
+from app.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "token:revoked:"
+LOG_KEY = "token:revoked"
+
+# Re-read this much of the log on every sync to cover clock skew between processes
+SYNC_OVERLAP_MS = 10000
+
+REVOCATION_CHECKS = Counter(
+    "token_revocation_checks_total",
+    "Token revocation checks by how they were answered",
+    ["result"]
+)
+REVOCATION_FILTER_SIZE = Gauge(
+    "token_revocation_filter_entries",
+    "Revoked jtis in the local Bloom filter"
+)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+def _new_filter(entries: int = 0) -> BloomFilter:
+    capacity = max(settings.TOKEN_REVOCATION_BLOOM_CAPACITY, entries * 2)
+    return BloomFilter(capacity, settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE)
+
+
+_filter = _new_filter()
+_synced = False
+_synced_until_ms = 0
+
+
+def _max_token_lifetime() -> int:
+    return max(settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60, settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+
+
+async def revoke_token(jti: str, expires_at: Optional[float]):
+    """
+    Revoke a token until its expiry
+
+    Args:
+        jti: Token id
+        expires_at: Token `exp` claim (unix seconds)
+    """
+
+    ttl = int((expires_at or time.time() + _max_token_lifetime()) - time.time())
+    if ttl <= 0:
+        return  # Already expired
+
+    _filter.add(jti)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set(KEY_PREFIX + jti, "1", ex=ttl)
+        pipe.zadd(LOG_KEY, {jti: int(time.time() * 1000)})
+        await pipe.execute()
+
+
+async def is_revoked(jti: Optional[str]) -> bool:
+    """Whether a token was revoked"""
+
+    if not jti:
+        return False  # Issued before tokens carried a jti
+
+    if _synced and jti not in _filter:
+        REVOCATION_CHECKS.inc(result="filter_miss")
+        return False
+
+    try:
+        revoked = bool(await redis_client.exists(KEY_PREFIX + jti))
+    except RedisError as e:
+        logger.warning(f"Token revocation store unavailable: {str(e)}")
+        # Trust the filter; false positives are rare and only force a new login
+        REVOCATION_CHECKS.inc(result="unavailable")
+        return _synced
+
+    if revoked:
+        REVOCATION_CHECKS.inc(result="revoked")
+    else:
+        REVOCATION_CHECKS.inc(result="false_positive" if _synced else "unsynced")
+    return revoked
+
+
+def _add_all(target: BloomFilter, jtis: Iterable[str]):
+    for jti in jtis:
+        target.add(jti)
+
+
+async def sync_revocations(rebuild: bool = False):
+    """Pull revocations from Redis into the local filter"""
+
+    global _filter, _synced, _synced_until_ms
+
+    now_ms = int(time.time() * 1000)
+    if rebuild or not _synced:
+        horizon = now_ms - _max_token_lifetime() * 1000
+        await redis_client.zremrangebyscore(LOG_KEY, "-inf", horizon)
+        jtis = await redis_client.zrangebyscore(LOG_KEY, horizon, "+inf")
+        fresh = _new_filter(len(jtis))
+        _add_all(fresh, jtis)
+        _filter = fresh
+        _synced = True
+    else:
+        jtis = await redis_client.zrangebyscore(LOG_KEY, _synced_until_ms - SYNC_OVERLAP_MS, "+inf")
+        _add_all(_filter, jtis)
+
+    _synced_until_ms = now_ms
+    REVOCATION_FILTER_SIZE.set(_filter.count)
+
+
+async def run_revocation_sync():
+    """Keep the local filter in sync until cancelled"""
+
+    logger.info("Token revocation sync started")
+
+    last_rebuild = 0.0
+    while True:
+        rebuild = time.monotonic() - last_rebuild >= settings.TOKEN_REVOCATION_REBUILD_INTERVAL
+        try:
+            await sync_revocations(rebuild=rebuild)
+            if rebuild:
+                last_rebuild = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except RedisError as e:
+            logger.warning(f"Token revocation sync failed: {str(e)}")
+        except Exception:
+            logger.exception("Token revocation sync failed")
+
+        await asyncio.sleep(settings.TOKEN_REVOCATION_SYNC_INTERVAL)
@@ -54,6 +54,16 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def release_connection(session: AsyncSession):
+    """
+    Hand session's pooled connection back before a slow external call
+    
+    Ends the current transaction; loaded objects stay usable since sessions
+    don't expire on commit. The next query checks out a connection again.
+    """
+    await session.commit()
+
+
 # Test database connection
 async def test_connection():
     """Test if database connection works"""
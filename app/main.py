@@ -1,17 +1,30 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import sentry_sdk
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
+import asyncio
+import hmac
 import logging
 import sys
 import os
+from typing import Optional
 
 from app.config import settings
 from app.database import engine, test_connection
+from app.core.redis_client import redis_client, test_redis_connection
+from app.core.metrics import render_metrics
+from app.core.security import PasswordHasherBusy, shutdown_password_pool
+from app.services.monobank import monobank_service, MonobankError, MonobankUnavailable
+from app.services.webhook_inbox import start_inbox_workers
+from app.services.invoice_reconciler import run_invoice_reconciler
+from app.services.analytics import run_rollup_job
+from app.core.token_revocation import run_revocation_sync
+from app.services.presence import run_presence_flusher
+from app.services.messaging import run_messaging_gateway
 from app.models import *  # Import all models
-from app.api import auth, users, projects, proposals, payments, reviews
+from app.api import auth, users, projects, proposals, payments, reviews, admin, messages
 
 # Configure logging
 logging.basicConfig(
@@ -46,10 +59,40 @@ async def lifespan(app: FastAPI):
         if settings.ENVIRONMENT == "production":
             raise Exception("Cannot start without database connection")
     
+    # Test Redis connection (rate limiting fails open without it)
+    if await test_redis_connection():
+        logger.info("Redis connection successful")
+    else:
+        logger.warning("Redis connection failed")
+    
+    # Open pooled Monobank client
+    await monobank_service.start()
+    
+    # Start background workers
+    background_tasks = [
+        asyncio.create_task(run_revocation_sync()),
+        asyncio.create_task(run_messaging_gateway())
+    ]
+    if settings.MONOBANK_WEBHOOK_URL:
+        background_tasks.append(asyncio.create_task(monobank_service.run_public_key_refresher()))
+    background_tasks.extend(start_inbox_workers())
+    if settings.INVOICE_RECONCILE_ENABLED:
+        background_tasks.append(asyncio.create_task(run_invoice_reconciler()))
+    if settings.ANALYTICS_ROLLUP_ENABLED:
+        background_tasks.append(asyncio.create_task(run_rollup_job()))
+    if settings.PRESENCE_FLUSH_ENABLED:
+        background_tasks.append(asyncio.create_task(run_presence_flusher()))
+    
     yield
     
     # Shutdown
     logger.info(f"Shutting down {settings.APP_NAME} API...")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await monobank_service.close()
+    shutdown_password_pool()
+    await redis_client.aclose()
     await engine.dispose()
 
 
@@ -119,6 +162,35 @@ async def internal_error_handler(request: Request, exc):
     )
 
 
+@app.exception_handler(MonobankUnavailable)
+async def monobank_unavailable_handler(request: Request, exc: MonobankUnavailable):
+    logger.warning(f"Monobank unavailable: {str(exc)}")
+    headers = {"Retry-After": str(int(exc.retry_after) + 1)} if exc.retry_after else None
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Payment provider temporarily unavailable, please retry later"},
+        headers=headers
+    )
+
+
+@app.exception_handler(MonobankError)
+async def monobank_error_handler(request: Request, exc: MonobankError):
+    logger.error(f"Monobank error: {str(exc)}")
+    return JSONResponse(
+        status_code=502,
+        content={"detail": "Payment provider error"}
+    )
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry"},
+        headers={"Retry-After": "1"}
+    )
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -147,6 +219,18 @@ async def health_check():
     }
 
 
+# Prometheus metrics (per worker process), for scrapers holding METRICS_TOKEN
+if settings.METRICS_ENABLED and not settings.METRICS_TOKEN:
+    logger.warning("METRICS_ENABLED is set without METRICS_TOKEN; /metrics is not served")
+elif settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(authorization: Optional[str] = Header(None)):
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not authorization or not hmac.compare_digest(authorization.encode(), expected.encode()):
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # Debug endpoint - ONLY IN DEVELOPMENT
 if settings.ENVIRONMENT != "production":
     @app.get("/debug/config")
@@ -171,6 +255,8 @@ app.include_router(projects.router, prefix=f"{settings.API_V1_STR}/projects", ta
 app.include_router(proposals.router, prefix=f"{settings.API_V1_STR}/proposals", tags=["Proposals"])
 app.include_router(payments.router, prefix=f"{settings.API_V1_STR}/payments", tags=["Payments"])
 app.include_router(reviews.router, prefix=f"{settings.API_V1_STR}/reviews", tags=["Reviews"])
+app.include_router(admin.router, prefix=f"{settings.API_V1_STR}/admin", tags=["Admin"])
+app.include_router(messages.router, prefix=f"{settings.API_V1_STR}/messages", tags=["Messages"])
 
 
 # Catch-all for API routes
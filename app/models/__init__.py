@@ -5,6 +5,12 @@ from app.models.transaction import Transaction, TransactionType, TransactionStat
 from app.models.review import Review
 from app.models.message import Message
 from app.models.time_entry import TimeEntry, TimeEntryStatus
+from app.models.webhook_event import WebhookEvent
+from app.models.ledger import LedgerBalance
+from app.models.earnings import ClientEarnings
+from app.models.milestone import ProjectMilestone, MilestoneStatus
+from app.models.analytics import DailyTransactionRollup, RollupWatermark
+from app.models.refresh_token import RefreshTokenFamily
 
 __all__ = [
     "User", "UserRole", "VerificationStatus", "SubscriptionType",
@@ -13,5 +19,11 @@ __all__ = [
     "Transaction", "TransactionType", "TransactionStatus", "PaymentMethod",
     "Review",
     "Message",
-    "TimeEntry", "TimeEntryStatus"
+    "TimeEntry", "TimeEntryStatus",
+    "WebhookEvent",
+    "LedgerBalance",
+    "ClientEarnings",
+    "ProjectMilestone", "MilestoneStatus",
+    "DailyTransactionRollup", "RollupWatermark",
+    "RefreshTokenFamily"
 ]
\ No newline at end of file
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Enum
+from sqlalchemy.sql import func
+from app.database import Base
+from app.models.transaction import TransactionType, TransactionStatus
+
+
+class DailyTransactionRollup(Base):
+    """Transaction counts and sums per creation day (UTC), type and status"""
+    
+    __tablename__ = "daily_transaction_rollups"
+    
+    day = Column(Date, primary_key=True)
+    transaction_type = Column(Enum(TransactionType), primary_key=True)
+    status = Column(Enum(TransactionStatus), primary_key=True)
+    
+    # Aggregates
+    count = Column(Integer, nullable=False, default=0)
+    amount = Column(Float, nullable=False, default=0)
+    commission_amount = Column(Float, nullable=False, default=0)
+    net_amount = Column(Float, nullable=False, default=0)
+    
+    # Timestamps
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class RollupWatermark(Base):
+    """Position up to which a rollup job has processed its source rows"""
+    
+    __tablename__ = "rollup_watermarks"
+    
+    name = Column(String(100), primary_key=True)
+    watermark = Column(DateTime, nullable=False)
+    
+    # Timestamps
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
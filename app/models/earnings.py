@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, DateTime, Float, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class ClientEarnings(Base):
+    """Lifetime gross earnings of a freelancer with one client (commission tiers)"""
+    
+    __tablename__ = "freelancer_client_earnings"
+    __table_args__ = (
+        Index("ix_freelancer_client_earnings_client_id", "client_id"),
+    )
+    
+    freelancer_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    client_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_earned = Column(Float, nullable=False, default=0)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
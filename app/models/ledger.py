@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, DateTime, Float, ForeignKey
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class LedgerBalance(Base):
+    """Materialised per-user balances, maintained by app.services.ledger"""
+    
+    __tablename__ = "ledger_balances"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    
+    # Balances (UAH)
+    available = Column(Float, nullable=False, default=0)  # Withdrawable earnings
+    pending = Column(Float, nullable=False, default=0)  # Reserved by open withdrawals
+    escrowed = Column(Float, nullable=False, default=0)  # Funded by the user as client, not yet released
+    
+    # Part of available carried over from users.total_earned when the ledger was introduced
+    # and not backed by release transactions
+    opening_available = Column(Float, nullable=False, default=0)
+    
+    # Timestamps
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User")
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey, Enum, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+import enum
+
+
+class MilestoneStatus(str, enum.Enum):
+    PENDING = "pending"
+    FUNDED = "funded"
+    RELEASED = "released"
+    CANCELLED = "cancelled"
+
+
+class ProjectMilestone(Base):
+    __tablename__ = "milestones"
+    __table_args__ = (
+        # Status checks for a project's milestones without loading the rest
+        Index("ix_milestones_project_id_status", "project_id", "status"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False, default=0)  # Order within the project
+    
+    # Milestone details
+    title = Column(String(200), nullable=False)
+    description = Column(Text)
+    amount = Column(Float, nullable=False)
+    due_date = Column(DateTime)
+    
+    # Status
+    status = Column(Enum(MilestoneStatus), nullable=False, default=MilestoneStatus.PENDING)
+    funding_transaction_id = Column(Integer, ForeignKey("transactions.id"))
+    release_transaction_id = Column(Integer, ForeignKey("transactions.id"))
+    
+    # Timestamps
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    funded_at = Column(DateTime)
+    released_at = Column(DateTime)
+    
+    # Relationships
+    project = relationship("Project", back_populates="milestones")
\ No newline at end of file
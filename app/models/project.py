@@ -78,9 +78,6 @@ class Project(Base):
     escrow_funded = Column(Boolean, default=False)
     escrow_amount = Column(Float, default=0)
     
-    # Milestones for fixed price projects
-    milestones = Column(JSON, default=list)  # List of milestone objects
-    
     # Timestamps
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -95,4 +92,12 @@ class Project(Base):
     messages = relationship("Message", back_populates="project")
     reviews = relationship("Review", back_populates="project")
     transactions = relationship("Transaction", back_populates="project")
-    time_entries = relationship("TimeEntry", back_populates="project")
\ No newline at end of file
+    time_entries = relationship("TimeEntry", back_populates="project")
+    
+    # Milestones for fixed price projects
+    milestones = relationship(
+        "ProjectMilestone",
+        back_populates="project",
+        order_by="ProjectMilestone.position",
+        cascade="all, delete-orphan"
+    )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Text, ForeignKey, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -14,9 +14,12 @@ class ProposalStatus(str, enum.Enum):
 
 class Proposal(Base):
     __tablename__ = "proposals"
+    __table_args__ = (
+        Index("ix_proposals_freelancer_id_status", "freelancer_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
     freelancer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Proposal details
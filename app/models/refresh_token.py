@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class RefreshTokenFamily(Base):
+    """
+    Chain of refresh tokens started by one login, maintained by
+    app.services.refresh_tokens
+    
+    Redis holds the current head of active families and is the only store
+    rotations touch; this table records when families start and are revoked.
+    """
+    
+    __tablename__ = "refresh_token_families"
+    
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    
+    # Head the family started with
+    generation = Column(Integer, nullable=False, default=0)
+    token_hash = Column(String(64), nullable=False)  # SHA-256 of the head token's jti
+    
+    # Timestamps
+    created_at = Column(DateTime, default=func.now())
+    rotated_at = Column(DateTime)
+    revoked_at = Column(DateTime)
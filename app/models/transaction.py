@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Text, ForeignKey, Enum, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -35,6 +35,21 @@ class PaymentMethod(str, enum.Enum):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Per-side history scans for (user, created_at, id) cursor paging
+        Index("ix_transactions_payer_id_created_at_id", "payer_id", "created_at", "id"),
+        Index("ix_transactions_payee_id_created_at_id", "payee_id", "created_at", "id"),
+        # Stale invoice scan for the reconciler
+        Index(
+            "ix_transactions_pending_invoices",
+            "created_at",
+            "id",
+            postgresql_where=text("status = 'pending' AND monobank_invoice_id IS NOT NULL")
+        ),
+        # Analytics rollups: changed rows since the watermark, then whole days
+        Index("ix_transactions_updated_at", "updated_at"),
+        Index("ix_transactions_created_at", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -67,6 +82,7 @@ class Transaction(Base):
     
     # Timestamps
     created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())  # Rollup watermark
     completed_at = Column(DateTime)
     
     # Relationships
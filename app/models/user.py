@@ -66,11 +66,13 @@ class User(Base):
     profile_promoted_until = Column(DateTime)
     
     # Earnings tracking for commission calculation
+    # Superseded by freelancer_client_earnings (app.services.commission); kept for history
     earnings_with_client = Column(JSON, default=dict)  # {client_id: total_earned}
     
     # Status
     is_active = Column(Boolean, default=True)
     is_online = Column(Boolean, default=False)
+    token_version = Column(Integer, default=0, nullable=False, server_default="0")  # Bumped when access token claims go stale
     last_seen_at = Column(DateTime, default=func.now())
     
     # Timestamps
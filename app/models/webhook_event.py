@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint, Index, text
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class WebhookEvent(Base):
+    """Raw provider webhook persisted before processing (inbox)"""
+    
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        # Provider retries of the same status collapse into one row
+        UniqueConstraint("invoice_id", "status", name="uq_webhook_events_invoice_id_status"),
+        # Workers only scan unprocessed events
+        Index(
+            "ix_webhook_events_unprocessed",
+            "id",
+            postgresql_where=text("processed_at IS NULL")
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    provider = Column(String(50), nullable=False, default="monobank")
+    invoice_id = Column(String(255), nullable=False)
+    status = Column(String(50), nullable=False)
+    
+    # Raw request body as received
+    payload = Column(Text, nullable=False)
+    
+    # Processing state
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    
+    # Timestamps
+    received_at = Column(DateTime, default=func.now())
+    processed_at = Column(DateTime)
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import List
+from datetime import date
+from app.models.transaction import TransactionType, TransactionStatus
+
+
+class DailyRollup(BaseModel):
+    day: date
+    transaction_type: TransactionType
+    status: TransactionStatus
+    count: int
+    amount: float
+    commission_amount: float
+    net_amount: float
+    
+    class Config:
+        from_attributes = True
+
+
+class TypeTotals(BaseModel):
+    transaction_type: TransactionType
+    count: int
+    amount: float
+    commission_amount: float
+
+
+class RevenueSummary(BaseModel):
+    date_from: date
+    date_to: date
+    gmv: float  # Completed escrow and milestone funding
+    revenue: float  # Commissions and fees plus platform purchases
+    commission: float
+    by_type: List[TypeTotals]  # Completed transactions only
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+
+class MessageCreate(BaseModel):
+    receiver_id: int
+    content: str = Field(..., min_length=1, max_length=5000)
+    project_id: Optional[int] = None
+    attachments: Optional[List[str]] = Field(None, max_items=10)
+    
+    # Echoed back in the ack so clients can match it to their pending message
+    client_id: Optional[str] = Field(None, max_length=64)
+
+
+class Message(BaseModel):
+    id: int
+    sender_id: int
+    receiver_id: int
+    project_id: Optional[int]
+    content: str
+    attachments: Optional[List[str]]
+    is_read: bool
+    created_at: datetime
+
+
+class MessagePage(BaseModel):
+    items: List[Message]
+    next_cursor: Optional[str] = None
@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field, validator
 from typing import Optional, List, Dict
 from datetime import datetime
 from app.models.project import ProjectStatus, ProjectType, ProjectDuration, ExperienceLevel
+from app.models.milestone import MilestoneStatus
 
 
 class MilestoneBase(BaseModel):
@@ -17,9 +18,12 @@ class MilestoneCreate(MilestoneBase):
 
 class Milestone(MilestoneBase):
     id: int
-    status: str = "pending"  # pending, funded, released, cancelled
+    status: MilestoneStatus = MilestoneStatus.PENDING
     funded_at: Optional[datetime] = None
     released_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
 
 
 class ProjectBase(BaseModel):
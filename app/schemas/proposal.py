@@ -63,4 +63,19 @@ class ProposalListItem(BaseModel):
     freelancer_jobs_completed: Optional[int]
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class ProposalPage(BaseModel):
+    items: List[ProposalListItem]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= to get the next page
+
+
+class ProposalStats(BaseModel):
+    total: int = 0
+    pending: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    withdrawn: int = 0
+    connects_spent: int = 0
+    acceptance_rate: float = 0  # accepted / (accepted + rejected)
\ No newline at end of file
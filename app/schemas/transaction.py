@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from datetime import datetime
 from app.models.transaction import TransactionType, TransactionStatus, PaymentMethod
 
@@ -21,6 +21,26 @@ class MilestoneFund(TransactionBase):
     transaction_type: TransactionType = TransactionType.MILESTONE_FUND
 
 
+class MilestoneBatchFund(BaseModel):
+    project_id: int
+    milestone_ids: List[int] = Field(..., min_items=1, max_items=50)
+    description: Optional[str] = None
+
+
+class MilestoneBatchRelease(BaseModel):
+    project_id: int
+    milestone_ids: List[int] = Field(..., min_items=1, max_items=50)
+
+
+class MilestoneRelease(BaseModel):
+    milestone_id: int
+    transaction_id: int
+    amount: float
+    commission_amount: float
+    commission_rate: float
+    net_amount: float
+
+
 class WithdrawalRequest(BaseModel):
     amount: float = Field(..., gt=0)
     is_express: bool = False
@@ -72,6 +92,17 @@ class TransactionList(BaseModel):
         from_attributes = True
 
 
+class TransactionPage(BaseModel):
+    items: List[TransactionList]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= to get the next page
+
+
+class Balance(BaseModel):
+    available: float
+    pending: float
+    escrowed: float
+
+
 class PaymentInvoice(BaseModel):
     invoice_id: str
     payment_url: str
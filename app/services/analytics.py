@@ -0,0 +1,162 @@
+"""
+Daily transaction rollups
+
+`daily_transaction_rollups` holds count and sums of amount, commission and
+net amount per creation day (UTC), transaction type and status. Rows are
+bucketed by `created_at`, but a status change moves a transaction between
+buckets, so instead of applying deltas the job finds the days touched by
+transactions whose `updated_at` passed the watermark and recomputes those
+days in full.
+
+Only rows older than ANALYTICS_ROLLUP_LAG are picked up, so transactions
+still being written when the watermark moves are caught on a later run.
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from redis.exceptions import RedisError
+from sqlalchemy import select, delete, func, cast, Date
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.core.redis_client import redis_client
+from app.database import AsyncSessionLocal
+from app.models.analytics import DailyTransactionRollup, RollupWatermark
+from app.models.transaction import Transaction, TransactionType, TransactionStatus
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "daily_transaction_rollups"
+LOCK_KEY = "analytics-rollup:lock"
+ADVISORY_LOCK_ID = 4200420  # Serialises refreshes from the job and the CLI
+
+# Days recomputed per query
+DAY_CHUNK = 31
+
+# Money the platform moves on behalf of clients
+GMV_TYPES = [TransactionType.ESCROW_FUND, TransactionType.MILESTONE_FUND]
+
+# Platform purchases that are revenue in full
+PURCHASE_TYPES = [
+    TransactionType.CONNECTS_PURCHASE,
+    TransactionType.SUBSCRIPTION_PAYMENT,
+    TransactionType.PROFILE_PROMOTION,
+]
+
+
+async def _recompute_days(db: AsyncSession, days: List[date]):
+    """Replace rollup rows for the given (sorted) days"""
+
+    day = cast(Transaction.created_at, Date)
+    # Rows without a status count as pending (the column default), grouped
+    # together with real pending rows so each rollup key comes out once
+    status = func.coalesce(Transaction.status, TransactionStatus.PENDING)
+    result = await db.execute(
+        select(
+            day.label("day"),
+            Transaction.transaction_type,
+            status.label("status"),
+            func.count(Transaction.id).label("count"),
+            func.sum(Transaction.amount).label("amount"),
+            func.sum(func.coalesce(Transaction.commission_amount, 0)).label("commission_amount"),
+            func.sum(func.coalesce(Transaction.net_amount, 0)).label("net_amount")
+        )
+        .where(
+            # Range first so the created_at index bounds the scan
+            Transaction.created_at >= datetime.combine(days[0], datetime.min.time()),
+            Transaction.created_at < datetime.combine(days[-1] + timedelta(days=1), datetime.min.time()),
+            day.in_(days)
+        )
+        .group_by(day, Transaction.transaction_type, status)
+    )
+    rows = [
+        {
+            "day": row.day,
+            "transaction_type": row.transaction_type,
+            "status": row.status,
+            "count": row.count,
+            "amount": row.amount or 0,
+            "commission_amount": row.commission_amount or 0,
+            "net_amount": row.net_amount or 0,
+        }
+        for row in result.all()
+    ]
+
+    await db.execute(delete(DailyTransactionRollup).where(DailyTransactionRollup.day.in_(days)))
+    if rows:
+        await db.execute(pg_insert(DailyTransactionRollup).values(rows))
+
+
+async def refresh_rollups(db: AsyncSession, full: bool = False) -> Dict:
+    """
+    Bring daily rollups up to date and commit
+
+    Args:
+        full: Ignore the watermark and rebuild every day
+
+    Returns:
+        Stats: days recomputed and the new watermark
+    """
+
+    await db.execute(select(func.pg_advisory_xact_lock(ADVISORY_LOCK_ID)))
+
+    result = await db.execute(
+        select(RollupWatermark.watermark).where(RollupWatermark.name == WATERMARK_NAME)
+    )
+    watermark: Optional[datetime] = None if full else result.scalar_one_or_none()
+    upper = datetime.utcnow() - timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG)
+
+    if watermark and watermark >= upper:
+        await db.commit()
+        return {"days": 0, "watermark": watermark}
+
+    changed = select(cast(Transaction.created_at, Date)).where(Transaction.updated_at <= upper)
+    if watermark:
+        changed = changed.where(Transaction.updated_at > watermark)
+    result = await db.execute(changed.distinct())
+    days = sorted(day for day in result.scalars().all() if day is not None)
+
+    if full:
+        await db.execute(delete(DailyTransactionRollup))
+    for start in range(0, len(days), DAY_CHUNK):
+        await _recompute_days(db, days[start:start + DAY_CHUNK])
+
+    stmt = pg_insert(RollupWatermark).values(name=WATERMARK_NAME, watermark=upper)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[RollupWatermark.name],
+            set_={"watermark": stmt.excluded.watermark, "updated_at": func.now()}
+        )
+    )
+    await db.commit()
+
+    return {"days": len(days), "watermark": upper}
+
+
+async def run_rollup_job():
+    """Periodically refresh rollups until cancelled"""
+
+    logger.info("Analytics rollup job started")
+
+    while True:
+        await asyncio.sleep(settings.ANALYTICS_ROLLUP_INTERVAL)
+
+        try:
+            # One refresh per deployment, not per worker process
+            if not await redis_client.set(LOCK_KEY, "1", nx=True, ex=settings.ANALYTICS_ROLLUP_INTERVAL):
+                continue
+        except RedisError as e:
+            logger.warning(f"Analytics rollup lock unavailable: {str(e)}")
+            continue
+
+        try:
+            async with AsyncSessionLocal() as db:
+                stats = await refresh_rollups(db)
+            if stats["days"]:
+                logger.info(f"Analytics rollups refreshed: {stats}")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Analytics rollup refresh failed")
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Tiered platform commission
+
+The rate depends on a freelancer's lifetime gross earnings with the same
+client, kept per pair in `freelancer_client_earnings`:
+
+- up to COMMISSION_TIER_1_LIMIT: COMMISSION_TIER_1_RATE
+- up to COMMISSION_TIER_2_LIMIT: COMMISSION_TIER_2_RATE
+- above: COMMISSION_TIER_3_RATE
+
+A release that crosses a limit is split across tiers.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, tuple_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Dict, List, Tuple
+from app.config import settings
+from app.models.earnings import ClientEarnings
+
+
+def _tiers() -> List[Tuple[float, float]]:
+    """(upper limit, rate) bands in ascending order"""
+    return [
+        (settings.COMMISSION_TIER_1_LIMIT, settings.COMMISSION_TIER_1_RATE),
+        (settings.COMMISSION_TIER_2_LIMIT, settings.COMMISSION_TIER_2_RATE),
+        (float("inf"), settings.COMMISSION_TIER_3_RATE),
+    ]
+
+
+def calculate_commission(prior_earned: float, amount: float) -> Dict[str, float]:
+    """
+    Commission for a release of `amount` given prior earnings with the client
+
+    Returns:
+        Dict with commission_amount, commission_rate (effective) and net_amount
+    """
+
+    commission = 0.0
+    position = prior_earned
+    remaining = amount
+
+    for limit, rate in _tiers():
+        if remaining <= 0:
+            break
+        if position < limit:
+            portion = min(remaining, limit - position)
+            commission += portion * rate
+            position += portion
+            remaining -= portion
+
+    commission = round(commission, 2)
+    return {
+        "commission_amount": commission,
+        "commission_rate": round(commission / amount, 4) if amount else 0,
+        "net_amount": round(amount - commission, 2),
+    }
+
+
+async def get_pair_earnings(db: AsyncSession, pairs: List[Tuple[int, int]]) -> Dict[Tuple[int, int], float]:
+    """Lifetime earnings for (freelancer_id, client_id) pairs in one query"""
+
+    if not pairs:
+        return {}
+
+    result = await db.execute(
+        select(ClientEarnings.freelancer_id, ClientEarnings.client_id, ClientEarnings.total_earned)
+        .where(tuple_(ClientEarnings.freelancer_id, ClientEarnings.client_id).in_(list(set(pairs))))
+    )
+    return {(row.freelancer_id, row.client_id): row.total_earned for row in result.all()}
+
+
+async def compute_commission(db: AsyncSession, freelancer_id: int, client_id: int, amount: float) -> Dict[str, float]:
+    """Commission for a single release"""
+
+    earnings = await get_pair_earnings(db, [(freelancer_id, client_id)])
+    return calculate_commission(earnings.get((freelancer_id, client_id), 0), amount)
+
+
+async def compute_commissions_batch(
+    db: AsyncSession,
+    releases: List[Tuple[int, int, float]]
+) -> List[Dict[str, float]]:
+    """
+    Commissions for many releases, e.g. several milestones at once
+
+    Loads all pairs in one query. Releases for the same pair are applied in
+    order, so later ones see the earnings of earlier ones in the batch.
+
+    Args:
+        releases: (freelancer_id, client_id, amount) tuples
+
+    Returns:
+        One commission dict per release, in input order
+    """
+
+    earnings = await get_pair_earnings(db, [(f, c) for f, c, _ in releases])
+
+    results = []
+    for freelancer_id, client_id, amount in releases:
+        pair = (freelancer_id, client_id)
+        results.append(calculate_commission(earnings.get(pair, 0), amount))
+        earnings[pair] = earnings.get(pair, 0) + amount
+    return results
+
+
+async def record_earnings(db: AsyncSession, freelancer_id: int, client_id: int, amount: float):
+    """Add a released gross amount to the pair's lifetime earnings. Does not commit."""
+
+    stmt = pg_insert(ClientEarnings).values(
+        freelancer_id=freelancer_id,
+        client_id=client_id,
+        total_earned=amount
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ClientEarnings.freelancer_id, ClientEarnings.client_id],
+            set_={
+                "total_earned": ClientEarnings.total_earned + stmt.excluded.total_earned,
+                "updated_at": func.now()
+            }
+        )
+    )
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+from app.config import settings
+from app.core.redis_client import redis_client
+from app.database import AsyncSessionLocal
+from app.models.transaction import Transaction
+from app.services.monobank import monobank_service, MonobankError
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "invoice:idem:"
+LOCK_PREFIX = "invoice:idem:lock:"
+BY_INVOICE_PREFIX = "invoice:idem:by-invoice:"
+
+# In-process single-flight: concurrent duplicates share one upstream call
+_inflight: Dict[str, asyncio.Task] = {}
+
+# Persists whatever a new invoice is paying for (its pending Transaction)
+Recorder = Callable[[Dict], Awaitable[None]]
+
+
+def _cache_key(order_id: str, amount: int, idempotency_key: Optional[str]) -> str:
+    key = f"{order_id}:{amount}"
+    if idempotency_key:
+        key = f"{key}:{idempotency_key}"
+    return key
+
+
+def _is_live(invoice: Dict) -> bool:
+    remaining = invoice["expires_at"] - datetime.utcnow()
+    return remaining > timedelta(seconds=settings.INVOICE_REUSE_MIN_VALIDITY)
+
+
+def _dump(invoice: Dict) -> str:
+    return json.dumps({
+        "invoice_id": invoice["invoice_id"],
+        "payment_url": invoice["payment_url"],
+        "expires_at": invoice["expires_at"].isoformat()
+    })
+
+
+def _load(raw: Optional[str]) -> Optional[Dict]:
+    if not raw:
+        return None
+    data = json.loads(raw)
+    data["expires_at"] = datetime.fromisoformat(data["expires_at"])
+    return data
+
+
+def record_transaction(**fields) -> Recorder:
+    """Recorder that stores a pending Transaction with the given fields for the new invoice"""
+
+    async def record(invoice: Dict):
+        async with AsyncSessionLocal() as db:
+            db.add(Transaction(monobank_invoice_id=invoice["invoice_id"], **fields))
+            await db.commit()
+
+    return record
+
+
+async def create_invoice_once(
+    amount: int,
+    order_id: str,
+    destination: str,
+    record: Recorder,
+    idempotency_key: Optional[str] = None,
+    validity: int = 3600
+) -> Dict:
+    """
+    Create Monobank invoice at most once per order
+
+    Repeats of the same order_id + amount (+ Idempotency-Key, if sent) get
+    the cached invoice while it is still payable. Concurrent duplicates are
+    collapsed into one upstream request, in-process via a shared task and
+    across workers via a Redis lock.
+
+    `record` runs once per new invoice, in its own session, and must commit
+    what the invoice pays for. It runs before the invoice is cached, and
+    keeps running if the request is cancelled, so a reused invoice always
+    has its transaction for the webhook to settle. If it raises, the
+    invoice is cancelled and the error propagates.
+    """
+
+    key = _cache_key(order_id, amount, idempotency_key)
+
+    task = _inflight.get(key)
+    if task is not None:
+        return await asyncio.shield(task)
+
+    task = asyncio.ensure_future(_get_or_create(key, amount, order_id, destination, record, validity))
+    _inflight[key] = task
+    try:
+        return await asyncio.shield(task)
+    finally:
+        if task.done():
+            _inflight.pop(key, None)
+        else:
+            # Caller was cancelled; let the call finish for other waiters
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+
+async def _create_and_record(
+    amount: int,
+    order_id: str,
+    destination: str,
+    record: Recorder,
+    validity: int
+) -> Dict:
+    invoice = await monobank_service.create_invoice(
+        amount=amount, order_id=order_id, destination=destination, validity=validity
+    )
+    try:
+        await record(invoice)
+    except Exception:
+        try:
+            await monobank_service.cancel_invoice(invoice["invoice_id"])
+        except MonobankError:
+            pass  # Unpaid invoice expires on its own
+        raise
+    return invoice
+
+
+async def _get_or_create(
+    key: str,
+    amount: int,
+    order_id: str,
+    destination: str,
+    record: Recorder,
+    validity: int
+) -> Dict:
+    cache_key = CACHE_PREFIX + key
+    lock_key = LOCK_PREFIX + key
+
+    try:
+        cached = _load(await redis_client.get(cache_key))
+        if cached and _is_live(cached):
+            return cached
+
+        acquired = await redis_client.set(
+            lock_key, "1", nx=True, px=int(settings.INVOICE_CREATE_LOCK_TTL * 1000)
+        )
+    except RedisError as e:
+        # Without Redis we still dedupe in-process
+        logger.warning(f"Invoice idempotency store unavailable: {str(e)}")
+        return await _create_and_record(amount, order_id, destination, record, validity)
+
+    if not acquired:
+        return await _wait_for_other_worker(cache_key, lock_key)
+
+    try:
+        # Recorded before it's cached: nobody reuses an invoice without its transaction
+        invoice = await _create_and_record(amount, order_id, destination, record, validity)
+
+        ttl = max(1, validity - settings.INVOICE_REUSE_MIN_VALIDITY)
+        try:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.set(cache_key, _dump(invoice), ex=ttl)
+                pipe.set(BY_INVOICE_PREFIX + invoice["invoice_id"], cache_key, ex=ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Failed to cache invoice {invoice['invoice_id']}: {str(e)}")
+
+        return invoice
+    finally:
+        try:
+            await redis_client.delete(lock_key)
+        except RedisError:
+            pass  # Lock expires on its own
+
+
+async def _wait_for_other_worker(cache_key: str, lock_key: str) -> Dict:
+    """Poll for the invoice another worker is creating for the same order"""
+
+    deadline = time.monotonic() + settings.INVOICE_CREATE_LOCK_TTL
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+
+        try:
+            cached = _load(await redis_client.get(cache_key))
+            if cached and _is_live(cached):
+                return cached
+
+            if not await redis_client.exists(lock_key):
+                break
+        except RedisError as e:
+            # Can't tell whether the other worker finished; the client retries
+            logger.warning(f"Invoice idempotency store unavailable while waiting: {str(e)}")
+            break
+
+    raise HTTPException(
+        status_code=409,
+        detail="Payment for this order is already being created, please retry"
+    )
+
+
+async def forget_invoice(invoice_id: str):
+    """Stop reusing invoice once it is paid, failed or expired"""
+
+    try:
+        cache_key = await redis_client.get(BY_INVOICE_PREFIX + invoice_id)
+        keys = [BY_INVOICE_PREFIX + invoice_id]
+        if cache_key:
+            keys.append(cache_key)
+        await redis_client.delete(*keys)
+    except RedisError as e:
+        logger.warning(f"Failed to forget cached invoice {invoice_id}: {str(e)}")
\ No newline at end of file
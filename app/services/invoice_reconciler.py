@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from redis.exceptions import RedisError
+from sqlalchemy import select, tuple_
+from app.config import settings
+from app.core.redis_client import redis_client
+from app.database import AsyncSessionLocal
+from app.models.transaction import Transaction, TransactionStatus
+from app.services.monobank import MonobankService, monobank_service
+from app.services.payment_processing import apply_invoice_status
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = "invoice-reconciler:lock"
+
+
+class RequestPacer:
+    """Spaces out calls to at most `rate` per second across coroutines"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def _fetch_status(
+    service: MonobankService,
+    invoice_id: str,
+    semaphore: asyncio.Semaphore,
+    pacer: RequestPacer
+) -> Tuple[str, Optional[str]]:
+    async with semaphore:
+        await pacer.wait()
+        try:
+            data = await service.check_invoice_status(invoice_id)
+            return invoice_id, data.get("status")
+        except Exception as e:
+            logger.warning(f"Failed to check invoice {invoice_id}: {str(e)}")
+            return invoice_id, None
+
+
+async def reconcile_pending_invoices(
+    service: MonobankService = monobank_service,
+    stale_after: Optional[timedelta] = None,
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    rate: Optional[float] = None
+) -> Dict[str, int]:
+    """
+    Resolve pending invoice transactions whose webhook never arrived
+
+    Pages through stale PENDING transactions by (created_at, id), queries
+    Monobank for each page with bounded concurrency and a request rate cap,
+    and applies final statuses through the webhook state machine. No DB
+    connection is held while waiting on Monobank.
+
+    Returns:
+        Counters: checked, updated, failed
+    """
+
+    stale_after = stale_after or timedelta(seconds=settings.INVOICE_RECONCILE_STALE_AFTER)
+    batch_size = batch_size or settings.INVOICE_RECONCILE_BATCH_SIZE
+    semaphore = asyncio.Semaphore(concurrency or settings.INVOICE_RECONCILE_CONCURRENCY)
+    pacer = RequestPacer(rate or settings.INVOICE_RECONCILE_RATE)
+
+    cutoff = datetime.utcnow() - stale_after
+    position = None
+    stats = {"checked": 0, "updated": 0, "failed": 0}
+
+    while True:
+        async with AsyncSessionLocal() as db:
+            query = select(
+                Transaction.id,
+                Transaction.created_at,
+                Transaction.monobank_invoice_id
+            ).where(
+                Transaction.status == TransactionStatus.PENDING,
+                Transaction.monobank_invoice_id.isnot(None),
+                Transaction.created_at < cutoff
+            )
+            if position:
+                query = query.where(tuple_(Transaction.created_at, Transaction.id) > position)
+            result = await db.execute(
+                query.order_by(Transaction.created_at, Transaction.id).limit(batch_size)
+            )
+            rows = result.all()
+
+        if not rows:
+            break
+        position = (rows[-1].created_at, rows[-1].id)
+
+        statuses: List[Tuple[str, Optional[str]]] = await asyncio.gather(*[
+            _fetch_status(service, row.monobank_invoice_id, semaphore, pacer)
+            for row in rows
+        ])
+        stats["checked"] += len(statuses)
+
+        async with AsyncSessionLocal() as db:
+            for invoice_id, invoice_status in statuses:
+                if invoice_status is None:
+                    stats["failed"] += 1
+                    continue
+
+                try:
+                    async with db.begin_nested():
+                        transaction = await apply_invoice_status(db, invoice_id, invoice_status)
+                except Exception:
+                    logger.exception(f"Failed to apply status {invoice_status} to invoice {invoice_id}")
+                    stats["failed"] += 1
+                    continue
+
+                if transaction and transaction.status != TransactionStatus.PENDING:
+                    stats["updated"] += 1
+            await db.commit()
+
+        if len(rows) < batch_size:
+            break
+
+    return stats
+
+
+async def run_invoice_reconciler():
+    """Periodically reconcile stale invoices until cancelled"""
+
+    logger.info("Invoice reconciler started")
+
+    while True:
+        await asyncio.sleep(settings.INVOICE_RECONCILE_INTERVAL)
+
+        try:
+            # One reconciler per deployment, not per worker process
+            if not await redis_client.set(LOCK_KEY, "1", nx=True, ex=settings.INVOICE_RECONCILE_INTERVAL):
+                continue
+        except RedisError as e:
+            logger.warning(f"Invoice reconciler lock unavailable: {str(e)}")
+            continue
+
+        try:
+            stats = await reconcile_pending_invoices()
+            if stats["checked"]:
+                logger.info(f"Invoice reconciliation: {stats}")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Invoice reconciliation failed")
\ No newline at end of file
@@ -0,0 +1,235 @@
+"""
+Per-user ledger balances
+
+Balances are materialised in `ledger_balances` and moved by postings in the
+same database transaction as the `transactions` row they account for:
+
+- available: completed escrow/milestone releases received (net of
+  commission) minus withdrawals (amount + fee) that are open or completed,
+  plus the opening balance carried over from `users.total_earned`
+- pending: withdrawals (amount + fee) still pending or processing
+- escrowed: escrow/milestone funding paid by the user as client, minus
+  releases and refunds drawn from it (recorded with the client as payer)
+
+`reconcile_balances` recomputes the same figures from `transactions`.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func, case, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Dict, List
+import logging
+from app.models.ledger import LedgerBalance
+from app.models.transaction import Transaction, TransactionType, TransactionStatus
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+FUNDING_TYPES = [TransactionType.ESCROW_FUND, TransactionType.MILESTONE_FUND]
+RELEASE_TYPES = [TransactionType.ESCROW_RELEASE, TransactionType.MILESTONE_RELEASE]
+ESCROW_DEBIT_TYPES = RELEASE_TYPES + [TransactionType.ESCROW_REFUND]
+OPEN_WITHDRAWAL_STATUSES = [TransactionStatus.PENDING, TransactionStatus.PROCESSING]
+
+# Float columns: differences below this are rounding noise
+TOLERANCE = 0.01
+
+
+async def post(
+    db: AsyncSession,
+    user_id: int,
+    available: float = 0,
+    pending: float = 0,
+    escrowed: float = 0
+):
+    """Apply balance deltas with a single atomic upsert. Does not commit."""
+
+    stmt = pg_insert(LedgerBalance).values(
+        user_id=user_id,
+        available=available,
+        pending=pending,
+        escrowed=escrowed
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[LedgerBalance.user_id],
+            set_={
+                "available": LedgerBalance.available + stmt.excluded.available,
+                "pending": LedgerBalance.pending + stmt.excluded.pending,
+                "escrowed": LedgerBalance.escrowed + stmt.excluded.escrowed,
+                "updated_at": func.now()
+            }
+        )
+    )
+
+
+async def reserve_funds(db: AsyncSession, user_id: int, amount: float) -> bool:
+    """
+    Move amount from available to pending if the balance covers it
+
+    One conditional UPDATE, so concurrent withdrawals cannot both pass the
+    check. Does not commit.
+
+    Returns:
+        False if the available balance is insufficient
+    """
+
+    result = await db.execute(
+        update(LedgerBalance)
+        .where(LedgerBalance.user_id == user_id, LedgerBalance.available >= amount)
+        .values(
+            available=LedgerBalance.available - amount,
+            pending=LedgerBalance.pending + amount,
+            updated_at=func.now()
+        )
+        .returning(LedgerBalance.user_id)
+    )
+    return result.scalar_one_or_none() is not None
+
+
+async def settle_withdrawal(db: AsyncSession, transaction: Transaction, succeeded: bool):
+    """Clear a withdrawal reservation, returning funds on failure. Does not commit."""
+
+    amount = transaction.amount + (transaction.commission_amount or 0)
+    await post(
+        db,
+        transaction.payee_id,
+        available=0 if succeeded else amount,
+        pending=-amount
+    )
+
+
+async def get_balance(db: AsyncSession, user_id: int) -> Dict[str, float]:
+    """Get user's balances (zeros if nothing was ever posted)"""
+
+    result = await db.execute(
+        select(LedgerBalance.available, LedgerBalance.pending, LedgerBalance.escrowed)
+        .where(LedgerBalance.user_id == user_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return {"available": 0, "pending": 0, "escrowed": 0}
+    return {"available": row.available, "pending": row.pending, "escrowed": row.escrowed}
+
+
+async def expected_balances(db: AsyncSession, user_ids: List[int]) -> Dict[int, Dict[str, float]]:
+    """Recompute balances for a batch of users from transactions"""
+
+    completed = Transaction.status == TransactionStatus.COMPLETED
+    withdrawal_total = Transaction.amount + func.coalesce(Transaction.commission_amount, 0)
+    is_withdrawal = Transaction.transaction_type == TransactionType.WITHDRAWAL
+
+    payee_result = await db.execute(
+        select(
+            Transaction.payee_id.label("user_id"),
+            func.sum(case(
+                (and_(Transaction.transaction_type.in_(RELEASE_TYPES), completed),
+                 func.coalesce(Transaction.net_amount, Transaction.amount)),
+                else_=0
+            )).label("released"),
+            func.sum(case(
+                (and_(is_withdrawal, Transaction.status.in_(OPEN_WITHDRAWAL_STATUSES)), withdrawal_total),
+                else_=0
+            )).label("withdrawing"),
+            func.sum(case(
+                (and_(is_withdrawal, completed), withdrawal_total),
+                else_=0
+            )).label("withdrawn")
+        )
+        .where(Transaction.payee_id.in_(user_ids))
+        .group_by(Transaction.payee_id)
+    )
+
+    payer_result = await db.execute(
+        select(
+            Transaction.payer_id.label("user_id"),
+            func.sum(case(
+                (and_(Transaction.transaction_type.in_(FUNDING_TYPES), completed), Transaction.amount),
+                else_=0
+            )).label("funded"),
+            func.sum(case(
+                (and_(Transaction.transaction_type.in_(ESCROW_DEBIT_TYPES), completed), Transaction.amount),
+                else_=0
+            )).label("drawn")
+        )
+        .where(Transaction.payer_id.in_(user_ids))
+        .group_by(Transaction.payer_id)
+    )
+
+    opening_result = await db.execute(
+        select(LedgerBalance.user_id, LedgerBalance.opening_available)
+        .where(LedgerBalance.user_id.in_(user_ids), LedgerBalance.opening_available != 0)
+    )
+
+    expected = {user_id: {"available": 0, "pending": 0, "escrowed": 0} for user_id in user_ids}
+    for row in opening_result.all():
+        expected[row.user_id]["available"] = row.opening_available
+    for row in payee_result.all():
+        expected[row.user_id]["available"] += (row.released or 0) - (row.withdrawing or 0) - (row.withdrawn or 0)
+        expected[row.user_id]["pending"] = row.withdrawing or 0
+    for row in payer_result.all():
+        expected[row.user_id]["escrowed"] = (row.funded or 0) - (row.drawn or 0)
+
+    return expected
+
+
+async def reconcile_balances(db: AsyncSession, batch_size: int = 500, fix: bool = False) -> List[Dict]:
+    """
+    Verify ledger balances against transactions, batch by batch of users
+
+    Args:
+        batch_size: Users per batch
+        fix: Overwrite mismatching balances with the recomputed values
+
+    Returns:
+        List of mismatches found
+    """
+
+    mismatches = []
+    last_user_id = 0
+
+    while True:
+        user_result = await db.execute(
+            select(User.id).where(User.id > last_user_id).order_by(User.id).limit(batch_size)
+        )
+        user_ids = user_result.scalars().all()
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+
+        # When fixing, lock balances first so postings cannot land between
+        # recomputing and overwriting
+        ledger_query = select(LedgerBalance).where(LedgerBalance.user_id.in_(user_ids))
+        if fix:
+            ledger_query = ledger_query.with_for_update()
+        ledger_result = await db.execute(ledger_query)
+
+        expected = await expected_balances(db, user_ids)
+        actual = {balance.user_id: balance for balance in ledger_result.scalars().all()}
+
+        for user_id in user_ids:
+            balance = actual.get(user_id)
+            actual_values = {
+                "available": balance.available if balance else 0,
+                "pending": balance.pending if balance else 0,
+                "escrowed": balance.escrowed if balance else 0,
+            }
+            if all(abs(actual_values[k] - expected[user_id][k]) < TOLERANCE for k in actual_values):
+                continue
+
+            logger.warning(f"Ledger mismatch for user {user_id}: {actual_values} != {expected[user_id]}")
+            mismatches.append({"user_id": user_id, "actual": actual_values, "expected": expected[user_id]})
+
+            if fix:
+                await db.execute(
+                    pg_insert(LedgerBalance)
+                    .values(user_id=user_id, **expected[user_id])
+                    .on_conflict_do_update(
+                        index_elements=[LedgerBalance.user_id],
+                        set_={**expected[user_id], "updated_at": func.now()}
+                    )
+                )
+
+        if fix:
+            await db.commit()
+
+    return mismatches
\ No newline at end of file
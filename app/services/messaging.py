@@ -0,0 +1,298 @@
+"""
+WebSocket messaging gateway
+
+Each worker process keeps its own connections. A sent message is stored in
+`messages` and published once to the `messaging:deliver` Redis channel with
+its recipients (receiver and sender, for the sender's other devices). Every
+worker subscribes to that channel and hands the frame to whichever
+recipients it has connected locally. One channel for all workers keeps
+subscriptions fixed however many users connect; every worker sees every
+message, which is cheap next to the socket writes.
+
+Backpressure:
+
+- inbound: frames of a connection are handled one at a time, so a client
+  that sends faster than messages are stored stops being read (and TCP
+  pushes back), and sends above MESSAGING_MAX_SENDS_PER_SECOND are refused
+- outbound: every connection has a bounded send queue drained by its own
+  writer task; a client that can't keep up (queue full, or a write taking
+  longer than MESSAGING_SEND_TIMEOUT) is disconnected with 1013 and is
+  expected to reconnect and catch up from message history
+
+Open connections are reported to presence as heartbeats in one batch. On
+the same timer their tokens are checked again, so a socket stops within a
+heartbeat interval of logout (revoked jti) or a token version bump (role,
+verification or deactivation changes) instead of living until the token
+expires.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Set
+from fastapi import WebSocket
+from redis.exceptions import RedisError
+from starlette.websockets import WebSocketState
+from app.config import settings
+from app.core.metrics import Counter, Gauge
+from app.core.principal_cache import get_token_versions
+from app.core.redis_client import redis_client
+from app.core.token_revocation import is_revoked
+from app.database import AsyncSessionLocal
+from app.models.message import Message
+from app.services import presence
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "messaging:deliver"
+
+# Close codes
+CLOSE_TRY_AGAIN_LATER = 1013
+CLOSE_POLICY_VIOLATION = 1008
+
+MESSAGING_CONNECTIONS = Gauge(
+    "messaging_connections",
+    "Open messaging WebSocket connections in this process"
+)
+MESSAGING_FRAMES = Counter(
+    "messaging_frames_total",
+    "Messaging frames by direction",
+    ["direction"]
+)
+MESSAGING_DISCONNECTS = Counter(
+    "messaging_forced_disconnects_total",
+    "Connections closed by the gateway",
+    ["reason"]
+)
+
+
+def serialize_message(message: Message) -> Dict:
+    return {
+        "id": message.id,
+        "sender_id": message.sender_id,
+        "receiver_id": message.receiver_id,
+        "project_id": message.project_id,
+        "content": message.content,
+        "attachments": json.loads(message.attachments) if message.attachments else None,
+        "is_read": bool(message.is_read),
+        "created_at": message.created_at.isoformat() if message.created_at else None
+    }
+
+
+class Connection:
+    """One client socket with its bounded send queue"""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        jti: Optional[str] = None,
+        token_version: Optional[int] = None
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        # Of the access token the socket was opened with, for revalidation
+        self.jti = jti
+        self.token_version = token_version
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.MESSAGING_SEND_QUEUE_SIZE)
+        self.closing = False
+        self._writer: Optional[asyncio.Task] = None
+        self._sends: List[float] = []
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def send(self, frame: str):
+        """Queue a serialized frame without waiting; disconnects slow clients"""
+        if self.closing:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.close(CLOSE_TRY_AGAIN_LATER, "slow_consumer")
+
+    def allow_send(self) -> bool:
+        """Sliding one-second window of client sends"""
+        now = time.monotonic()
+        self._sends = [sent_at for sent_at in self._sends if now - sent_at < 1]
+        if len(self._sends) >= settings.MESSAGING_MAX_SENDS_PER_SECOND:
+            return False
+        self._sends.append(now)
+        return True
+
+    def close(self, code: int, reason: str):
+        if self.closing:
+            return
+        self.closing = True
+        MESSAGING_DISCONNECTS.inc(reason=reason)
+        task = asyncio.create_task(self._close(code))
+        _close_tasks.add(task)
+        task.add_done_callback(_close_tasks.discard)
+
+    async def _close(self, code: int):
+        try:
+            if self.websocket.application_state == WebSocketState.CONNECTED:
+                await self.websocket.close(code=code)
+        except Exception:
+            pass  # Already gone
+
+    async def _write_loop(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                try:
+                    await asyncio.wait_for(
+                        self.websocket.send_text(frame), timeout=settings.MESSAGING_SEND_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    self.close(CLOSE_TRY_AGAIN_LATER, "send_timeout")
+                    return
+                MESSAGING_FRAMES.inc(direction="out")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Socket closed under us; the reader notices and unregisters
+            self.closing = True
+
+    async def stop(self):
+        if self._writer:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+
+
+class ConnectionManager:
+    """Connections of this worker by user"""
+
+    def __init__(self):
+        self.connections: Dict[int, Set[Connection]] = {}
+        self.count = 0
+
+    def register(self, connection: Connection) -> Optional[str]:
+        """Add a connection, or return why it was refused"""
+        if self.count >= settings.MESSAGING_MAX_CONNECTIONS:
+            return "worker_full"
+        user_connections = self.connections.setdefault(connection.user_id, set())
+        if len(user_connections) >= settings.MESSAGING_MAX_CONNECTIONS_PER_USER:
+            return "too_many_connections"
+        user_connections.add(connection)
+        self.count += 1
+        MESSAGING_CONNECTIONS.set(self.count)
+        connection.start()
+        return None
+
+    async def unregister(self, connection: Connection):
+        user_connections = self.connections.get(connection.user_id)
+        if user_connections and connection in user_connections:
+            user_connections.discard(connection)
+            if not user_connections:
+                del self.connections[connection.user_id]
+            self.count -= 1
+            MESSAGING_CONNECTIONS.set(self.count)
+        await connection.stop()
+
+    def deliver(self, user_ids: List[int], frame: str):
+        for user_id in user_ids:
+            for connection in list(self.connections.get(user_id, ())):
+                connection.send(frame)
+
+
+manager = ConnectionManager()
+_close_tasks: Set[asyncio.Task] = set()
+
+
+async def publish(user_ids: List[int], frame: str):
+    """Deliver a frame to the users' connections on every worker"""
+    try:
+        await redis_client.publish(CHANNEL, json.dumps({"to": user_ids, "frame": frame}))
+    except RedisError as e:
+        # Other workers miss it; their clients catch up from history
+        logger.warning(f"Messaging fan-out unavailable, delivering locally: {str(e)}")
+        manager.deliver(user_ids, frame)
+
+
+async def store_message(sender_id: int, data) -> Dict:
+    """Persist a MessageCreate from sender and return it serialized"""
+
+    async with AsyncSessionLocal() as db:
+        message = Message(
+            sender_id=sender_id,
+            receiver_id=data.receiver_id,
+            project_id=data.project_id,
+            content=data.content,
+            attachments=json.dumps(data.attachments) if data.attachments else None
+        )
+        db.add(message)
+        await db.commit()
+        await db.refresh(message)
+        return serialize_message(message)
+
+
+async def _listen():
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    try:
+        await pubsub.subscribe(CHANNEL)
+        while True:
+            # Short reads so the pool's socket timeout never fires on an idle channel
+            event = await pubsub.get_message(timeout=min(1.0, settings.REDIS_SOCKET_TIMEOUT))
+            if event is None:
+                continue
+            try:
+                data = json.loads(event["data"])
+                manager.deliver(data["to"], data["frame"])
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Dropping malformed messaging event")
+    finally:
+        await pubsub.aclose()
+
+
+async def _revalidate():
+    """Close connections whose token was revoked or whose user's token version moved on"""
+
+    connections = [
+        connection
+        for user_connections in list(manager.connections.values())
+        for connection in list(user_connections)
+        if not connection.closing
+    ]
+    token_versions = await get_token_versions(
+        connection.user_id for connection in connections if connection.token_version is not None
+    )
+    for connection in connections:
+        if await is_revoked(connection.jti) or (
+            connection.token_version is not None
+            and token_versions.get(connection.user_id) != connection.token_version
+        ):
+            connection.close(CLOSE_POLICY_VIOLATION, "token_revoked")
+
+
+async def _heartbeats():
+    while True:
+        await asyncio.sleep(settings.PRESENCE_HEARTBEAT_INTERVAL)
+        await presence.touch_many(list(manager.connections))
+        try:
+            await _revalidate()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to revalidate messaging connections: {str(e)}")
+
+
+async def run_messaging_gateway():
+    """Fan-out listener and presence heartbeats of this worker, until cancelled"""
+
+    logger.info("Messaging gateway started")
+
+    heartbeats = asyncio.create_task(_heartbeats())
+    try:
+        while True:
+            try:
+                await _listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Messaging fan-out listener failed, reconnecting: {str(e)}")
+                await asyncio.sleep(1)
+    finally:
+        heartbeats.cancel()
+        await asyncio.gather(heartbeats, return_exceptions=True)
@@ -0,0 +1,167 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func
+from datetime import datetime
+from typing import Dict, List, Sequence
+import json
+from app.models.milestone import ProjectMilestone, MilestoneStatus
+from app.models.transaction import Transaction, TransactionType, TransactionStatus
+from app.models.user import User
+from app.core.principal_cache import mark_user_changed
+from app.services import ledger
+from app.services.commission import compute_commissions_batch, record_earnings
+
+async def get_pending(db: AsyncSession, project_id: int, milestone_ids: Sequence[int]) -> List[ProjectMilestone]:
+    """Unfunded milestones of the project among the given ids"""
+
+    result = await db.execute(
+        select(ProjectMilestone)
+        .where(
+            ProjectMilestone.project_id == project_id,
+            ProjectMilestone.id.in_(milestone_ids),
+            ProjectMilestone.status == MilestoneStatus.PENDING
+        )
+        .order_by(ProjectMilestone.position)
+    )
+    return list(result.scalars().all())
+
+
+async def claim_for_funding(db: AsyncSession, transaction: Transaction, milestone_ids: Sequence[int]) -> bool:
+    """
+    Tie milestones to a funding transaction, all or nothing
+
+    Guards against two invoices paying for the same milestone; the claim is
+    dropped again if the payment fails. Does not commit; roll back when
+    this returns False.
+    """
+
+    result = await db.execute(
+        update(ProjectMilestone)
+        .where(
+            ProjectMilestone.project_id == transaction.project_id,
+            ProjectMilestone.id.in_(milestone_ids),
+            ProjectMilestone.status == MilestoneStatus.PENDING,
+            ProjectMilestone.funding_transaction_id.is_(None)
+        )
+        .values(funding_transaction_id=transaction.id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == len(milestone_ids)
+
+
+async def release_claim(db: AsyncSession, transaction: Transaction):
+    """Make milestones fundable again after their payment failed. Does not commit."""
+
+    await db.execute(
+        update(ProjectMilestone)
+        .where(
+            ProjectMilestone.funding_transaction_id == transaction.id,
+            ProjectMilestone.status == MilestoneStatus.PENDING
+        )
+        .values(funding_transaction_id=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def mark_funded(db: AsyncSession, transaction: Transaction):
+    """Mark milestones paid by a completed funding transaction. Does not commit."""
+
+    metadata = json.loads(transaction.extra_data or "{}")
+    milestone_ids = metadata.get("milestone_ids") or [metadata.get("milestone_id")]
+
+    await db.execute(
+        update(ProjectMilestone)
+        .where(
+            ProjectMilestone.project_id == transaction.project_id,
+            ProjectMilestone.id.in_([m for m in milestone_ids if m is not None]),
+            ProjectMilestone.status == MilestoneStatus.PENDING
+        )
+        .values(
+            status=MilestoneStatus.FUNDED,
+            funded_at=transaction.completed_at or datetime.utcnow(),
+            funding_transaction_id=transaction.id
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def release(
+    db: AsyncSession,
+    project_id: int,
+    client_id: int,
+    freelancer_id: int,
+    milestones: List[ProjectMilestone]
+) -> List[Dict]:
+    """
+    Release funded milestones to the freelancer
+
+    Commissions for the whole batch are computed with one earnings lookup.
+    Each milestone gets its own completed MILESTONE_RELEASE transaction
+    (client as payer, freelancer as payee), while ledger, pair earnings and
+    user totals are moved once for the batch. Does not commit.
+
+    Returns:
+        One dict per milestone: milestone_id, transaction_id, amount,
+        commission_amount, commission_rate, net_amount
+    """
+
+    commissions = await compute_commissions_batch(
+        db, [(freelancer_id, client_id, milestone.amount) for milestone in milestones]
+    )
+
+    now = datetime.utcnow()
+    transactions = []
+    for milestone, commission in zip(milestones, commissions):
+        transaction = Transaction(
+            payer_id=client_id,
+            payee_id=freelancer_id,
+            project_id=project_id,
+            transaction_type=TransactionType.MILESTONE_RELEASE,
+            amount=milestone.amount,
+            commission_amount=commission["commission_amount"],
+            commission_rate=commission["commission_rate"],
+            net_amount=commission["net_amount"],
+            status=TransactionStatus.COMPLETED,
+            completed_at=now,
+            description=f"Milestone release: {milestone.title}",
+            extra_data=json.dumps({"milestone_id": milestone.id})
+        )
+        db.add(transaction)
+        transactions.append(transaction)
+
+    await db.flush()
+
+    for milestone, transaction in zip(milestones, transactions):
+        milestone.status = MilestoneStatus.RELEASED
+        milestone.released_at = now
+        milestone.release_transaction_id = transaction.id
+
+    gross = sum(milestone.amount for milestone in milestones)
+    net = sum(commission["net_amount"] for commission in commissions)
+
+    await ledger.post(db, freelancer_id, available=net)
+    await ledger.post(db, client_id, escrowed=-gross)
+    await record_earnings(db, freelancer_id, client_id, gross)
+
+    await db.execute(
+        update(User)
+        .where(User.id == freelancer_id)
+        .values(total_earned=func.coalesce(User.total_earned, 0) + net)
+    )
+    await db.execute(
+        update(User)
+        .where(User.id == client_id)
+        .values(total_spent=func.coalesce(User.total_spent, 0) + gross)
+    )
+    mark_user_changed(db, freelancer_id, client_id)
+
+    return [
+        {
+            "milestone_id": milestone.id,
+            "transaction_id": transaction.id,
+            "amount": transaction.amount,
+            "commission_amount": transaction.commission_amount,
+            "commission_rate": transaction.commission_rate,
+            "net_amount": transaction.net_amount
+        }
+        for milestone, transaction in zip(milestones, transactions)
+    ]
\ No newline at end of file
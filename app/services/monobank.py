@@ -1,10 +1,52 @@
 import httpx
+import asyncio
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict
 import hmac
 import hashlib
 import base64
+import binascii
+import logging
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
 from app.config import settings
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.core.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses worth retrying for idempotent calls
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+MONOBANK_LATENCY = Histogram(
+    "monobank_request_duration_seconds",
+    "Monobank call latency per operation, including retries",
+    ["operation", "outcome"]
+)
+MONOBANK_ERRORS = Counter(
+    "monobank_request_errors_total",
+    "Failed Monobank calls per operation and reason",
+    ["operation", "reason"]
+)
+WEBHOOK_SIGNATURES = Counter(
+    "monobank_webhook_signatures_total",
+    "Webhook signature checks per result",
+    ["result"]
+)
+
+
+class MonobankError(Exception):
+    """Monobank rejected the request"""
+
+
+class MonobankUnavailable(MonobankError):
+    """Monobank is unreachable, too slow, or the circuit is open"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 class MonobankService:
@@ -16,6 +58,141 @@ class MonobankService:
         self.token = settings.MONOBANK_TOKEN
         self.webhook_url = settings.MONOBANK_WEBHOOK_URL
         self.merchant_id = settings.MONOBANK_MERCHANT_ID
+        self.base_url = settings.MONOBANK_API_URL or self.BASE_URL
+        self._client: Optional[httpx.AsyncClient] = None
+        self._public_key: Optional[ec.EllipticCurvePublicKey] = None
+        self._public_key_attempted_at = float("-inf")
+        self._public_key_lock = asyncio.Lock()
+        self.breaker = CircuitBreaker(
+            "monobank",
+            failure_threshold=settings.MONOBANK_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.MONOBANK_BREAKER_RESET_TIMEOUT,
+            half_open_max_calls=settings.MONOBANK_BREAKER_HALF_OPEN_MAX_CALLS
+        )
+    
+    async def start(self):
+        """Open the shared keep-alive client (called from app lifespan)"""
+        
+        if self._client is not None:
+            return
+        
+        # Transport-level retries only cover connection failures, where the
+        # request never reached Monobank, so they are safe for every call
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=settings.MONOBANK_CONNECT_RETRIES,
+            limits=httpx.Limits(
+                max_connections=settings.MONOBANK_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.MONOBANK_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.MONOBANK_KEEPALIVE_EXPIRY
+            )
+        )
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=transport,
+            timeout=httpx.Timeout(
+                connect=settings.MONOBANK_CONNECT_TIMEOUT,
+                read=settings.MONOBANK_READ_TIMEOUT,
+                write=settings.MONOBANK_READ_TIMEOUT,
+                pool=settings.MONOBANK_CONNECT_TIMEOUT
+            ),
+            headers={"X-Token": self.token}
+        )
+    
+    async def close(self):
+        """Close the shared client (called from app lifespan)"""
+        
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _request(self, method: str, path: str, idempotent: bool = False, **kwargs) -> httpx.Response:
+        """
+        Send request through the shared client
+        
+        Idempotent calls are additionally retried with backoff on timeouts
+        and transient upstream errors; non-idempotent calls are sent once.
+        """
+        
+        if self._client is None:
+            # Outside the app lifespan (scripts, shell)
+            await self.start()
+        
+        attempts = 1 + (settings.MONOBANK_IDEMPOTENT_RETRIES if idempotent else 0)
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                response = await self._client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                if last_attempt:
+                    raise
+                logger.warning(f"Monobank {method} {path} failed ({e!r}), retrying")
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+                    return response
+                logger.warning(f"Monobank {method} {path} returned {response.status_code}, retrying")
+            
+            await asyncio.sleep(settings.MONOBANK_RETRY_BACKOFF * 2 ** attempt)
+    
+    async def _call(
+        self,
+        operation: str,
+        timeout: float,
+        method: str,
+        path: str,
+        idempotent: bool = False,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Send request guarded by the circuit breaker and a total time budget
+        
+        The budget covers all retries. Timeouts, transport errors and 5xx/429
+        responses count as failures; other 4xx responses are Monobank
+        answering normally and count as successes.
+        
+        Raises:
+            MonobankUnavailable: Circuit open, budget exceeded or upstream down
+        """
+        
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as e:
+            MONOBANK_ERRORS.inc(operation=operation, reason="circuit_open")
+            raise MonobankUnavailable("Payment provider temporarily unavailable", e.retry_after)
+        
+        started = time.perf_counter()
+        outcome = None
+        try:
+            response = await asyncio.wait_for(
+                self._request(method, path, idempotent, **kwargs),
+                timeout=timeout
+            )
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise MonobankUnavailable(f"Monobank {operation} timed out after {timeout}s")
+        except httpx.TransportError as e:
+            outcome = "transport_error"
+            raise MonobankUnavailable(f"Monobank {operation} failed: {e!r}")
+        else:
+            if response.status_code >= 500 or response.status_code == 429:
+                outcome = f"http_{response.status_code}"
+                raise MonobankUnavailable(f"Monobank {operation} returned {response.status_code}")
+            outcome = "ok" if response.status_code < 400 else "rejected"
+            return response
+        finally:
+            outcome = outcome or "error"
+            if outcome == "cancelled":
+                # Caller went away: no verdict on Monobank's health
+                self.breaker.release()
+            elif outcome in ("ok", "rejected"):
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+                MONOBANK_ERRORS.inc(operation=operation, reason=outcome)
+            MONOBANK_LATENCY.observe(time.perf_counter() - started, operation=operation, outcome=outcome)
     
     async def create_invoice(
         self,
@@ -39,11 +216,6 @@ class MonobankService:
             Dict with invoice_id and payment_url
         """
         
-        headers = {
-            "X-Token": self.token,
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "amount": amount,
             "ccy": 980,  # UAH currency code
@@ -65,71 +237,150 @@ class MonobankService:
             "validity": validity
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.BASE_URL}/api/merchant/invoice/create",
-                json=payload,
-                headers=headers
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Monobank API error: {response.text}")
-            
-            data = response.json()
-            return {
-                "invoice_id": data["invoiceId"],
-                "payment_url": data["pageUrl"],
-                "expires_at": datetime.utcnow() + timedelta(seconds=validity)
-            }
+        response = await self._call(
+            "create_invoice",
+            settings.MONOBANK_CREATE_INVOICE_TIMEOUT,
+            "POST",
+            "/api/merchant/invoice/create",
+            json=payload
+        )
+        
+        if response.status_code != 200:
+            raise MonobankError(f"Monobank API error: {response.text}")
+        
+        data = response.json()
+        return {
+            "invoice_id": data["invoiceId"],
+            "payment_url": data["pageUrl"],
+            "expires_at": datetime.utcnow() + timedelta(seconds=validity)
+        }
     
     async def check_invoice_status(self, invoice_id: str) -> Dict:
         """Check invoice payment status"""
         
-        headers = {
-            "X-Token": self.token
-        }
+        response = await self._call(
+            "invoice_status",
+            settings.MONOBANK_STATUS_TIMEOUT,
+            "GET",
+            "/api/merchant/invoice/status",
+            idempotent=True,
+            params={"invoiceId": invoice_id}
+        )
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.BASE_URL}/api/merchant/invoice/status?invoiceId={invoice_id}",
-                headers=headers
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Monobank API error: {response.text}")
-            
-            return response.json()
+        if response.status_code != 200:
+            raise MonobankError(f"Monobank API error: {response.text}")
+        
+        return response.json()
     
     async def cancel_invoice(self, invoice_id: str) -> bool:
         """Cancel unpaid invoice"""
         
-        headers = {
-            "X-Token": self.token,
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "invoiceId": invoice_id
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.BASE_URL}/api/merchant/invoice/cancel",
-                json=payload,
-                headers=headers
+        # Cancelling an already cancelled invoice is a no-op upstream
+        response = await self._call(
+            "cancel_invoice",
+            settings.MONOBANK_CANCEL_TIMEOUT,
+            "POST",
+            "/api/merchant/invoice/cancel",
+            idempotent=True,
+            json=payload
+        )
+        
+        return response.status_code == 200
+    
+    async def refresh_public_key(self) -> bool:
+        """
+        Fetch merchant public key used to sign webhooks
+        
+        Returns:
+            False if the key could not be fetched; the cached key is kept
+        """
+        
+        self._public_key_attempted_at = time.monotonic()
+        try:
+            response = await self._call(
+                "pubkey",
+                settings.MONOBANK_PUBKEY_TIMEOUT,
+                "GET",
+                "/api/merchant/pubkey",
+                idempotent=True
             )
+            if response.status_code != 200:
+                raise MonobankError(f"Monobank API error: {response.text}")
             
-            return response.status_code == 200
+            pem = base64.b64decode(response.json()["key"])
+            public_key = serialization.load_pem_public_key(pem)
+            if not isinstance(public_key, ec.EllipticCurvePublicKey):
+                raise MonobankError("Monobank public key is not an EC key")
+        except Exception as e:
+            logger.error(f"Failed to refresh Monobank public key: {str(e)}")
+            return False
+        
+        self._public_key = public_key
+        return True
+    
+    def _check_signature(self, body: bytes, signature: bytes) -> bool:
+        if self._public_key is None:
+            return False
+        try:
+            self._public_key.verify(signature, body, ec.ECDSA(hashes.SHA256()))
+            return True
+        except InvalidSignature:
+            return False
     
-    def verify_webhook_signature(self, body: bytes, x_sign: str) -> bool:
-        """Verify webhook signature from Monobank"""
+    async def verify_webhook_signature(self, body: bytes, x_sign: Optional[str]) -> bool:
+        """
+        Verify X-Sign header (base64 ECDSA/SHA-256) over the raw webhook body
+        
+        Uses the cached public key, so the common case is a local check. On
+        failure the key is re-fetched once, at most every
+        MONOBANK_PUBKEY_MIN_REFRESH_INTERVAL seconds, in case Monobank
+        rotated it; forged requests can't trigger a fetch per webhook.
+        """
         
         if not self.webhook_url:
             return True  # Skip verification in development
         
-        # Monobank uses ECDSA signature, for now we'll trust the webhook
-        # In production, implement proper ECDSA verification
-        return True
+        if not x_sign:
+            WEBHOOK_SIGNATURES.inc(result="missing")
+            return False
+        
+        try:
+            signature = base64.b64decode(x_sign, validate=True)
+        except (binascii.Error, ValueError):
+            WEBHOOK_SIGNATURES.inc(result="malformed")
+            return False
+        
+        if self._check_signature(body, signature):
+            WEBHOOK_SIGNATURES.inc(result="valid")
+            return True
+        
+        # Key may have been rotated (or never loaded): refresh once and retry
+        public_key = self._public_key
+        async with self._public_key_lock:
+            since_attempt = time.monotonic() - self._public_key_attempted_at
+            if self._public_key is public_key and since_attempt >= settings.MONOBANK_PUBKEY_MIN_REFRESH_INTERVAL:
+                await self.refresh_public_key()
+        
+        if self._public_key is not public_key and self._check_signature(body, signature):
+            WEBHOOK_SIGNATURES.inc(result="valid_after_refresh")
+            return True
+        
+        WEBHOOK_SIGNATURES.inc(result="invalid")
+        return False
+    
+    async def run_public_key_refresher(self):
+        """Keep the webhook public key fresh until cancelled"""
+        
+        while True:
+            if not await self.refresh_public_key():
+                # Retry sooner while we have no key or a stale one
+                await asyncio.sleep(settings.MONOBANK_PUBKEY_MIN_REFRESH_INTERVAL)
+                continue
+            await asyncio.sleep(settings.MONOBANK_PUBKEY_REFRESH_INTERVAL)
     
     async def process_webhook(self, data: Dict) -> Dict:
         """Process payment webhook from Monobank"""
@@ -160,11 +411,6 @@ class MonobankService:
         Note: This requires special merchant account with withdrawal capabilities
         """
         
-        headers = {
-            "X-Token": self.token,
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "amount": amount,
             "ccy": 980,  # UAH
@@ -0,0 +1,114 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from datetime import datetime, timedelta
+from typing import Optional
+import json
+from app.models.transaction import Transaction, TransactionType, TransactionStatus
+from app.models.project import Project
+from app.models.user import User, SubscriptionType
+from app.services.invoice_idempotency import forget_invoice
+from app.services import ledger, milestones
+
+# Monobank invoice statuses: created, processing, hold, success, failure, reversed, expired
+SUCCESS_STATUSES = {"success"}
+FAILURE_STATUSES = {"failure", "expired"}
+
+# Transactions in these states can still be moved by an invoice status update
+OPEN_STATUSES = {TransactionStatus.PENDING, TransactionStatus.PROCESSING}
+
+
+async def apply_invoice_status(
+    db: AsyncSession,
+    invoice_id: str,
+    invoice_status: str
+) -> Optional[Transaction]:
+    """
+    Apply Monobank invoice status to its transaction
+
+    Shared state machine for webhooks and reconciliation. Transactions that
+    already reached a final state are left untouched, so replaying the same
+    status is a no-op. Does not commit.
+
+    Returns:
+        The transaction, or None if no transaction matches the invoice
+    """
+
+    result = await db.execute(
+        select(Transaction)
+        .where(Transaction.monobank_invoice_id == invoice_id)
+        .with_for_update()
+    )
+    transaction = result.scalar_one_or_none()
+
+    if not transaction or transaction.status not in OPEN_STATUSES:
+        return transaction
+
+    if invoice_status in SUCCESS_STATUSES:
+        transaction.status = TransactionStatus.COMPLETED
+        transaction.completed_at = datetime.utcnow()
+        await _fulfil_transaction(db, transaction)
+
+    elif invoice_status in FAILURE_STATUSES:
+        transaction.status = TransactionStatus.FAILED
+        if transaction.transaction_type == TransactionType.MILESTONE_FUND:
+            await milestones.release_claim(db, transaction)
+
+    if transaction.status not in OPEN_STATUSES:
+        # Repeat requests for this order must get a fresh invoice now
+        await forget_invoice(invoice_id)
+
+    return transaction
+
+
+async def _fulfil_transaction(db: AsyncSession, transaction: Transaction):
+    """Grant whatever the completed payment was for"""
+
+    if transaction.transaction_type == TransactionType.ESCROW_FUND:
+        # Mark project escrow as funded
+        project_result = await db.execute(select(Project).where(Project.id == transaction.project_id))
+        project = project_result.scalar_one()
+        project.escrow_funded = True
+        project.escrow_amount = transaction.amount
+        await ledger.post(db, transaction.payer_id, escrowed=transaction.amount)
+
+    elif transaction.transaction_type == TransactionType.MILESTONE_FUND:
+        await ledger.post(db, transaction.payer_id, escrowed=transaction.amount)
+        await milestones.mark_funded(db, transaction)
+
+    elif transaction.transaction_type == TransactionType.CONNECTS_PURCHASE:
+        # Add connects to user
+        metadata = json.loads(transaction.extra_data or "{}")
+        connects_amount = metadata.get("connects_amount", 0)
+
+        user_result = await db.execute(select(User).where(User.id == transaction.payer_id))
+        user = user_result.scalar_one()
+        user.connects_balance += connects_amount
+
+    elif transaction.transaction_type == TransactionType.SUBSCRIPTION_PAYMENT:
+        # Activate subscription
+        metadata = json.loads(transaction.extra_data or "{}")
+        subscription_type = metadata.get("subscription_type")
+        months = metadata.get("months", 1)
+
+        user_result = await db.execute(select(User).where(User.id == transaction.payer_id))
+        user = user_result.scalar_one()
+        user.subscription_type = SubscriptionType(subscription_type)
+
+        # Set expiration date
+        if user.subscription_expires_at and user.subscription_expires_at > datetime.utcnow():
+            user.subscription_expires_at += timedelta(days=30 * months)
+        else:
+            user.subscription_expires_at = datetime.utcnow() + timedelta(days=30 * months)
+
+    elif transaction.transaction_type == TransactionType.PROFILE_PROMOTION:
+        # Activate profile promotion
+        metadata = json.loads(transaction.extra_data or "{}")
+        weeks = metadata.get("weeks", 1)
+
+        user_result = await db.execute(select(User).where(User.id == transaction.payer_id))
+        user = user_result.scalar_one()
+
+        if user.profile_promoted_until and user.profile_promoted_until > datetime.utcnow():
+            user.profile_promoted_until += timedelta(weeks=weeks)
+        else:
+            user.profile_promoted_until = datetime.utcnow() + timedelta(weeks=weeks)
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+User presence kept in Redis
+
+Two sorted sets keyed by user id:
+
+- `presence:online`: scored by when the user stops counting as online
+  (last heartbeat + PRESENCE_ONLINE_WINDOW); logout removes the user
+- `presence:last_seen`: scored by the last heartbeat (unix seconds)
+
+Authenticated requests send heartbeats, at most one per user per
+PRESENCE_HEARTBEAT_INTERVAL from each process. Postgres only gets
+`users.last_seen_at`, written in bulk by a periodic flush of the users
+seen since the previous one; `users.is_online` is no longer written and
+responses take online status from here.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from redis.exceptions import RedisError
+from sqlalchemy import bindparam, or_, update
+from sqlalchemy.orm.attributes import set_committed_value
+from app.config import settings
+from app.core.redis_client import redis_client
+from app.database import AsyncSessionLocal
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+ONLINE_KEY = "presence:online"
+LAST_SEEN_KEY = "presence:last_seen"
+FLUSHED_UNTIL_KEY = "presence:flushed_until"
+LOCK_KEY = "presence-flush:lock"
+
+# Re-read this much before the previous flush to cover clock skew between processes
+FLUSH_OVERLAP = 10
+
+# Last heartbeat sent per user from this process
+_sent: Dict[int, float] = {}
+_SENT_MAX = 100000
+
+users_table = User.__table__
+
+
+async def touch(user_id: int, force: bool = False):
+    """Record a heartbeat; throttled per process unless forced"""
+
+    now = time.time()
+    if not force and now - _sent.get(user_id, 0) < settings.PRESENCE_HEARTBEAT_INTERVAL:
+        return
+
+    if len(_sent) >= _SENT_MAX:
+        cutoff = now - settings.PRESENCE_HEARTBEAT_INTERVAL
+        for key in [key for key, sent_at in _sent.items() if sent_at < cutoff]:
+            del _sent[key]
+    _sent[user_id] = now
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zadd(ONLINE_KEY, {user_id: now + settings.PRESENCE_ONLINE_WINDOW})
+            pipe.zadd(LAST_SEEN_KEY, {user_id: now})
+            await pipe.execute()
+    except RedisError as e:
+        _sent.pop(user_id, None)
+        logger.warning(f"Failed to record presence of user {user_id}: {str(e)}")
+
+
+async def touch_many(user_ids: Iterable[int]):
+    """Record heartbeats for many users (e.g. open WebSocket connections) in one round trip"""
+
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+
+    now = time.time()
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zadd(ONLINE_KEY, {user_id: now + settings.PRESENCE_ONLINE_WINDOW for user_id in user_ids})
+            pipe.zadd(LAST_SEEN_KEY, {user_id: now for user_id in user_ids})
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Failed to record presence of {len(user_ids)} users: {str(e)}")
+        return
+    for user_id in user_ids:
+        _sent[user_id] = now
+
+
+async def mark_offline(user_id: int):
+    """Take a user offline right away (logout)"""
+
+    _sent.pop(user_id, None)
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zrem(ONLINE_KEY, user_id)
+            pipe.zadd(LAST_SEEN_KEY, {user_id: time.time()})
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Failed to record logout of user {user_id}: {str(e)}")
+
+
+async def get_presence(user_ids: List[int]) -> Dict[int, Tuple[bool, Optional[datetime]]]:
+    """
+    Online status and last heartbeat for many users in one round trip
+
+    Users Redis knows nothing about (or every user, if Redis is down) are
+    reported offline with no last heartbeat.
+    """
+
+    if not user_ids:
+        return {}
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.zmscore(ONLINE_KEY, user_ids)
+            pipe.zmscore(LAST_SEEN_KEY, user_ids)
+            online_until, last_seen = await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Presence unavailable: {str(e)}")
+        return {user_id: (False, None) for user_id in user_ids}
+
+    now = time.time()
+    return {
+        user_id: (
+            until is not None and until > now,
+            datetime.utcfromtimestamp(seen) if seen is not None else None
+        )
+        for user_id, until, seen in zip(user_ids, online_until, last_seen)
+    }
+
+
+async def apply_presence(users: Iterable[User]) -> None:
+    """Fill `is_online` and `last_seen_at` of loaded users from Redis, without dirtying them"""
+
+    users = list(users)
+    presence = await get_presence([user.id for user in users])
+    for user in users:
+        online, last_seen = presence[user.id]
+        set_committed_value(user, "is_online", online)
+        if last_seen is not None and (user.last_seen_at is None or last_seen > user.last_seen_at):
+            set_committed_value(user, "last_seen_at", last_seen)
+
+
+async def flush_last_seen() -> int:
+    """Write last heartbeats since the previous flush to users.last_seen_at"""
+
+    now = time.time()
+    flushed_until = float(await redis_client.get(FLUSHED_UNTIL_KEY) or 0)
+
+    seen = await redis_client.zrangebyscore(
+        LAST_SEEN_KEY, max(flushed_until - FLUSH_OVERLAP, 0), now, withscores=True
+    )
+
+    stmt = (
+        update(users_table)
+        .where(
+            users_table.c.id == bindparam("user_id"),
+            or_(users_table.c.last_seen_at.is_(None), users_table.c.last_seen_at < bindparam("seen_at"))
+        )
+        # Presence is not a profile change
+        .values(last_seen_at=bindparam("seen_at"), updated_at=users_table.c.updated_at)
+    )
+    async with AsyncSessionLocal() as db:
+        for start in range(0, len(seen), settings.PRESENCE_FLUSH_BATCH):
+            batch = seen[start:start + settings.PRESENCE_FLUSH_BATCH]
+            await db.execute(stmt, [
+                {"user_id": int(user_id), "seen_at": datetime.utcfromtimestamp(score)}
+                for user_id, score in batch
+            ])
+            await db.commit()
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.set(FLUSHED_UNTIL_KEY, now)
+        # Everything older is in Postgres now
+        pipe.zremrangebyscore(LAST_SEEN_KEY, "-inf", now - FLUSH_OVERLAP - settings.PRESENCE_ONLINE_WINDOW)
+        pipe.zremrangebyscore(ONLINE_KEY, "-inf", now)
+        await pipe.execute()
+
+    return len(seen)
+
+
+async def run_presence_flusher():
+    """Periodically flush last_seen_at until cancelled"""
+
+    logger.info("Presence flusher started")
+
+    while True:
+        await asyncio.sleep(settings.PRESENCE_FLUSH_INTERVAL)
+
+        try:
+            # One flush per deployment, not per worker process
+            if not await redis_client.set(LOCK_KEY, "1", nx=True, ex=settings.PRESENCE_FLUSH_INTERVAL):
+                continue
+            flushed = await flush_last_seen()
+            if flushed:
+                logger.debug(f"Flushed last_seen_at of {flushed} users")
+        except asyncio.CancelledError:
+            raise
+        except RedisError as e:
+            logger.warning(f"Presence flush skipped: {str(e)}")
+        except Exception:
+            logger.exception("Presence flush failed")
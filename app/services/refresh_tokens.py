@@ -0,0 +1,198 @@
+"""
+Refresh token rotation with reuse detection
+
+Every login starts a family. Its refresh tokens carry the family id (`fid`)
+and their position in the chain (`gen`). Only the newest token of a family
+(the head) can be exchanged, and exchanging it makes the next one the head.
+Presenting an older token means it leaked, so the whole family is revoked.
+
+Heads are stored as "<gen>:<sha256(jti)>" in Redis and swapped with a
+compare-and-swap script, one round trip per refresh; Redis is the only
+store the hot path touches. Postgres records families when they start and
+when they are revoked, never rotations. When Redis has no head for a
+family (evicted, flushed) or is down, the refresh fails closed and the
+client logs in again, rather than trusting a head that may be stale.
+
+The jti of the next token is derived from the current one, so the
+previous head presented again within REFRESH_TOKEN_REUSE_GRACE seconds of
+its rotation (two concurrent refreshes from one client) is answered with
+an equivalent copy of the current head instead of revoking the family.
+"""
+
+import hashlib
+import hmac
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from redis.exceptions import RedisError
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.core.metrics import Counter
+from app.core.redis_client import redis_client
+from app.core.security import create_refresh_token
+from app.core.token_revocation import revoke_token
+from app.models.refresh_token import RefreshTokenFamily
+
+logger = logging.getLogger(__name__)
+
+FAMILY_PREFIX = "refresh:family:"
+GRACE_PREFIX = "refresh:grace:"
+
+# Swap the head if it is the expected one, remembering the previous head for
+# the grace window; a repeat of that previous head within it returns 2;
+# otherwise report what is there
+ROTATE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return {0, ''}
+end
+if current == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', tonumber(ARGV[3]))
+    if tonumber(ARGV[4]) > 0 then
+        redis.call('SET', KEYS[2], ARGV[1], 'EX', tonumber(ARGV[4]))
+    end
+    return {1, ''}
+end
+if current == ARGV[2] and redis.call('GET', KEYS[2]) == ARGV[1] then
+    return {2, ''}
+end
+return {-1, current}
+"""
+
+_rotate_head = redis_client.register_script(ROTATE_SCRIPT)
+
+REFRESH_ROTATIONS = Counter(
+    "refresh_token_rotations_total",
+    "Refresh token exchanges by outcome",
+    ["result"]
+)
+
+
+def _hash(jti: str) -> str:
+    return hashlib.sha256(jti.encode()).hexdigest()
+
+
+def _ttl() -> int:
+    return settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+
+
+def _next_jti(jti: str) -> str:
+    """jti of the token that succeeds the given one; repeats yield the same head"""
+    return hmac.new(settings.SECRET_KEY.encode(), jti.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def _issue(user_id: int, family_id: str, generation: int, jti: Optional[str] = None) -> Tuple[str, str]:
+    """New refresh token of a family and its token hash"""
+
+    jti = jti or uuid.uuid4().hex
+    token = create_refresh_token(data={
+        "sub": str(user_id),
+        "fid": family_id,
+        "gen": generation,
+        "jti": jti
+    })
+    return token, _hash(jti)
+
+
+async def start_family(db: AsyncSession, user_id: int) -> str:
+    """Start a family for a new login and return its first refresh token. Caller commits."""
+
+    family_id = uuid.uuid4().hex
+    token, token_hash = _issue(user_id, family_id, 0)
+    db.add(RefreshTokenFamily(id=family_id, user_id=user_id, generation=0, token_hash=token_hash))
+
+    try:
+        await redis_client.set(FAMILY_PREFIX + family_id, f"0:{token_hash}", ex=_ttl())
+    except RedisError as e:
+        # Its first refresh fails closed and the client logs in again
+        logger.warning(f"Failed to store refresh token family {family_id}: {str(e)}")
+    return token
+
+
+async def revoke_family(db: AsyncSession, family_id: str):
+    """
+    Revoke every refresh token of a family. Does not commit.
+
+    Raises RedisError if the head can't be removed from Redis, since Redis
+    would keep accepting it.
+    """
+
+    await db.execute(
+        update(RefreshTokenFamily)
+        .where(RefreshTokenFamily.id == family_id, RefreshTokenFamily.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+    await redis_client.delete(FAMILY_PREFIX + family_id)
+
+
+async def rotate(db: AsyncSession, payload: Dict[str, Any]) -> Optional[str]:
+    """
+    Exchange a verified refresh token payload for the next token of its family
+
+    Returns:
+        New refresh token, or None if the token is not the family head
+        (revoking the family when it is an older one)
+    """
+
+    user_id = int(payload["sub"])
+    family_id = payload.get("fid")
+    generation = payload.get("gen")
+
+    if not payload.get("jti"):
+        REFRESH_ROTATIONS.inc(result="invalid")
+        return None
+
+    if not family_id or not isinstance(generation, int):
+        # Issued before families existed; retire it and start a family
+        try:
+            await revoke_token(payload["jti"], payload.get("exp"))
+        except RedisError as e:
+            logger.warning(f"Failed to retire refresh token of user {user_id}: {str(e)}")
+            return None
+        REFRESH_ROTATIONS.inc(result="migrated")
+        token = await start_family(db, user_id)
+        await db.commit()
+        return token
+
+    token_hash = _hash(payload["jti"])
+    token, next_hash = _issue(user_id, family_id, generation + 1, _next_jti(payload["jti"]))
+
+    try:
+        swapped, _ = await _rotate_head(
+            keys=[FAMILY_PREFIX + family_id, GRACE_PREFIX + family_id],
+            args=[
+                f"{generation}:{token_hash}",
+                f"{generation + 1}:{next_hash}",
+                _ttl(),
+                settings.REFRESH_TOKEN_REUSE_GRACE
+            ]
+        )
+        swapped = int(swapped)
+    except RedisError as e:
+        logger.warning(f"Refresh token store unavailable, refusing refresh: {str(e)}")
+        REFRESH_ROTATIONS.inc(result="unavailable")
+        return None
+
+    if swapped in (1, 2):
+        REFRESH_ROTATIONS.inc(result="rotated" if swapped == 1 else "grace")
+        return token
+
+    if swapped == 0:
+        # Unknown, revoked or lost family
+        REFRESH_ROTATIONS.inc(result="unknown_family")
+        return None
+
+    return await _reuse_detected(db, family_id, user_id)
+
+
+async def _reuse_detected(db: AsyncSession, family_id: str, user_id: int) -> None:
+    logger.warning(f"Refresh token reuse detected, revoking family {family_id} of user {user_id}")
+    REFRESH_ROTATIONS.inc(result="reuse")
+    try:
+        await revoke_family(db, family_id)
+    except RedisError as e:
+        logger.error(f"Failed to remove revoked refresh token family {family_id} from Redis: {str(e)}")
+    await db.commit()
+    return None
@@ -0,0 +1,209 @@
+import csv
+import io
+import tempfile
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Tuple
+from sqlalchemy import case, func, select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.project import Project
+from app.models.transaction import Transaction, TransactionType, TransactionStatus
+from app.models.user import User
+
+COLUMNS = [
+    "date",
+    "transaction_id",
+    "type",
+    "description",
+    "counterparty",
+    "project",
+    "credit",
+    "debit",
+    "commission",
+    "running_balance",
+    "running_commission",
+]
+
+
+# Pay out money the payer already paid when funding, so they are not a debit again
+RELEASE_TYPES = (TransactionType.ESCROW_RELEASE, TransactionType.MILESTONE_RELEASE)
+
+
+def _display_name(first_name, last_name, username) -> str:
+    return " ".join(filter(None, [first_name, last_name])) or username
+
+
+def _amounts(row, user_id: int) -> Tuple[float, float, float]:
+    """(credit, debit, commission) of a transaction for the user"""
+
+    commission = row.commission_amount or 0
+
+    if row.transaction_type == TransactionType.WITHDRAWAL:
+        return 0.0, row.amount + commission, commission
+    if row.payer_id == user_id:
+        if row.transaction_type in RELEASE_TYPES:
+            return 0.0, 0.0, 0.0
+        return 0.0, row.amount, commission
+    return (row.net_amount if row.net_amount is not None else row.amount), 0.0, commission
+
+
+async def _opening_balance(db: AsyncSession, user_id: int, before: datetime) -> float:
+    """Balance from all completed transactions before the statement starts, as _amounts counts them"""
+
+    commission = func.coalesce(Transaction.commission_amount, 0)
+    change = case(
+        (Transaction.transaction_type == TransactionType.WITHDRAWAL, -(Transaction.amount + commission)),
+        (
+            Transaction.payer_id == user_id,
+            case((Transaction.transaction_type.in_(RELEASE_TYPES), 0), else_=-Transaction.amount)
+        ),
+        else_=func.coalesce(Transaction.net_amount, Transaction.amount)
+    )
+    result = await db.execute(
+        select(func.coalesce(func.sum(change), 0)).where(
+            or_(Transaction.payer_id == user_id, Transaction.payee_id == user_id),
+            Transaction.status == TransactionStatus.COMPLETED,
+            Transaction.created_at < before
+        )
+    )
+    return float(result.scalar())
+
+
+async def iter_statement_rows(
+    user_id: int,
+    date_from: datetime,
+    date_to: datetime
+) -> AsyncIterator[List[Dict]]:
+    """
+    Yield completed transactions for a statement in chunks
+
+    Reads through a server-side cursor, so memory stays constant regardless
+    of the range. Counterparty and project names are resolved once per
+    chunk with one query each, and remembered across chunks.
+    """
+
+    chunk_size = settings.STATEMENT_CHUNK_SIZE
+    user_names: Dict[int, str] = {}
+    project_titles: Dict[int, str] = {}
+    running_commission = 0.0
+
+    # Own session: the response streams after request dependencies are closed
+    async with AsyncSessionLocal() as db:
+        running_balance = await _opening_balance(db, user_id, date_from)
+
+        result = await db.stream(
+            select(
+                Transaction.id,
+                Transaction.payer_id,
+                Transaction.payee_id,
+                Transaction.project_id,
+                Transaction.transaction_type,
+                Transaction.amount,
+                Transaction.commission_amount,
+                Transaction.net_amount,
+                Transaction.description,
+                Transaction.created_at
+            )
+            .where(
+                or_(Transaction.payer_id == user_id, Transaction.payee_id == user_id),
+                Transaction.status == TransactionStatus.COMPLETED,
+                Transaction.created_at >= date_from,
+                Transaction.created_at < date_to
+            )
+            .order_by(Transaction.created_at, Transaction.id)
+            .execution_options(yield_per=chunk_size)
+        )
+
+        async for partition in result.partitions(chunk_size):
+            # Bulk-resolve names not seen in earlier chunks
+            other_ids = set()
+            for row in partition:
+                other_id = row.payee_id if row.payer_id == user_id else row.payer_id
+                if other_id and other_id != user_id and other_id not in user_names:
+                    other_ids.add(other_id)
+            project_ids = {
+                row.project_id for row in partition
+                if row.project_id and row.project_id not in project_titles
+            }
+
+            if other_ids:
+                names = await db.execute(
+                    select(User.id, User.first_name, User.last_name, User.username)
+                    .where(User.id.in_(other_ids))
+                )
+                for user in names.all():
+                    user_names[user.id] = _display_name(user.first_name, user.last_name, user.username)
+            if project_ids:
+                titles = await db.execute(
+                    select(Project.id, Project.title).where(Project.id.in_(project_ids))
+                )
+                project_titles.update({project.id: project.title for project in titles.all()})
+
+            rows = []
+            for row in partition:
+                credit, debit, commission = _amounts(row, user_id)
+                running_balance += credit - debit
+                running_commission += commission
+                other_id = row.payee_id if row.payer_id == user_id else row.payer_id
+
+                rows.append({
+                    "date": row.created_at.isoformat(sep=" ", timespec="seconds"),
+                    "transaction_id": row.id,
+                    "type": row.transaction_type.value,
+                    "description": row.description or "",
+                    "counterparty": user_names.get(other_id, ""),
+                    "project": project_titles.get(row.project_id, ""),
+                    "credit": round(credit, 2),
+                    "debit": round(debit, 2),
+                    "commission": round(commission, 2),
+                    "running_balance": round(running_balance, 2),
+                    "running_commission": round(running_commission, 2),
+                })
+
+            yield rows
+
+
+async def stream_csv(user_id: int, date_from: datetime, date_to: datetime) -> AsyncIterator[str]:
+    """Stream statement as CSV, one chunk of rows at a time"""
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+
+    async for rows in iter_statement_rows(user_id, date_from, date_to):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def build_xlsx(user_id: int, date_from: datetime, date_to: datetime):
+    """
+    Write statement to a temporary XLSX file
+
+    XLSX is a zip archive and cannot be emitted incrementally; openpyxl's
+    write-only mode keeps memory flat and spools rows to disk instead.
+
+    Returns:
+        Open binary file positioned at the start
+    """
+
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Statement")
+    sheet.append(COLUMNS)
+
+    async for rows in iter_statement_rows(user_id, date_from, date_to):
+        for row in rows:
+            sheet.append([row[column] for column in COLUMNS])
+
+    output = tempfile.TemporaryFile()
+    await run_in_threadpool(workbook.save, output)
+    output.seek(0)
+    return output
\ No newline at end of file
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from sqlalchemy import select
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.webhook_event import WebhookEvent
+from app.services.monobank import monobank_service
+from app.services.payment_processing import apply_invoice_status
+
+logger = logging.getLogger(__name__)
+
+# Set by the webhook endpoint so idle workers in this process pick up new
+# events immediately instead of waiting for the next poll
+_new_events = asyncio.Event()
+
+
+def notify_new_event():
+    """Wake up inbox workers in this process"""
+    _new_events.set()
+
+
+async def drain_batch(batch_size: int = None) -> int:
+    """
+    Process one batch of unprocessed webhook events
+    
+    Rows are claimed with FOR UPDATE SKIP LOCKED, so any number of workers
+    across processes can drain the inbox concurrently without overlap.
+    
+    Returns:
+        Number of events claimed
+    """
+    
+    batch_size = batch_size or settings.WEBHOOK_INBOX_BATCH_SIZE
+    
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(WebhookEvent)
+            .where(
+                WebhookEvent.processed_at.is_(None),
+                WebhookEvent.attempts < settings.WEBHOOK_INBOX_MAX_ATTEMPTS
+            )
+            .order_by(WebhookEvent.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        events = result.scalars().all()
+        
+        for event in events:
+            try:
+                # Savepoint per event so one bad event does not fail the batch
+                async with db.begin_nested():
+                    webhook_data = await monobank_service.process_webhook(json.loads(event.payload))
+                    await apply_invoice_status(db, webhook_data["invoice_id"], webhook_data["status"])
+                event.processed_at = datetime.utcnow()
+            except Exception as e:
+                logger.exception(f"Failed to process webhook event {event.id}")
+                event.attempts += 1
+                event.last_error = str(e)[:1000]
+        
+        await db.commit()
+        return len(events)
+
+
+async def run_inbox_worker(worker_id: int):
+    """Drain the webhook inbox until cancelled"""
+    
+    logger.info(f"Webhook inbox worker {worker_id} started")
+    
+    while True:
+        # Clear before draining so events arriving mid-batch are not missed
+        _new_events.clear()
+        try:
+            claimed = await drain_batch()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"Webhook inbox worker {worker_id} failed to drain batch")
+            claimed = 0
+        
+        if claimed:
+            continue
+        
+        # Inbox is empty: sleep until notified or the next poll
+        try:
+            await asyncio.wait_for(_new_events.wait(), timeout=settings.WEBHOOK_INBOX_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_inbox_workers() -> list:
+    """Spawn the configured number of inbox workers as asyncio tasks"""
+    return [
+        asyncio.create_task(run_inbox_worker(worker_id))
+        for worker_id in range(settings.WEBHOOK_INBOX_WORKERS)
+    ]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Benchmark: do login bursts slow down unrelated endpoints?
+
+Probes GET / at a fixed rate, first alone and then while a burst of
+concurrent logins runs, and compares probe latency. With bcrypt on the
+event loop every login stalls the probes for the length of a hash; with
+the hashing pool the probe latency should barely move.
+
+Setup:
+    RATE_LIMIT_ENABLED=false uvicorn app.main:app --port 8000
+
+Usage:
+    python -m scripts.bench_login --concurrency 50 --duration 10
+
+Seeds one bench_* user directly in the database (same DATABASE_URL as the
+API) and removes it afterwards.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List
+import httpx
+from app.config import settings
+from app.core.security import get_password_hash
+from app.database import AsyncSessionLocal, engine
+from app.models import *  # Import all models
+from scripts.bench_payments import BENCH_PREFIX, cleanup, report
+
+PASSWORD = "bench-password-123"
+
+
+async def seed() -> str:
+    """Create a user to log in as, returning its email"""
+
+    email = f"{BENCH_PREFIX}login_{int(time.time())}@bench.local"
+    async with AsyncSessionLocal() as db:
+        db.add(User(
+            email=email,
+            username=email.split("@")[0],
+            hashed_password=get_password_hash(PASSWORD),
+            role=UserRole.FREELANCER
+        ))
+        await db.commit()
+    return email
+
+
+async def probe(client: httpx.AsyncClient, latencies: List[float], stop: asyncio.Event, interval: float):
+    """Hit a cheap endpoint at a fixed rate until stopped"""
+
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - start)))
+
+
+async def run(args):
+    email = await seed()
+
+    limits = httpx.Limits(max_connections=args.concurrency + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        # Baseline: probes alone
+        baseline: List[float] = []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, baseline, stop, args.probe_interval))
+        await asyncio.sleep(args.baseline)
+        stop.set()
+        await prober
+
+        # Burst: probes while logins run back to back on every connection
+        during: List[float] = []
+        logins: List[float] = []
+        statuses: Dict[int, int] = {}
+        stop = asyncio.Event()
+
+        async def login_loop():
+            while not stop.is_set():
+                start = time.perf_counter()
+                response = await client.post(
+                    f"{settings.API_V1_STR}/auth/login",
+                    json={"email": email, "password": PASSWORD}
+                )
+                logins.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        prober = asyncio.create_task(probe(client, during, stop, args.probe_interval))
+        workers = [asyncio.create_task(login_loop()) for _ in range(args.concurrency)]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(prober, *workers)
+
+    print()
+    print(f"Logins: {len(logins)} in {args.duration:.0f}s ({len(logins) / args.duration:.1f}/s), statuses {statuses}")
+    report("GET / (baseline)", baseline)
+    report("GET / (login burst)", during)
+    report("POST /auth/login", logins)
+
+
+async def main(args) -> int:
+    try:
+        await run(args)
+        return 0
+    finally:
+        await cleanup()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login burst vs. unrelated endpoint latency")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--baseline", type=float, default=3)
+    parser.add_argument("--probe-interval", type=float, default=0.02)
+    sys.exit(asyncio.run(main(parser.parse_args())))
\ No newline at end of file
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+"""
+Load benchmark for the escrow payment pipeline
+
+Drives POST /payments/escrow/fund at a target rate (open loop) and follows
+each invoice through fake Monobank payment, webhook and inbox processing
+until its transaction is COMPLETED. Reports throughput and latency
+percentiles for the API call and for the whole pipeline.
+
+Setup:
+    python -m scripts.fake_monobank --port 8081
+    MONOBANK_API_URL=http://localhost:8081 \\
+    MONOBANK_WEBHOOK_URL=http://localhost:8000/api/v1/payments/webhook/monobank \\
+    RATE_LIMIT_ENABLED=false uvicorn app.main:app --port 8000
+
+Usage:
+    python -m scripts.bench_payments --rps 50 --duration 30
+
+Seeds bench_* clients and in-progress projects directly in the database
+(same DATABASE_URL as the API) and removes them afterwards.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List
+import httpx
+from sqlalchemy import select, delete
+from app.config import settings
+from app.core.security import create_access_token
+from app.database import AsyncSessionLocal, engine
+from app.models import *  # Import all models
+
+BENCH_PREFIX = "bench_"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name: str, latencies: List[float]):
+    print(
+        f"{name:<22} n={len(latencies):<6} "
+        f"p50={percentile(latencies, 50) * 1000:7.1f}ms "
+        f"p90={percentile(latencies, 90) * 1000:7.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:7.1f}ms "
+        f"max={max(latencies, default=0) * 1000:7.1f}ms"
+    )
+
+
+async def seed(count: int) -> List[Dict]:
+    """Create one client with an in-progress project per request"""
+    
+    run_id = int(time.time())
+    async with AsyncSessionLocal() as db:
+        clients = [
+            User(
+                email=f"{BENCH_PREFIX}{run_id}_{i}@bench.local",
+                username=f"{BENCH_PREFIX}{run_id}_{i}",
+                hashed_password="!",
+                role=UserRole.CLIENT
+            )
+            for i in range(count)
+        ]
+        db.add_all(clients)
+        await db.flush()
+        
+        projects = [
+            Project(
+                client_id=client.id,
+                title=f"Benchmark project {client.id}",
+                description="Benchmark project",
+                category="benchmark",
+                project_type=ProjectType.FIXED_PRICE,
+                budget_min=100,
+                budget_max=1000,
+                status=ProjectStatus.IN_PROGRESS
+            )
+            for client in clients
+        ]
+        db.add_all(projects)
+        await db.commit()
+        
+        return [
+            {
+                "project_id": project.id,
+                "token": create_access_token(data={"sub": str(project.client_id)})
+            }
+            for project in projects
+        ]
+
+
+async def cleanup():
+    """Remove all benchmark data"""
+    
+    async with AsyncSessionLocal() as db:
+        user_ids = select(User.id).where(User.username.like(f"{BENCH_PREFIX}%")).scalar_subquery()
+        project_ids = select(Project.id).where(Project.client_id.in_(user_ids)).scalar_subquery()
+        invoice_ids = select(Transaction.monobank_invoice_id).where(Transaction.payer_id.in_(user_ids)).scalar_subquery()
+        
+        await db.execute(delete(WebhookEvent).where(WebhookEvent.invoice_id.in_(invoice_ids)))
+        await db.execute(delete(Transaction).where(Transaction.payer_id.in_(user_ids)))
+        await db.execute(delete(LedgerBalance).where(LedgerBalance.user_id.in_(user_ids)))
+        await db.execute(delete(Project).where(Project.id.in_(project_ids)))
+        await db.execute(delete(User).where(User.id.in_(user_ids)))
+        await db.commit()
+
+
+async def watch_completions(started: Dict[str, float], completed: Dict[str, float], done: asyncio.Event):
+    """Poll the database for transactions that reached COMPLETED"""
+    
+    while not done.is_set() or len(completed) < len(started):
+        waiting = [invoice_id for invoice_id in started if invoice_id not in completed]
+        if waiting:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(Transaction.monobank_invoice_id).where(
+                        Transaction.monobank_invoice_id.in_(waiting),
+                        Transaction.status == TransactionStatus.COMPLETED
+                    )
+                )
+                now = time.perf_counter()
+                for invoice_id in result.scalars().all():
+                    completed[invoice_id] = now
+        await asyncio.sleep(0.05)
+
+
+async def run(base_url: str, rps: float, duration: float, drain_timeout: float):
+    total = int(rps * duration)
+    print(f"Seeding {total} clients and projects...")
+    fixtures = await seed(total)
+    
+    api_latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    started: Dict[str, float] = {}
+    completed: Dict[str, float] = {}
+    done = asyncio.Event()
+    
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        
+        async def fund(fixture: Dict):
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    f"{settings.API_V1_STR}/payments/escrow/fund",
+                    json={"project_id": fixture["project_id"], "amount": 500},
+                    headers={"Authorization": f"Bearer {fixture['token']}"}
+                )
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                return
+            
+            api_latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                return
+            started[response.json()["invoice_id"]] = start
+        
+        watcher = asyncio.create_task(watch_completions(started, completed, done))
+        
+        print(f"Sending {total} escrow funding requests at {rps} req/s...")
+        bench_start = time.perf_counter()
+        tasks = []
+        for i, fixture in enumerate(fixtures):
+            # Open loop: keep the schedule regardless of response times
+            delay = bench_start + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(fund(fixture)))
+        await asyncio.gather(*tasks)
+        send_elapsed = time.perf_counter() - bench_start
+        
+        done.set()
+        try:
+            await asyncio.wait_for(watcher, timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        pipeline_elapsed = time.perf_counter() - bench_start
+    
+    pipeline_latencies = [completed[invoice_id] - started[invoice_id] for invoice_id in completed]
+    
+    print()
+    print(f"Requests sent:          {total} in {send_elapsed:.1f}s ({total / send_elapsed:.1f} req/s)")
+    print(f"Invoices created:       {len(started)}")
+    print(f"Completed transactions: {len(completed)} ({len(completed) / pipeline_elapsed:.1f}/s)")
+    print(f"Errors:                 {errors or 'none'}")
+    report("fund_escrow (HTTP)", api_latencies)
+    report("fund -> COMPLETED", pipeline_latencies)
+
+
+async def main(args) -> int:
+    try:
+        await run(args.base_url, args.rps, args.duration, args.drain_timeout)
+    finally:
+        if not args.keep_data:
+            await cleanup()
+        await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Payment pipeline load benchmark")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--drain-timeout", type=float, default=60, help="seconds to wait for completions")
+    parser.add_argument("--keep-data", action="store_true", help="do not delete seeded data")
+    args = parser.parse_args()
+    
+    try:
+        sys.exit(asyncio.run(main(args)))
+    except Exception as e:
+        print(f"Error running benchmark: {e}")
+        sys.exit(1)
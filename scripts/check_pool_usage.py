@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+Check that payment endpoints don't hold DB connections while Monobank is slow
+
+Runs the API and the fake Monobank in-process, sends escrow funding
+requests at a steady rate while every Monobank call takes --latency-ms, and
+samples the SQLAlchemy pool. Each request should only hold a connection
+for its short validate and persist phases, so checked-out connections stay
+far below the number of requests waiting on Monobank.
+
+Usage:
+    python -m scripts.check_pool_usage --requests 200 --rps 100 --latency-ms 2000
+
+Needs the same DATABASE_URL as the API (bench_* fixtures are created and
+removed). Exits with status 1 if more than --max-connections were ever
+checked out at once.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List
+import httpx
+from app.config import settings
+from app.database import engine
+from app.main import app
+from app.services.monobank import monobank_service
+from scripts.bench_payments import seed, cleanup
+from scripts.fake_monobank import FakeMonobankConfig, create_app
+
+
+async def sample_pool(samples: List[int], in_flight: Dict[str, int], done: asyncio.Event):
+    """Record checked-out connections while requests are waiting on Monobank"""
+
+    pool = engine.sync_engine.pool
+    while not done.is_set():
+        if in_flight["count"]:
+            samples.append(pool.checkedout())
+        await asyncio.sleep(0.01)
+
+
+async def run(args) -> int:
+    fake_app = create_app(FakeMonobankConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=0,
+        auto_pay=False
+    ))
+    monobank_service._client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake_app),
+        base_url="http://fake-monobank",
+        timeout=settings.MONOBANK_READ_TIMEOUT + args.latency_ms / 1000
+    )
+
+    print(f"Seeding {args.requests} clients and projects...")
+    fixtures = await seed(args.requests)
+
+    samples: List[int] = []
+    statuses: Dict[int, int] = {}
+    in_flight = {"count": 0, "peak": 0}
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://api",
+        timeout=60
+    ) as client:
+
+        async def fund(fixture: Dict):
+            in_flight["count"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["count"])
+            try:
+                response = await client.post(
+                    f"{settings.API_V1_STR}/payments/escrow/fund",
+                    json={"project_id": fixture["project_id"], "amount": 500},
+                    headers={"Authorization": f"Bearer {fixture['token']}"}
+                )
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            finally:
+                in_flight["count"] -= 1
+
+        sampler = asyncio.create_task(sample_pool(samples, in_flight, done))
+
+        print(f"Sending {args.requests} requests at {args.rps} req/s, Monobank latency {args.latency_ms:.0f}ms...")
+        start = time.perf_counter()
+        tasks = []
+        for i, fixture in enumerate(fixtures):
+            delay = start + i / args.rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(fund(fixture)))
+        await asyncio.gather(*tasks)
+
+        done.set()
+        await sampler
+
+    await monobank_service.close()
+
+    pool_size = settings.DATABASE_POOL_SIZE + settings.DATABASE_MAX_OVERFLOW
+    peak = max(samples, default=0)
+    mean = sum(samples) / len(samples) if samples else 0
+
+    print()
+    print(f"Responses:                 {statuses}")
+    print(f"Peak requests in flight:   {in_flight['peak']}")
+    print(f"Pool capacity:             {pool_size}")
+    print(f"Checked out (mean / peak): {mean:.1f} / {peak}")
+
+    if peak > args.max_connections:
+        print(f"FAIL: more than {args.max_connections} connections checked out while waiting on Monobank")
+        return 1
+    print("OK: pool usage stayed flat")
+    return 0
+
+
+async def main(args) -> int:
+    try:
+        return await run(args)
+    finally:
+        await cleanup()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check DB pool usage with a slow payment provider")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rps", type=float, default=100)
+    parser.add_argument("--latency-ms", type=float, default=2000)
+    parser.add_argument("--max-connections", type=int, default=10)
+    sys.exit(asyncio.run(main(parser.parse_args())))
\ No newline at end of file
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""
+Local stand-in for the Monobank acquiring API
+
+Implements invoice create, status, cancel and pubkey, and "pays" invoices
+after a delay by posting webhooks signed with X-Sign to the invoice's
+webHookUrl, like the real API.
+Latency and failure rates are configurable for load and resilience tests.
+
+Usage:
+    python -m scripts.fake_monobank --port 8081 --latency-ms 150 --error-rate 0.01
+
+Then run the API with MONOBANK_API_URL=http://localhost:8081 and
+MONOBANK_WEBHOOK_URL=http://localhost:8000/api/v1/payments/webhook/monobank
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+import httpx
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class FakeMonobankConfig:
+    latency_ms: float = 100  # Mean API response latency
+    latency_jitter_ms: float = 50  # Uniform jitter around the mean
+    error_rate: float = 0.0  # Share of API calls answered with HTTP 500
+    pay_delay_ms: float = 500  # Time from invoice creation to payment
+    payment_failure_rate: float = 0.0  # Share of invoices that end in "failure"
+    webhook_drop_rate: float = 0.0  # Share of webhooks never delivered
+    auto_pay: bool = True
+
+
+def create_app(config: Optional[FakeMonobankConfig] = None) -> FastAPI:
+    """Build fake Monobank ASGI app"""
+
+    config = config or FakeMonobankConfig()
+    app = FastAPI(title="Fake Monobank")
+    app.state.config = config
+    app.state.invoices = {}
+    app.state.stats = {"created": 0, "errors": 0, "webhooks_sent": 0, "webhooks_dropped": 0, "webhooks_failed": 0}
+    app.state.signing_key = ec.generate_private_key(ec.SECP256R1())
+    webhook_client = httpx.AsyncClient(timeout=10)
+
+    async def simulate_latency():
+        delay = config.latency_ms + random.uniform(-config.latency_jitter_ms, config.latency_jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if random.random() < config.error_rate:
+            app.state.stats["errors"] += 1
+            raise HTTPException(status_code=500, detail="Simulated Monobank error")
+
+    def invoice_view(invoice: Dict) -> Dict:
+        return {
+            "invoiceId": invoice["invoiceId"],
+            "status": invoice["status"],
+            "amount": invoice["amount"],
+            "ccy": invoice["ccy"],
+            "reference": invoice["reference"],
+            "createdDate": invoice["createdDate"],
+            "modifiedDate": invoice["modifiedDate"],
+        }
+
+    async def set_status(invoice: Dict, status: str):
+        invoice["status"] = status
+        invoice["modifiedDate"] = datetime.utcnow().isoformat() + "Z"
+
+        if not invoice["webHookUrl"]:
+            return
+        if random.random() < config.webhook_drop_rate:
+            app.state.stats["webhooks_dropped"] += 1
+            return
+
+        body = json.dumps(invoice_view(invoice)).encode()
+        signature = app.state.signing_key.sign(body, ec.ECDSA(hashes.SHA256()))
+        try:
+            await webhook_client.post(
+                invoice["webHookUrl"],
+                content=body,
+                headers={"Content-Type": "application/json", "X-Sign": base64.b64encode(signature).decode()}
+            )
+            app.state.stats["webhooks_sent"] += 1
+        except httpx.HTTPError:
+            app.state.stats["webhooks_failed"] += 1
+
+    async def pay_later(invoice: Dict):
+        await asyncio.sleep(config.pay_delay_ms / 1000)
+        if invoice["status"] != "created":
+            return
+        status = "failure" if random.random() < config.payment_failure_rate else "success"
+        await set_status(invoice, status)
+
+    @app.post("/api/merchant/invoice/create")
+    async def create_invoice(request: Request):
+        await simulate_latency()
+        payload = await request.json()
+
+        invoice_id = uuid.uuid4().hex[:22]
+        now = datetime.utcnow().isoformat() + "Z"
+        invoice = {
+            "invoiceId": invoice_id,
+            "status": "created",
+            "amount": payload["amount"],
+            "ccy": payload.get("ccy", 980),
+            "reference": payload.get("merchantPaymInfo", {}).get("reference"),
+            "webHookUrl": payload.get("webHookUrl"),
+            "createdDate": now,
+            "modifiedDate": now,
+        }
+        app.state.invoices[invoice_id] = invoice
+        app.state.stats["created"] += 1
+
+        if config.auto_pay:
+            asyncio.create_task(pay_later(invoice))
+
+        return {"invoiceId": invoice_id, "pageUrl": f"http://fake-monobank.local/pay/{invoice_id}"}
+
+    @app.get("/api/merchant/invoice/status")
+    async def invoice_status(invoiceId: str):
+        await simulate_latency()
+        invoice = app.state.invoices.get(invoiceId)
+        if not invoice:
+            return JSONResponse(status_code=400, content={"errCode": "BAD_REQUEST", "errText": "invoice not found"})
+        return invoice_view(invoice)
+
+    @app.post("/api/merchant/invoice/cancel")
+    async def cancel_invoice(request: Request):
+        await simulate_latency()
+        payload = await request.json()
+        invoice = app.state.invoices.get(payload.get("invoiceId"))
+        if not invoice:
+            return JSONResponse(status_code=400, content={"errCode": "BAD_REQUEST", "errText": "invoice not found"})
+        if invoice["status"] == "created":
+            await set_status(invoice, "expired")
+        return {"status": invoice["status"]}
+
+    @app.get("/api/merchant/pubkey")
+    async def pubkey():
+        await simulate_latency()
+        pem = app.state.signing_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        return {"key": base64.b64encode(pem).decode()}
+
+    @app.post("/_fake/invoices/{invoice_id}/pay")
+    async def force_status(invoice_id: str, status: str = "success"):
+        """Test hook: settle an invoice now (e.g. with auto_pay disabled)"""
+        invoice = app.state.invoices.get(invoice_id)
+        if not invoice:
+            raise HTTPException(status_code=404, detail="Invoice not found")
+        await set_status(invoice, status)
+        return invoice_view(invoice)
+
+    @app.post("/_fake/rotate-key")
+    async def rotate_key():
+        """Test hook: sign further webhooks with a new key"""
+        app.state.signing_key = ec.generate_private_key(ec.SECP256R1())
+        return {"rotated": True}
+
+    @app.get("/_fake/stats")
+    async def stats():
+        return app.state.stats
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        await webhook_client.aclose()
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Monobank acquiring API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--latency-jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--pay-delay-ms", type=float, default=500)
+    parser.add_argument("--payment-failure-rate", type=float, default=0.0)
+    parser.add_argument("--webhook-drop-rate", type=float, default=0.0)
+    parser.add_argument("--no-auto-pay", action="store_true")
+    args = parser.parse_args()
+
+    config = FakeMonobankConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        pay_delay_ms=args.pay_delay_ms,
+        payment_failure_rate=args.payment_failure_rate,
+        webhook_drop_rate=args.webhook_drop_rate,
+        auto_pay=not args.no_auto_pay,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
\ No newline at end of file
@@ -19,6 +19,12 @@ from app.models.transaction import Transaction
 from app.models.review import Review
 from app.models.message import Message
 from app.models.time_entry import TimeEntry
+from app.models.webhook_event import WebhookEvent
+from app.models.ledger import LedgerBalance
+from app.models.earnings import ClientEarnings
+from app.models.milestone import ProjectMilestone
+from app.models.analytics import DailyTransactionRollup, RollupWatermark
+from app.models.refresh_token import RefreshTokenFamily
 
 
 async def init_db():
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+Load test: hold idle messaging WebSockets on one worker
+
+Opens --connections sockets to the messaging gateway and keeps them idle
+for --hold seconds. Meanwhile one probe pair exchanges a message every
+--probe-interval seconds to show that delivery latency holds up with all
+the idle sockets attached. Reports how many sockets connected, how many
+stayed open, connect and delivery latency, and the server's messaging
+metrics if /metrics is enabled (METRICS_TOKEN from the environment).
+
+Setup (one worker, file descriptor limits raised on both ends):
+    ulimit -n 65536
+    METRICS_ENABLED=true METRICS_TOKEN=... uvicorn app.main:app --port 8000 --workers 1
+
+Usage:
+    python -m scripts.load_ws_idle --connections 10000 --hold 60
+
+Seeds bench_* users directly in the database (same DATABASE_URL as the
+API), up to MESSAGING_MAX_CONNECTIONS_PER_USER sockets each, and removes
+them afterwards. Keep --hold under ACCESS_TOKEN_EXPIRE_MINUTES: the gateway
+closes sockets when their token expires.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import resource
+import sys
+import time
+from typing import Dict, List, Tuple
+import httpx
+import websockets
+from sqlalchemy import delete, select
+from app.config import settings
+from app.core.security import create_access_token, principal_claims
+from app.database import AsyncSessionLocal, engine
+from app.models import *  # Import all models
+from scripts.bench_payments import BENCH_PREFIX, cleanup, report
+
+
+async def seed(count: int) -> List[Tuple[int, str]]:
+    """Create users and return (user id, access token) for each"""
+    
+    run_id = int(time.time())
+    async with AsyncSessionLocal() as db:
+        users = [
+            User(
+                email=f"{BENCH_PREFIX}ws_{run_id}_{i}@bench.local",
+                username=f"{BENCH_PREFIX}ws_{run_id}_{i}",
+                hashed_password="!",  # Never logs in
+                role=UserRole.FREELANCER
+            )
+            for i in range(count)
+        ]
+        db.add_all(users)
+        await db.commit()
+        
+        return [(user.id, create_access_token(data=principal_claims(user))) for user in users]
+
+
+async def remove_messages():
+    async with AsyncSessionLocal() as db:
+        bench_users = select(User.id).where(User.username.like(f"{BENCH_PREFIX}%"))
+        await db.execute(delete(Message).where(Message.sender_id.in_(bench_users)))
+        await db.commit()
+
+
+def raise_fd_limit(needed: int):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        target = hard if hard == resource.RLIM_INFINITY else min(hard, max(needed, soft))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        soft = target
+    if soft < needed:
+        print(f"Warning: file descriptor limit {soft} is below {needed}", file=sys.stderr)
+
+
+async def open_socket(url: str, connect_latencies: List[float], sockets: List, failures: Dict[str, int]):
+    start = time.perf_counter()
+    try:
+        socket = await websockets.connect(url, ping_interval=None, open_timeout=30, max_queue=16)
+    except Exception as e:
+        name = type(e).__name__
+        failures[name] = failures.get(name, 0) + 1
+        return
+    connect_latencies.append(time.perf_counter() - start)
+    sockets.append(socket)
+
+
+async def probe(ws_url: str, sender_token: str, receiver_token: str, receiver_id: int,
+                latencies: List[float], stop: asyncio.Event, interval: float):
+    """Send from one socket to another and time delivery"""
+    
+    async with websockets.connect(f"{ws_url}?token={sender_token}") as sender, \
+            websockets.connect(f"{ws_url}?token={receiver_token}") as receiver:
+        sequence = 0
+        while not stop.is_set():
+            sequence += 1
+            start = time.perf_counter()
+            await sender.send(json.dumps({
+                "receiver_id": receiver_id,
+                "content": f"probe {sequence}",
+                "client_id": str(sequence)
+            }))
+            while True:
+                frame = json.loads(await asyncio.wait_for(receiver.recv(), timeout=30))
+                if frame.get("type") == "message" and frame["message"]["content"] == f"probe {sequence}":
+                    break
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(interval)
+
+
+async def run(args):
+    raise_fd_limit(args.connections + 100)
+    
+    per_user = settings.MESSAGING_MAX_CONNECTIONS_PER_USER
+    users = await seed(math.ceil(args.connections / per_user) + 2)
+    (_, probe_sender), (receiver_id, probe_receiver) = users.pop(), users.pop()
+    tokens = [token for _, token in users]
+    
+    ws_url = args.base_url.replace("http", "ws", 1) + f"{settings.API_V1_STR}/messages/ws"
+    
+    # Connect in waves to avoid a SYN flood against the accept queue
+    sockets: List = []
+    connect_latencies: List[float] = []
+    failures: Dict[str, int] = {}
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+    
+    async def connect(i: int):
+        async with semaphore:
+            await open_socket(f"{ws_url}?token={tokens[i // per_user]}", connect_latencies, sockets, failures)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(connect(i) for i in range(args.connections)))
+    print(f"Connected {len(sockets)}/{args.connections} in {time.perf_counter() - started:.1f}s, failures {failures}")
+    
+    # Hold idle while probing delivery
+    delivery: List[float] = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(
+        probe(ws_url, probe_sender, probe_receiver, receiver_id, delivery, stop, args.probe_interval)
+    )
+    await asyncio.sleep(args.hold)
+    stop.set()
+    await asyncio.gather(prober, return_exceptions=True)
+    
+    still_open = sum(1 for socket in sockets if socket.close_code is None)
+    print(f"Still open after {args.hold:.0f}s: {still_open}/{len(sockets)}")
+    report("WebSocket connect", connect_latencies)
+    report("Message delivery", delivery)
+    
+    try:
+        metrics = httpx.get(
+            f"{args.base_url}/metrics",
+            headers={"Authorization": f"Bearer {settings.METRICS_TOKEN}"}
+        ).text
+        for line in metrics.splitlines():
+            if line.startswith("messaging_"):
+                print(f"  {line}")
+    except httpx.HTTPError:
+        pass
+    
+    await asyncio.gather(*(socket.close() for socket in sockets), return_exceptions=True)
+
+
+async def main(args) -> int:
+    try:
+        await run(args)
+        return 0
+    finally:
+        await remove_messages()
+        await cleanup()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Idle WebSocket connections per worker")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--hold", type=float, default=60)
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--probe-interval", type=float, default=1.0)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+Resolve pending invoice transactions whose webhook never arrived
+
+Usage: python -m scripts.reconcile_invoices [--stale-after SECONDS]
+
+Set MONOBANK_API_URL to run against a local fake Monobank server.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from app.config import settings
+from app.database import engine
+from app.models import *  # Import all models
+from app.services.monobank import monobank_service
+from app.services.invoice_reconciler import reconcile_pending_invoices
+
+
+async def reconcile(stale_after: int) -> dict:
+    """Run one reconciliation pass"""
+    
+    await monobank_service.start()
+    try:
+        return await reconcile_pending_invoices(stale_after=timedelta(seconds=stale_after))
+    finally:
+        await monobank_service.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stale-after", type=int, default=settings.INVOICE_RECONCILE_STALE_AFTER)
+    args = parser.parse_args()
+    
+    try:
+        stats = asyncio.run(reconcile(args.stale_after))
+        print(f"Reconciliation finished: {stats}")
+        sys.exit(0)
+    except Exception as e:
+        print(f"Error reconciling invoices: {e}")
+        sys.exit(1)
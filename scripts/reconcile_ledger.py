@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+"""
+Verify ledger balances against transactions
+
+Usage: python -m scripts.reconcile_ledger [--fix] [--batch-size N]
+"""
+
+import argparse
+import asyncio
+import sys
+from app.database import AsyncSessionLocal, engine
+from app.models import *  # Import all models
+from app.services.ledger import reconcile_balances
+
+
+async def reconcile(fix: bool, batch_size: int) -> int:
+    """Reconcile all users, returning number of mismatches"""
+    
+    async with AsyncSessionLocal() as db:
+        mismatches = await reconcile_balances(db, batch_size=batch_size, fix=fix)
+    await engine.dispose()
+    
+    for mismatch in mismatches:
+        print(f"User {mismatch['user_id']}: ledger {mismatch['actual']} != transactions {mismatch['expected']}")
+    
+    action = "fixed" if fix else "found"
+    print(f"Reconciliation finished: {len(mismatches)} mismatches {action}")
+    return len(mismatches)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fix", action="store_true", help="Overwrite mismatching balances")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    
+    try:
+        mismatches = asyncio.run(reconcile(args.fix, args.batch_size))
+        sys.exit(1 if mismatches and not args.fix else 0)
+    except Exception as e:
+        print(f"Error reconciling ledger: {e}")
+        sys.exit(1)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+"""
+Bring daily transaction rollups up to date
+
+Usage: python -m scripts.refresh_rollups [--full]
+"""
+
+import argparse
+import asyncio
+import sys
+from app.database import AsyncSessionLocal, engine
+from app.models import *  # Import all models
+from app.services.analytics import refresh_rollups
+
+
+async def refresh(full: bool) -> dict:
+    """Run one refresh pass"""
+    
+    try:
+        async with AsyncSessionLocal() as db:
+            return await refresh_rollups(db, full=full)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--full", action="store_true", help="Rebuild all days, ignoring the watermark")
+    args = parser.parse_args()
+    
+    try:
+        stats = asyncio.run(refresh(args.full))
+        print(f"Rollups refreshed: {stats['days']} days recomputed, watermark {stats['watermark']}")
+        sys.exit(0)
+    except Exception as e:
+        print(f"Error refreshing rollups: {e}")
+        sys.exit(1)